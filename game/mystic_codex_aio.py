@@ -0,0 +1,223 @@
+# THE MYSTIC FOREST ADVENTURE - ASYNCIO DATA API
+# The game-data functions as coroutines, for hosts that run an asyncio event loop
+
+import asyncio
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import mystic_codex_files_handling as files_handling
+
+MAX_WORKERS = 4        # Threads doing blocking file work for all coroutines together
+READS_PER_FILE = 4     # Reads of one file that may run at the same time
+
+_executor = None
+_gates = weakref.WeakKeyDictionary()  # event loop -> {file key: _FileGate}
+
+
+class _FileGate:
+    """Class to limit concurrency on one file
+
+    Any number of coroutines may wait, but at most READS_PER_FILE reads run
+    together, and a write runs alone (no reads or other writes of that file).
+    """
+
+    def __init__(self):
+        self.reads = asyncio.Semaphore(READS_PER_FILE)
+        self.write_lock = asyncio.Lock()
+        self.active_reads = 0
+        self.reads_done = asyncio.Event()
+        self.reads_done.set()
+
+    async def read(self, call):
+        async with self.reads:
+            async with self.write_lock:  # Wait for a running write, then let it go
+                self.active_reads += 1
+                self.reads_done.clear()
+            try:
+                return await call()
+            finally:
+                self.active_reads -= 1
+                if self.active_reads == 0:
+                    self.reads_done.set()
+
+    async def write(self, call):
+        async with self.write_lock:
+            await self.reads_done.wait()
+            return await call()
+
+
+def get_executor():
+    """Get the shared bounded executor for blocking file work"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="game-data-aio")
+    return _executor
+
+
+def shutdown_executor():
+    """Stop the executor threads (it is recreated on the next call)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def _gate_for(key):
+    """Get the gate for a file key on the running event loop"""
+    loop = asyncio.get_running_loop()
+    gates = _gates.setdefault(loop, {})
+    if key not in gates:
+        gates[key] = _FileGate()
+    return gates[key]
+
+
+async def _run(function, *args, key=None, write=False, **kwargs):
+    """Run a blocking function on the executor, through the file's gate if key is given"""
+    loop = asyncio.get_running_loop()
+
+    async def call():
+        return await loop.run_in_executor(get_executor(), functools.partial(function, *args, **kwargs))
+
+    if key is None:
+        return await call()
+    gate = _gate_for(str(key))
+    return await (gate.write(call) if write else gate.read(call))
+
+
+# FILE OPERATIONS
+
+async def load_json_file(filepath, default_data=None):
+    """Async load_json_file"""
+    return await _run(files_handling.load_json_file, filepath, default_data, key=filepath)
+
+
+async def save_json_file(filepath, data):
+    """Async save_json_file"""
+    return await _run(files_handling.save_json_file, filepath, data, key=filepath, write=True)
+
+
+async def append_to_text_file(filepath, text):
+    """Async append_to_text_file"""
+    return await _run(files_handling.append_to_text_file, filepath, text, key=filepath, write=True)
+
+
+async def flush_pending_writes():
+    """Async flush_pending_writes"""
+    return await _run(files_handling.flush_pending_writes)
+
+
+# CONFIGURATION
+
+async def load_config():
+    """Async load_config"""
+    return await _run(files_handling.load_config, key=files_handling.CONFIG_FILE)
+
+
+async def update_config_setting(key, value):
+    """Async update_config_setting"""
+    return await _run(files_handling.update_config_setting, key, value,
+                      key=files_handling.CONFIG_FILE, write=True)
+
+
+# PLAYER PROFILES
+
+async def load_player_profiles():
+    """Async load_player_profiles"""
+    return await _run(files_handling.load_player_profiles, key=files_handling.PLAYER_PROFILES_DB)
+
+
+async def load_player_profile(player_name):
+    """Get one player's profile (None if there is none)"""
+    return await _run(lambda: files_handling.get_profile_store().get(player_name),
+                      key=files_handling.PLAYER_PROFILES_DB)
+
+
+async def load_profiles(player_names):
+    """Load several profiles concurrently; returns {name: profile or None}"""
+    profiles = await asyncio.gather(*(load_player_profile(name) for name in player_names))
+    return dict(zip(player_names, profiles))
+
+
+async def create_player_profile(player_name):
+    """Async create_player_profile"""
+    return await _run(files_handling.create_player_profile, player_name,
+                      key=files_handling.PLAYER_PROFILES_DB, write=True)
+
+
+async def update_player_profile(player_name, game_stats):
+    """Async update_player_profile"""
+    return await _run(files_handling.update_player_profile, player_name, game_stats,
+                      key=files_handling.PLAYER_PROFILES_DB, write=True)
+
+
+# HIGH SCORES
+
+async def load_highscores():
+    """Async load_highscores"""
+    return await _run(files_handling.load_highscores, key=files_handling.SCORE_LOG_FILE)
+
+
+async def add_highscore(player_name, score, difficulty, date=None):
+    """Async add_highscore"""
+    return await _run(files_handling.add_highscore, player_name, score, difficulty, date,
+                      key=files_handling.SCORE_LOG_FILE, write=True)
+
+
+# SAVE GAMES
+
+def _slot_key(slot_number):
+    """Gate key for a save slot (its snapshot, journal and manifest entry)"""
+    return f"save_slot:{slot_number}"
+
+
+async def get_save_slots():
+    """Async get_save_slots"""
+    return await _run(files_handling.get_save_slots, key=files_handling.SAVE_MANIFEST_FILE)
+
+
+async def save_game(game_state, slot_number):
+    """Async save_game"""
+    return await _run(files_handling.save_game, game_state, slot_number,
+                      key=_slot_key(slot_number), write=True)
+
+
+async def load_game(slot_number):
+    """Async load_game"""
+    return await _run(files_handling.load_game, slot_number, key=_slot_key(slot_number))
+
+
+async def load_games(slot_numbers):
+    """Load several save slots concurrently; returns {slot: state or None}"""
+    states = await asyncio.gather(*(load_game(slot) for slot in slot_numbers))
+    return dict(zip(slot_numbers, states))
+
+
+async def delete_save(slot_number):
+    """Async delete_save"""
+    return await _run(files_handling.delete_save, slot_number, key=_slot_key(slot_number), write=True)
+
+
+# HISTORY AND EXPORT
+
+async def log_game_event(event_text):
+    """Async log_game_event"""
+    return await _run(files_handling.log_game_event, event_text,
+                      key=files_handling.GAME_HISTORY_FILE, write=True)
+
+
+async def recent_history(count=20):
+    """Get the last count lines of the game history"""
+    return await _run(lambda: files_handling.get_history_log().tail(count),
+                      key=files_handling.GAME_HISTORY_FILE)
+
+
+async def export_player_statistics(player_name):
+    """Async export_player_statistics"""
+    return await _run(files_handling.export_player_statistics, player_name,
+                      key=files_handling.GAME_DATA_DIR / f"{player_name}_stats.txt", write=True)
+
+
+async def export_all_statistics(export_format="text", workers=4):
+    """Async export_all_statistics"""
+    return await _run(files_handling.export_all_statistics, export_format, workers,
+                      key=f"export:{export_format}", write=True)
@@ -0,0 +1,121 @@
+# THE MYSTIC FOREST ADVENTURE - BATCH PLAYTHROUGHS
+# Headless random playthroughs spread over every core, with results that only depend on the seed
+
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import numpy as np
+from mystic_codex_engine import RandomPolicy, get_edition, play_game
+
+CHUNK_SIZE = 2000  # Games per task sent to a worker
+
+
+def _play_chunk(edition, seed_sequence, games, puzzle_skill):
+    """Play one chunk of games in a worker and return its aggregates
+
+    Every game gets its own game seed and policy seed from the chunk's
+    seed sequence, so a chunk plays the same games whichever worker runs it.
+    """
+    seeds = seed_sequence.generate_state(games * 2, dtype=np.uint64).reshape(games, 2)
+    endings = Counter()
+    scores = Counter()
+    for game_seed, policy_seed in seeds.tolist():
+        state = play_game(edition, RandomPolicy(policy_seed, puzzle_skill), seed=game_seed)
+        endings[state['ending']] += 1
+        scores[state['score']] += 1
+    return {"games": games, "endings": endings, "scores": scores}
+
+
+def _chunks(games, seed, chunk_size):
+    """Split games into chunks, each with an independent child of the seed's SeedSequence
+
+    The chunks depend only on games, seed and chunk_size - never on the
+    number of workers - which is what makes the aggregates reproducible.
+    """
+    sizes = [min(chunk_size, games - start) for start in range(0, games, chunk_size)]
+    return zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes)))
+
+
+def run_batch(edition="functions", games=100000, seed=0, workers=None, chunk_size=CHUNK_SIZE,
+              puzzle_skill=0.7, progress=None):
+    """Play games random playthroughs of an edition (a name from EDITIONS) across worker processes
+
+    Chunks are handed out a few at a time per worker and their results
+    are added up as they come back, so memory stays flat however many games
+    are played. progress(games done, games) is called after each chunk.
+    The same edition, games, seed and chunk_size give the same aggregates
+    for any number of workers. workers=0 plays in this process.
+
+    Returns the games played, the count of each ending, the score
+    distribution ({score: games}), the mean score and the time taken.
+    """
+    get_edition(edition)  # Check the name here rather than in every worker
+    if workers is None:
+        workers = os.cpu_count() or 1
+    totals = {"games": 0, "endings": Counter(), "scores": Counter()}
+
+    def add(result):
+        totals["games"] += result["games"]
+        totals["endings"].update(result["endings"])
+        totals["scores"].update(result["scores"])
+        if progress:
+            progress(totals["games"], games)
+
+    start = time.perf_counter()
+    chunks = _chunks(games, seed, chunk_size)
+    if workers == 0:
+        for size, seed_sequence in chunks:
+            add(_play_chunk(edition, seed_sequence, size, puzzle_skill))
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            pending = set()
+            for size, seed_sequence in chunks:
+                if len(pending) >= workers * 2:  # Keep every worker busy without queueing every chunk
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        add(future.result())
+                pending.add(pool.submit(_play_chunk, edition, seed_sequence, size, puzzle_skill))
+            for future in pending:
+                add(future.result())
+    elapsed = time.perf_counter() - start
+
+    score_total = sum(score * count for score, count in totals["scores"].items())
+    return {
+        "edition": edition,
+        "games": totals["games"],
+        "endings": dict(totals["endings"].most_common()),
+        "scores": dict(sorted(totals["scores"].items())),
+        "mean_score": score_total / totals["games"] if totals["games"] else 0.0,
+        "seconds": elapsed
+    }
+
+
+def _same_aggregates(first, second):
+    """Check two batch results agree on everything but the time taken"""
+    return all(first[key] == second[key] for key in ("games", "endings", "scores"))
+
+
+def benchmark_batch(games=40000, edition="functions", seed=0):
+    """Play the same batch with 1, 2, ... up to every core and compare speed and results"""
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, cores // 2 or 1, cores})
+    print(f"\n{games:,} {edition} playthroughs, seed {seed}, {cores} cores")
+    print(f"{'Workers':<9} {'Seconds':<9} {'Games/min':<13} {'Speedup':<9} Same results")
+    baseline = None
+    results = {}
+    for workers in worker_counts:
+        result = run_batch(edition, games, seed, workers)
+        baseline = baseline or result
+        results[workers] = result
+        print(f"{workers:<9} {result['seconds']:<9.2f} {games / result['seconds'] * 60:<13,.0f} "
+              f"{baseline['seconds'] / result['seconds']:<9.2f} {'✅' if _same_aggregates(result, baseline) else '❌'}")
+    common = ", ".join(f"{ending} {count / games:.0%}" for ending, count in list(baseline["endings"].items())[:4])
+    print(f"Mean score {baseline['mean_score']:.1f}; endings: {common}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_batch()
@@ -0,0 +1,336 @@
+# THE MYSTIC FOREST ADVENTURE - COMBAT ODDS
+# The exact chances of winning, losing or fleeing a fight, worked out as a Markov chain instead of by playing
+
+import random
+import time
+import mystic_codex_data_structures as data_structures_edition
+import mystic_codex_functions as functions_edition
+from mystic_codex_engine import silent
+
+RESULTS = ("victory", "defeat", "fled")
+
+
+def _uniform(low, high):
+    """Get the (value, probability) pairs of a fair randint(low, high) roll"""
+    probability = 1 / (high - low + 1)
+    return [(value, probability) for value in range(low, high + 1)]
+
+
+# COMBAT MODELS - One battle round of each edition's combat, as probabilities
+
+class CombatModel:
+    """Base class for the rules of one edition's fight
+
+    round_outcomes(player_health, enemy_health, action) lists every way a
+    battle round can go as (probability, result, player_health, enemy_health),
+    where result is "victory", "defeat", "fled" or None if the fight goes on.
+    The action is "attack", "item" or "flee". Only the two health values are
+    modelled, so "item" means the player has no item to use (the inventory
+    is not part of the state) and experience and level ups are left out.
+    """
+
+    name = "combat"
+    enemy_health = 1  # At the start of the fight
+    max_health = 100  # Highest player health
+
+    def round_outcomes(self, player_health, enemy_health, action):
+        raise NotImplementedError
+
+    @staticmethod
+    def _enemy_attacks(outcomes, probability, player_health, enemy_health, damage_rolls):
+        """Add the outcomes of the enemy hitting back (all the deadly blows as one defeat)"""
+        defeat = 0.0
+        for damage, damage_probability in damage_rolls:
+            if damage >= player_health:
+                defeat += damage_probability
+            else:
+                outcomes.append((probability * damage_probability, None, player_health - damage, enemy_health))
+        if defeat:
+            outcomes.append((probability * defeat, "defeat", 0, enemy_health))
+
+
+class DataStructuresCombat(CombatModel):
+    """combat_system from the Data Structures Edition, for given player stats and enemy"""
+
+    name = "data_structures"
+
+    def __init__(self, player_stats=None, enemy_data=None):
+        player_stats = player_stats or data_structures_edition.create_player_stats()
+        enemy_data = enemy_data or data_structures_edition.SHADOW_CREATURE
+        self.strength_bonus = player_stats['strength'] // 2
+        self.flee_chance = min(1.0, max(0.0, (player_stats['luck'] + 5) / 20))
+        self.max_health = player_stats['max_health']
+        self.enemy_health = enemy_data['health']
+        self.attack_rolls = _uniform(5, 10)
+        self.enemy_rolls = _uniform(enemy_data['min_damage'], enemy_data['max_damage'])
+
+    def round_outcomes(self, player_health, enemy_health, action):
+        if action == "item":
+            return [(1.0, None, player_health, enemy_health)]  # "No usable items!" - the round is lost
+        outcomes = []
+        if action == "attack":
+            hits = [(probability, enemy_health - damage - self.strength_bonus)
+                    for damage, probability in self.attack_rolls]
+        else:
+            if self.flee_chance > 0:
+                outcomes.append((self.flee_chance, "fled", player_health, enemy_health))
+            hits = [(1 - self.flee_chance, enemy_health)] if self.flee_chance < 1 else []
+        for probability, health in hits:
+            if health <= 0:
+                outcomes.append((probability, "victory", player_health, health))
+            else:
+                self._enemy_attacks(outcomes, probability, player_health, health, self.enemy_rolls)
+        return outcomes
+
+
+class FunctionsCombat(CombatModel):
+    """combat_encounter from the Functions Edition (the shadow creature)"""
+
+    name = "functions"
+    enemy_health = functions_edition.SHADOW_CREATURE_HEALTH
+
+    def __init__(self):
+        self.attack_rolls = _uniform(8, 12)
+        self.enemy_rolls = _uniform(5, 12)
+        self.vicious_rolls = _uniform(8, 15)  # Wounded, it hits 3 harder
+        self.extra_attack_rolls = _uniform(8, 15)  # Punishing a turn wasted looking for a potion
+
+    def round_outcomes(self, player_health, enemy_health, action):
+        outcomes = []
+        if action == "item":
+            self._enemy_attacks(outcomes, 1.0, player_health, enemy_health, self.extra_attack_rolls)
+            return outcomes
+        if action == "attack":
+            hits = [(probability, enemy_health - damage) for damage, probability in self.attack_rolls]
+        else:
+            flee_chance = 0.3 if player_health < 30 else 0.5
+            outcomes.append((flee_chance, "fled", player_health, enemy_health))
+            hits = [(1 - flee_chance, enemy_health)]
+        for probability, health in hits:
+            if health <= 0:
+                outcomes.append((probability, "victory", player_health, health))
+            else:
+                self._enemy_attacks(outcomes, probability, player_health, health,
+                                    self.vicious_rolls if health <= 15 else self.enemy_rolls)
+        return outcomes
+
+
+class GuiCombat(CombatModel):
+    """combat_action from the GUI edition"""
+
+    name = "gui"
+    enemy_health = 25
+
+    def __init__(self):
+        self.attack_rolls = _uniform(8, 15)
+        self.enemy_rolls = _uniform(5, 12)
+
+    def round_outcomes(self, player_health, enemy_health, action):
+        outcomes = []
+        if action == "attack":
+            hits = [(probability, enemy_health - damage) for damage, probability in self.attack_rolls]
+        elif action == "item":
+            hits = [(1.0, enemy_health)]
+        else:
+            outcomes.append((0.6, "fled", player_health, enemy_health))
+            hits = [(0.4, enemy_health)]
+        for probability, health in hits:
+            if health <= 0:
+                outcomes.append((probability, "victory", player_health, health))
+            else:
+                self._enemy_attacks(outcomes, probability, player_health, health, self.enemy_rolls)
+        return outcomes
+
+
+COMBAT_MODELS = {
+    "data_structures": DataStructuresCombat,
+    "functions": FunctionsCombat,
+    "gui": GuiCombat
+}
+
+
+# SOLVER
+
+class CombatSolver:
+    """Class for the exact odds of a fight fought with a fixed policy
+
+    The fight is a Markov chain over (player_health, enemy_health, round)
+    states. The odds from each state are the chance-weighted odds of the
+    states one round later. They are filled in from the last round back to
+    the first (no recursion, so max_rounds can be large) and kept, so each
+    state is worked out once however many starting points share it. The
+    policy is an action name or policy(player_health, enemy_health, round)
+    -> action (rounds count from 1, like "Battle Round 1"). A fight still
+    going after max_rounds is counted as unresolved.
+    """
+
+    def __init__(self, model, policy="attack", max_rounds=100):
+        self.model = model
+        self.policy = policy
+        self.max_rounds = max_rounds
+        self._solved = {}  # (player_health, enemy_health, rounds_fought) -> odds
+
+    def _action(self, player_health, enemy_health, battle_round):
+        """Get the policy's action"""
+        if isinstance(self.policy, str):
+            return self.policy
+        return self.policy(player_health, enemy_health, battle_round)
+
+    def _solve_state(self, player_health, enemy_health, rounds_fought):
+        """Get (victory, defeat, fled, expected rounds left) from a state
+
+        First the unsolved states the fight can reach are listed round by
+        round, then their odds are filled in from the latest round back.
+        """
+        solved = self._solved
+        start = (player_health, enemy_health, rounds_fought)
+        rounds = []  # [{state: outcomes}] for each round still to solve
+        states = set() if start in solved else {start}
+        while states:
+            outcomes_by_state = {}
+            next_states = set()
+            for state in states:
+                health, enemy, fought = state
+                if fought >= self.max_rounds:
+                    solved[state] = (0.0, 0.0, 0.0, 0.0)
+                    continue
+                outcomes = self.model.round_outcomes(health, enemy, self._action(health, enemy, fought + 1))
+                outcomes_by_state[state] = outcomes
+                for _, result, next_player, next_enemy in outcomes:
+                    if result is None and (next_player, next_enemy, fought + 1) not in solved:
+                        next_states.add((next_player, next_enemy, fought + 1))
+            rounds.append(outcomes_by_state)
+            states = next_states
+
+        for outcomes_by_state in reversed(rounds):
+            for (health, enemy, fought), outcomes in outcomes_by_state.items():
+                victory = defeat = fled = expected_rounds = 0.0
+                for probability, result, next_player, next_enemy in outcomes:
+                    expected_rounds += probability
+                    if result == "victory":
+                        victory += probability
+                    elif result == "defeat":
+                        defeat += probability
+                    elif result == "fled":
+                        fled += probability
+                    else:
+                        odds = solved[(next_player, next_enemy, fought + 1)]
+                        victory += probability * odds[0]
+                        defeat += probability * odds[1]
+                        fled += probability * odds[2]
+                        expected_rounds += probability * odds[3]
+                solved[(health, enemy, fought)] = (victory, defeat, fled, expected_rounds)
+        return solved[start]
+
+    def odds(self, player_health, enemy_health=None):
+        """Get (victory, defeat, fled, expected rounds) of a fight starting here"""
+        if enemy_health is None:
+            enemy_health = self.model.enemy_health
+        return self._solve_state(player_health, enemy_health, 0)
+
+    def health_distribution(self, player_health, enemy_health=None):
+        """Get {player health: probability} at the end of the fight, by result
+
+        Works forward round by round from the starting state, so the
+        probabilities add up to the odds of each result.
+        """
+        if enemy_health is None:
+            enemy_health = self.model.enemy_health
+        distribution = {result: {} for result in RESULTS}
+        states = {(player_health, enemy_health): 1.0}
+        for battle_round in range(1, self.max_rounds + 1):
+            next_states = {}
+            for (health, enemy), state_probability in states.items():
+                action = self._action(health, enemy, battle_round)
+                for probability, result, next_player, next_enemy in self.model.round_outcomes(health, enemy, action):
+                    probability *= state_probability
+                    if result is None:
+                        key = (next_player, next_enemy)
+                        next_states[key] = next_states.get(key, 0.0) + probability
+                    else:
+                        healths = distribution[result]
+                        healths[next_player] = healths.get(next_player, 0.0) + probability
+            states = next_states
+            if not states:
+                break
+        return {result: dict(sorted(healths.items())) for result, healths in distribution.items()}
+
+    def solve(self, player_health, enemy_health=None):
+        """Get the full odds of a fight as a dictionary"""
+        victory, defeat, fled, rounds = self.odds(player_health, enemy_health)
+        return {
+            "victory": victory,
+            "defeat": defeat,
+            "fled": fled,
+            "unresolved": max(0.0, 1 - victory - defeat - fled),
+            "expected_rounds": rounds,
+            "health_distribution": self.health_distribution(player_health, enemy_health)
+        }
+
+    def table(self, max_health=None):
+        """Get {starting player health: (victory, defeat, fled, expected rounds)} for every health"""
+        max_health = max_health or self.model.max_health
+        return {health: self.odds(health) for health in range(1, max_health + 1)}
+
+
+def combat_odds(edition="data_structures", player_health=100, policy="attack", **model_options):
+    """Get the full odds of one edition's fight (see CombatSolver.solve)"""
+    solver = CombatSolver(COMBAT_MODELS[edition](**model_options), policy)
+    return solver.solve(player_health)
+
+
+# BENCHMARK
+
+def _play_data_structures_fight(rng, action, player_health):
+    """Fight the Data Structures Edition shadow creature with combat_system"""
+    player_stats = data_structures_edition.create_player_stats()
+    player_stats['health'] = player_health
+    choice = {"attack": "1", "item": "2", "flee": "3"}[action]
+    return data_structures_edition.combat_system(player_stats, dict(data_structures_edition.SHADOW_CREATURE),
+                                                 lambda prompt, choices: choice, rng, silent)
+
+
+def _play_functions_fight(rng, action, player_health):
+    """Fight the Functions Edition shadow creature with combat_encounter"""
+    game_state = {'health': player_health, 'energy': 100, 'inventory': [], 'score': 0}
+    combat = {'enemy_health': functions_edition.SHADOW_CREATURE_HEALTH, 'round': 0}
+    choice = {"attack": "1", "item": "2", "flee": "3"}[action]
+    while True:
+        result = functions_edition.combat_encounter(game_state, combat, choice, rng, silent)
+        if result is not None:
+            return {"combat_victory": "victory", "combat_death": "defeat", "fled_combat": "fled"}[result]
+
+
+def benchmark_combat_odds(player_health=20, fights=20000, seed=0):
+    """Time the full odds tables and check them against fights played by the games
+
+    Shows the odds at player_health next to the share of fights lost when
+    combat_system and combat_encounter really play them from there.
+    """
+    print(f"\nOdds at {player_health} health; played = {fights:,} fights through the game's own combat")
+    print(f"{'Edition':<17} {'Policy':<8} {'Table ms':<10} {'Victory':<9} {'Defeat':<9} {'Fled':<9} "
+          f"{'Rounds':<8} {'Played defeat':<15}")
+    players = {"data_structures": _play_data_structures_fight, "functions": _play_functions_fight}
+    results = {}
+    for name, model_class in COMBAT_MODELS.items():
+        for policy in ("attack", "flee"):
+            start = time.perf_counter()
+            solver = CombatSolver(model_class(), policy)
+            table = solver.table()
+            elapsed = time.perf_counter() - start
+            victory, defeat, fled, rounds = table[player_health]
+
+            played = ""
+            if name in players:
+                rng = random.Random(seed)
+                losses = sum(players[name](rng, policy, player_health) == "defeat" for _ in range(fights))
+                played = f"{losses / fights:.4f}"
+            results[(name, policy)] = {"table_seconds": elapsed, "victory": victory, "defeat": defeat,
+                                       "fled": fled, "expected_rounds": rounds}
+            print(f"{name:<17} {policy:<8} {elapsed * 1000:<10.1f} {victory:<9.4f} {defeat:<9.4f} {fled:<9.4f} "
+                  f"{rounds:<8.2f} {played:<15}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_combat_odds()
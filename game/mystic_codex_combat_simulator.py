@@ -0,0 +1,153 @@
+# THE MYSTIC FOREST ADVENTURE - COMBAT SIMULATOR
+# Millions of Data Structures Edition fights at once, as NumPy arrays instead of one Python loop each
+
+import random
+import time
+import numpy as np
+import mystic_codex_data_structures as data_structures_edition
+from mystic_codex_combat_odds import CombatSolver, DataStructuresCombat
+from mystic_codex_engine import silent
+
+# Action codes for vectorized policies
+ATTACK, ITEM, FLEE = 0, 1, 2
+ACTION_CODES = {"attack": ATTACK, "item": ITEM, "flee": FLEE}
+
+# Result codes
+ONGOING, VICTORY, DEFEAT, FLED = 0, 1, 2, 3
+RESULT_NAMES = {VICTORY: "victory", DEFEAT: "defeat", FLED: "fled", ONGOING: "unresolved"}
+
+CHUNK_SIZE = 1_000_000  # Fights simulated together - bounds the memory to a few tens of MB
+
+
+def _simulate_chunk(rng, fights, player_stats, enemy_data, policy, max_rounds):
+    """Simulate fights fights side by side and return (results, final player health, rounds)"""
+    strength_bonus = player_stats['strength'] // 2
+    flee_chance = (player_stats['luck'] + 5) / 20
+    player_health = np.full(fights, player_stats['health'], dtype=np.int32)
+    enemy_health = np.full(fights, enemy_data['health'], dtype=np.int32)
+    results = np.zeros(fights, dtype=np.int8)
+    rounds = np.zeros(fights, dtype=np.int32)
+    active = np.flatnonzero((player_health > 0) & (enemy_health > 0))  # Fights still going
+
+    for battle_round in range(1, max_rounds + 1):
+        if active.size == 0:
+            break
+        rounds[active] = battle_round
+        health = player_health[active]
+        enemy = enemy_health[active]
+
+        if isinstance(policy, str):
+            actions = np.full(active.size, ACTION_CODES[policy], dtype=np.int8)
+        else:
+            actions = np.asarray(policy(health, enemy, battle_round), dtype=np.int8)
+
+        # Attack: 5-10 damage plus the strength bonus
+        attacking = actions == ATTACK
+        damage = rng.integers(5, 11, size=active.size, dtype=np.int32) + strength_bonus
+        enemy = np.where(attacking, enemy - damage, enemy)
+        won = attacking & (enemy <= 0)
+
+        # Flee: a luck-based chance to get away
+        fled = (actions == FLEE) & (rng.random(active.size) < flee_chance)
+
+        # The enemy hits back unless the fight just ended or the round went on an item
+        # that wasn't there ("No usable items!" starts the next round straight away)
+        hit = ~won & ~fled & (actions != ITEM)
+        enemy_damage = rng.integers(enemy_data['min_damage'], enemy_data['max_damage'] + 1,
+                                    size=active.size, dtype=np.int32)
+        health = np.where(hit, np.maximum(0, health - enemy_damage), health)
+        lost = hit & (health <= 0)
+
+        player_health[active] = health
+        enemy_health[active] = enemy
+        outcome = np.select([won, lost, fled], [VICTORY, DEFEAT, FLED], ONGOING).astype(np.int8)
+        results[active] = outcome
+        active = active[outcome == ONGOING]
+
+    return results, player_health, rounds
+
+
+def simulate_combats(fights, player_stats=None, enemy_data=None, policy="attack", seed=None,
+                     max_rounds=100, chunk_size=CHUNK_SIZE):
+    """Simulate fights independent combat_system fights and summarize them
+
+    player_stats (health, strength, luck, max_health) and enemy_data
+    (health, min_damage, max_damage) default to a new player against the
+    shadow creature. The policy is an action name or
+    policy(player_health, enemy_health, battle_round) -> array of action
+    codes (ATTACK, ITEM, FLEE) for the fights still going. Like the exact
+    solver in mystic_codex_combat_odds, "item" means there is nothing to
+    use and experience and level ups are left out.
+
+    Returns the count of each result, the mean rounds and, for each result,
+    a histogram of the player's remaining health (index = health).
+    """
+    player_stats = player_stats or data_structures_edition.create_player_stats()
+    enemy_data = enemy_data or data_structures_edition.SHADOW_CREATURE
+    rng = np.random.default_rng(seed)
+    histogram_size = max(player_stats['max_health'], player_stats['health']) + 1
+    counts = {name: 0 for name in RESULT_NAMES.values()}
+    histograms = {name: np.zeros(histogram_size, dtype=np.int64) for name in RESULT_NAMES.values()}
+    total_rounds = 0
+
+    for start in range(0, fights, chunk_size):
+        results, health, rounds = _simulate_chunk(rng, min(chunk_size, fights - start), player_stats,
+                                                  enemy_data, policy, max_rounds)
+        total_rounds += int(rounds.sum())
+        for code, name in RESULT_NAMES.items():
+            finished = results == code
+            counts[name] += int(np.count_nonzero(finished))
+            histograms[name] += np.bincount(health[finished], minlength=histogram_size)
+
+    return {
+        "fights": fights,
+        "counts": counts,
+        "mean_rounds": total_rounds / fights if fights else 0.0,
+        "health_histograms": histograms
+    }
+
+
+# BENCHMARK
+
+def benchmark_combat_simulator(fights=10_000_000, python_fights=50_000, player_health=20, seed=0):
+    """Time fights vectorized fights against playing them one by one with combat_system
+
+    Also checks the simulated result shares against the exact odds.
+    """
+    player_stats = data_structures_edition.create_player_stats()
+    player_stats['health'] = player_health
+
+    print(f"\ncombat_system fights from {player_health} health against the shadow creature")
+    print(f"{'Policy':<8} {'Engine':<10} {'Fights':<12} {'Seconds':<9} {'Fights/s':<13} "
+          f"{'Victory':<9} {'Defeat':<9} {'Fled':<9} {'Exact defeat':<12}")
+    results = {}
+    for policy in ("attack", "flee"):
+        start = time.perf_counter()
+        summary = simulate_combats(fights, player_stats, policy=policy, seed=seed)
+        vectorized_seconds = time.perf_counter() - start
+
+        rng = random.Random(seed)
+        choice = {"attack": "1", "flee": "3"}[policy]
+        python_counts = {"victory": 0, "defeat": 0, "fled": 0}
+        start = time.perf_counter()
+        for _ in range(python_fights):
+            fighter = dict(player_stats, inventory={}, game_history=[])
+            result = data_structures_edition.combat_system(
+                fighter, dict(data_structures_edition.SHADOW_CREATURE), lambda prompt, choices: choice, rng, silent)
+            python_counts[result] += 1
+        python_seconds = time.perf_counter() - start
+
+        exact = CombatSolver(DataStructuresCombat(player_stats), policy).odds(player_health)
+        for engine, count, seconds, counts in (("numpy", fights, vectorized_seconds, summary["counts"]),
+                                               ("python", python_fights, python_seconds, python_counts)):
+            print(f"{policy:<8} {engine:<10} {count:<12,} {seconds:<9.2f} {count / seconds:<13,.0f} "
+                  f"{counts['victory'] / count:<9.4f} {counts['defeat'] / count:<9.4f} "
+                  f"{counts['fled'] / count:<9.4f} {exact[1]:<12.4f}")
+        results[policy] = {"vectorized_seconds": vectorized_seconds,
+                           "speedup": (fights / vectorized_seconds) / (python_fights / python_seconds),
+                           "counts": summary["counts"]}
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_combat_simulator()
@@ -0,0 +1,193 @@
+# THE MYSTIC FOREST ADVENTURE - CONFIGURATION CACHE
+# config.json is parsed once and only read again when the file actually changes
+
+import json
+import os
+import threading
+
+_UNREADABLE = object()  # Returned by the loader when the file can't be parsed
+
+
+def _read_json(filepath, default_data=None):
+    """Default loader used when no load function is supplied"""
+    try:
+        with open(filepath, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return default_data
+
+
+def _write_json(filepath, data):
+    """Default writer used when no save function is supplied"""
+    with open(filepath, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2, ensure_ascii=False)
+    return True
+
+
+def merge_with_defaults(defaults, overrides):
+    """Lay overrides over the defaults, keeping each setting's default type
+
+    A value whose type doesn't match the default (like "yes" for a True/False
+    setting) is ignored so the rest of the game can trust the types. Extra keys
+    are kept as they are.
+    """
+    config = dict(defaults)
+    if not isinstance(overrides, dict):
+        return config
+
+    for key, value in overrides.items():
+        default = defaults.get(key)
+        if key not in defaults or default is None:
+            config[key] = value
+        elif isinstance(default, bool):
+            if isinstance(value, bool):
+                config[key] = value
+        elif isinstance(default, int):
+            if isinstance(value, int) and not isinstance(value, bool):
+                config[key] = value
+        elif isinstance(value, type(default)):
+            config[key] = value
+    return config
+
+
+class ConfigCache:
+    """Class to keep the merged configuration in memory
+
+    get() only looks at the file's size and modification time (an os.stat, no
+    read) and parses the file again when they changed. An optional watcher
+    thread polls the same signature and calls subscribers with the new
+    configuration, so edits made outside the game take effect while it runs.
+
+    Stores that don't keep the configuration in a file pass their own
+    load/save functions and a signature_function that returns something
+    which changes whenever the stored configuration does. The watcher reads
+    with watch_load_function (load_function if not given), which should
+    print nothing, since it runs while the player may be typing at a prompt.
+    """
+
+    def __init__(self, config_file, defaults, load_function=None, save_function=None,
+                 signature_function=None, watch_load_function=None):
+        self.config_file = config_file
+        self.defaults = dict(defaults)
+        self.load_function = load_function or _read_json
+        self.watch_load_function = watch_load_function or self.load_function
+        self.save_function = save_function or _write_json
+        self.signature_function = signature_function or self._file_signature
+        self._lock = threading.RLock()
+        self._config = None
+        self._signature = None
+        self._subscribers = []
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        self.reloads = 0
+
+    def _file_signature(self):
+        """Get (mtime_ns, size) of the config file, or None if it doesn't exist"""
+        try:
+            stat_result = os.stat(self.config_file)
+        except FileNotFoundError:
+            return None
+        return (stat_result.st_mtime_ns, stat_result.st_size)
+
+    def _refresh(self, load_function=None):
+        """Reparse the file if it changed; return True if the settings are different now"""
+        signature = self.signature_function()
+        with self._lock:
+            if self._config is not None and signature == self._signature:
+                return False
+            previous = self._config
+            data = (load_function or self.load_function)(self.config_file, _UNREADABLE)
+            if data is _UNREADABLE:
+                if signature is not None and previous is not None:
+                    # Probably caught halfway through an outside edit - keep the
+                    # current settings and try again on the next check
+                    self._signature = None
+                    return False
+                data = {}
+            self._config = merge_with_defaults(self.defaults, data)
+            self._signature = signature
+            self.reloads += 1
+            return previous is not None and previous != self._config
+
+    # PUBLIC API
+
+    def get(self):
+        """Get a copy of the current configuration"""
+        self._refresh()
+        with self._lock:
+            return dict(self._config)
+
+    def get_setting(self, key, default=None):
+        """Get one setting without copying the whole configuration"""
+        self._refresh()
+        with self._lock:
+            return self._config.get(key, default)
+
+    def save(self, config):
+        """Save a full configuration and make it the cached one"""
+        with self._lock:
+            merged = merge_with_defaults(self.defaults, config)
+            saved = self.save_function(self.config_file, merged)
+            if saved:
+                self._config = merged
+                # The write may still be on its way, so keep the old signature;
+                # the next change we see is our own write and reparses once
+        return saved
+
+    def update(self, key, value):
+        """Change a single setting with one save"""
+        with self._lock:
+            self._refresh()
+            config = dict(self._config)
+            config[key] = value
+            return self.save(config)
+
+    def reset(self):
+        """Forget the cached configuration (used after the data files are deleted)"""
+        with self._lock:
+            self._config = None
+            self._signature = None
+
+    # LIVE RELOAD
+
+    def subscribe(self, callback):
+        """Call callback(config) whenever the watcher sees the file change"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop notifying a subscriber"""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def start_watching(self, interval=1.0):
+        """Start the polling watcher thread (does nothing if it already runs)"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,),
+                                         name="config-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """Stop the watcher thread"""
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self, interval):
+        """Watcher thread main loop"""
+        while not self._stop_watching.wait(interval):
+            try:
+                changed = self._refresh(self.watch_load_function)
+            except Exception as e:
+                print(f"❌ Error reloading {self.config_file.name}: {e}")
+                continue
+            if changed:
+                with self._lock:
+                    config = dict(self._config)
+                    subscribers = list(self._subscribers)
+                for callback in subscribers:
+                    callback(config)
@@ -142,6 +142,18 @@ LOCATIONS_DATABASE = {
     }
 }
 
+# ENEMIES DATABASE - The creature met on dangerous paths
+SHADOW_CREATURE = {
+    "name": "Shadow Creature",
+    "description": "A dark creature emerges from the shadows",
+    "health": 25,
+    "min_damage": 3,
+    "max_damage": 8,
+    "exp_reward": 30,
+    "score_reward": 40,
+    "item_drops": ["shadow_essence"]
+}
+
 # PLAYER PROGRESSION SYSTEM - Dictionary to track player advancement
 PLAYER_PROGRESSION = {
     "level": 1,
@@ -158,12 +170,14 @@ AVAILABLE_ACTIONS = []  # List of current available actions
 QUEST_LOG = []  # List of active quests/objectives
 
 # UTILITY FUNCTIONS - Enhanced with data structure operations
+# Nothing here calls input() or print() directly: choices come in as parameters and
+# text goes out through say (print by default), so game_step() can run headless too.
 
-def display_header(title):
+def display_header(title, say=print):
     """Display a formatted header for different game sections"""
-    print("\n" + "=" * 50)
-    print(f"    {title}")
-    print("=" * 50)
+    say("\n" + "=" * 50)
+    say(f"    {title}")
+    say("=" * 50)
 
 def create_player_stats():
     """Create initial player stats dictionary"""
@@ -181,57 +195,64 @@ def create_player_stats():
         "visited_locations": [],  # List of visited locations
         "game_history": [],  # List of player actions
         "achievements": [],  # List of earned achievements
-        "score": 0
+        "score": 0,
+        # Items still lying in each location - a copy per game, so one game's finds don't empty the next
+        "location_items": {location: list(data['items']) for location, data in LOCATIONS_DATABASE.items()},
+        # Where the game is up to, so game_step knows what the next choice means
+        "phase": None,
+        "ending": None,
+        "combat": None,
+        "offered_items": []
     }
 
-def display_stats(player_stats):
+def display_stats(player_stats, say=print):
     """Display current player stats using dictionary access"""
-    print("\n--- Player Stats ---")
-    print(f"Health: {player_stats['health']}/{player_stats['max_health']}")
-    print(f"Energy: {player_stats['energy']}/{player_stats['max_energy']}")
-    print(f"Strength: {player_stats['strength']}")
-    print(f"Luck: {player_stats['luck']}")
-    print(f"Level: {player_stats['level']} (XP: {player_stats['experience']})")
-    print(f"Location: {LOCATIONS_DATABASE[player_stats['current_location']]['name']}")
-    print(f"Score: {player_stats['score']}")
-    print("--------------------")
-
-def display_inventory(player_stats):
+    say("\n--- Player Stats ---")
+    say(f"Health: {player_stats['health']}/{player_stats['max_health']}")
+    say(f"Energy: {player_stats['energy']}/{player_stats['max_energy']}")
+    say(f"Strength: {player_stats['strength']}")
+    say(f"Luck: {player_stats['luck']}")
+    say(f"Level: {player_stats['level']} (XP: {player_stats['experience']})")
+    say(f"Location: {LOCATIONS_DATABASE[player_stats['current_location']]['name']}")
+    say(f"Score: {player_stats['score']}")
+    say("--------------------")
+
+def display_inventory(player_stats, say=print):
     """Display inventory using dictionary operations"""
     inventory = player_stats['inventory']
     if not inventory:
-        print("📦 Your inventory is empty.")
+        say("📦 Your inventory is empty.")
         return
-    
-    print("\n📦 Your Inventory:")
-    print("-" * 30)
+
+    say("\n📦 Your Inventory:")
+    say("-" * 30)
     total_value = 0
-    
+
     # Sort items by value (using dictionary comprehension and sorting)
     sorted_items = sorted(inventory.items(), key=lambda x: ITEMS_DATABASE[x[0]]['value'], reverse=True)
-    
+
     for item_id, quantity in sorted_items:
         item_data = ITEMS_DATABASE[item_id]
-        print(f"• {item_data['name']} x{quantity}")
-        print(f"  {item_data['description']}")
-        print(f"  Value: {item_data['value']} each")
+        say(f"• {item_data['name']} x{quantity}")
+        say(f"  {item_data['description']}")
+        say(f"  Value: {item_data['value']} each")
         total_value += item_data['value'] * quantity
-        print()
-    
-    print(f"Total Inventory Value: {total_value} coins")
-    print("-" * 30)
+        say("")
 
-def add_item_to_inventory(player_stats, item_id, quantity=1):
+    say(f"Total Inventory Value: {total_value} coins")
+    say("-" * 30)
+
+def add_item_to_inventory(player_stats, item_id, quantity=1, say=print):
     """Add items to inventory using dictionary operations"""
     if item_id in ITEMS_DATABASE:
         if item_id in player_stats['inventory']:
             player_stats['inventory'][item_id] += quantity
         else:
             player_stats['inventory'][item_id] = quantity
-        
+
         item_name = ITEMS_DATABASE[item_id]['name']
-        print(f"✨ Added {quantity}x {item_name} to inventory!")
-        
+        say(f"✨ Added {quantity}x {item_name} to inventory!")
+
         # Add to game history
         player_stats['game_history'].append(f"Found {item_name}")
         return True
@@ -247,17 +268,17 @@ def remove_item_from_inventory(player_stats, item_id, quantity=1):
             return True
     return False
 
-def use_item(player_stats, item_id):
+def use_item(player_stats, item_id, say=print):
     """Use an item and apply its effects"""
     if item_id not in player_stats['inventory']:
-        print("❌ You don't have that item!")
+        say("❌ You don't have that item!")
         return False
-    
+
     item_data = ITEMS_DATABASE[item_id]
     if not item_data['usable']:
-        print(f"❌ {item_data['name']} cannot be used!")
+        say(f"❌ {item_data['name']} cannot be used!")
         return False
-    
+
     # Apply item effects
     effects = item_data['effect']
     for stat, value in effects.items():
@@ -268,16 +289,16 @@ def use_item(player_stats, item_id):
                 player_stats[stat] = min(player_stats['max_energy'], player_stats[stat] + value)
             else:
                 player_stats[stat] += value
-    
+
     # Remove item from inventory
     remove_item_from_inventory(player_stats, item_id)
-    
-    print(f"✅ Used {item_data['name']}!")
+
+    say(f"✅ Used {item_data['name']}!")
     if effects['health'] > 0:
-        print(f"  Restored {effects['health']} health!")
+        say(f"  Restored {effects['health']} health!")
     if effects['energy'] > 0:
-        print(f"  Restored {effects['energy']} energy!")
-    
+        say(f"  Restored {effects['energy']} energy!")
+
     return True
 
 def validate_input(prompt, valid_choices):
@@ -295,11 +316,15 @@ def get_available_actions(player_stats):
     location_data = LOCATIONS_DATABASE[current_location]
     return location_data['available_actions'].copy()
 
-def add_experience(player_stats, exp_amount):
+def get_usable_items(player_stats):
+    """Get the inventory items that can be used, using a list comprehension"""
+    return [item for item in player_stats['inventory'] if ITEMS_DATABASE[item]['usable']]
+
+def add_experience(player_stats, exp_amount, say=print):
     """Add experience and handle level ups"""
     player_stats['experience'] += exp_amount
-    print(f"📈 Gained {exp_amount} experience!")
-    
+    say(f"📈 Gained {exp_amount} experience!")
+
     # Check for level up
     exp_needed = player_stats['level'] * 100
     if player_stats['experience'] >= exp_needed:
@@ -310,190 +335,227 @@ def add_experience(player_stats, exp_amount):
         player_stats['strength'] += 2
         player_stats['health'] = player_stats['max_health']
         player_stats['energy'] = player_stats['max_energy']
-        print(f"🎉 LEVEL UP! You are now level {player_stats['level']}!")
-        print("💪 Your stats have increased!")
+        say(f"🎉 LEVEL UP! You are now level {player_stats['level']}!")
+        say("💪 Your stats have increased!")
 
-def check_achievements(player_stats):
+def check_achievements(player_stats, say=print):
     """Check and award achievements based on player actions"""
     achievements = []
-    
+
     # Achievement: First Steps
     if len(player_stats['visited_locations']) >= 3 and "explorer" not in player_stats['achievements']:
         achievements.append("explorer")
-        print("🏆 Achievement Unlocked: Explorer - Visit 3 different locations")
-    
+        say("🏆 Achievement Unlocked: Explorer - Visit 3 different locations")
+
     # Achievement: Collector
     if len(player_stats['inventory']) >= 5 and "collector" not in player_stats['achievements']:
         achievements.append("collector")
-        print("🏆 Achievement Unlocked: Collector - Collect 5 different items")
-    
+        say("🏆 Achievement Unlocked: Collector - Collect 5 different items")
+
     # Achievement: Survivor
     if player_stats['health'] <= 20 and "survivor" not in player_stats['achievements']:
         achievements.append("survivor")
-        print("🏆 Achievement Unlocked: Survivor - Survive with low health")
-    
+        say("🏆 Achievement Unlocked: Survivor - Survive with low health")
+
     # Add new achievements to player stats
     player_stats['achievements'].extend(achievements)
     return achievements
 
-def search_location_for_items(player_stats):
+def search_location_for_items(player_stats, rng=random, say=print):
     """Search current location for items using list operations"""
     current_location = player_stats['current_location']
-    location_data = LOCATIONS_DATABASE[current_location]
-    available_items = location_data['items'].copy()
-    
+    location_items = player_stats['location_items'][current_location]
+    available_items = location_items.copy()
+
     if not available_items:
-        print("🔍 You search the area but find nothing of interest.")
+        say("🔍 You search the area but find nothing of interest.")
         return
-    
-    print("🔍 You search the area carefully...")
-    
+
+    say("🔍 You search the area carefully...")
+
     # Random chance to find items based on luck
-    search_success = random.randint(1, 10) <= (player_stats['luck'] + 3)
-    
+    search_success = rng.randint(1, 10) <= (player_stats['luck'] + 3)
+
     if search_success and available_items:
-        found_item = random.choice(available_items)
-        add_item_to_inventory(player_stats, found_item)
-        add_experience(player_stats, 10)
-        
+        found_item = rng.choice(available_items)
+        add_item_to_inventory(player_stats, found_item, say=say)
+        add_experience(player_stats, 10, say)
+
         # Remove item from location (simulating that it's been taken)
-        location_data['items'].remove(found_item)
+        location_items.remove(found_item)
     else:
-        print("🚫 Your search yields nothing useful.")
+        say("🚫 Your search yields nothing useful.")
 
-def move_to_location(player_stats, new_location):
+def move_to_location(player_stats, new_location, say=print):
     """Move player to a new location and update history"""
     if new_location in LOCATIONS_DATABASE:
         old_location = player_stats['current_location']
         player_stats['current_location'] = new_location
-        
+
         # Add to visited locations if not already visited
         if new_location not in player_stats['visited_locations']:
             player_stats['visited_locations'].append(new_location)
-            add_experience(player_stats, 15)
-        
+            add_experience(player_stats, 15, say)
+
         # Add to game history
         location_name = LOCATIONS_DATABASE[new_location]['name']
         player_stats['game_history'].append(f"Moved to {location_name}")
-        
-        print(f"🚶 You move to {location_name}")
-        print(f"📖 {LOCATIONS_DATABASE[new_location]['description']}")
-        
+
+        say(f"🚶 You move to {location_name}")
+        say(f"📖 {LOCATIONS_DATABASE[new_location]['description']}")
+
         return True
     else:
-        print(f"❌ Location '{new_location}' not found!")
+        say(f"❌ Location '{new_location}' not found!")
         return False
 
-def show_location_info(player_stats):
+def show_location_info(player_stats, say=print):
     """Display current location information"""
     current_location = player_stats['current_location']
     location_data = LOCATIONS_DATABASE[current_location]
-    
-    print(f"\n🌍 Current Location: {location_data['name']}")
-    print(f"📖 {location_data['description']}")
-    print(f"⚠️ Danger Level: {location_data['danger_level']}/5")
-    
+
+    say(f"\n🌍 Current Location: {location_data['name']}")
+    say(f"📖 {location_data['description']}")
+    say(f"⚠️ Danger Level: {location_data['danger_level']}/5")
+
     # Show available actions
     actions = get_available_actions(player_stats)
-    print(f"🎯 Available Actions: {', '.join(actions)}")
-    
+    say(f"🎯 Available Actions: {', '.join(actions)}")
+
     # Show connected areas
     connected = location_data['connected_areas']
     if connected:
-        print(f"🗺️ Connected Areas: {', '.join(connected)}")
-
-def combat_system(player_stats, enemy_data):
-    """Enhanced combat system using dictionaries for enemy data"""
-    print(f"\n⚔️ Combat with {enemy_data['name']}!")
-    print(f"📖 {enemy_data['description']}")
-    
-    enemy_health = enemy_data['health']
-    battle_round = 0
-    
-    while player_stats['health'] > 0 and enemy_health > 0:
-        battle_round += 1
-        print(f"\n🥊 Battle Round {battle_round}")
-        print(f"Your Health: {player_stats['health']} | Enemy Health: {enemy_health}")
-        
-        # Available combat actions
-        combat_actions = ["attack", "use_item", "flee"]
-        print("\nCombat Actions:")
-        print("1. Attack")
-        print("2. Use Item")
-        print("3. Try to Flee")
-        
-        choice = validate_input("Choose action (1-3): ", ["1", "2", "3"])
-        
-        if choice == "1":
-            # Attack calculation using player strength
-            base_damage = random.randint(5, 10)
-            strength_bonus = player_stats['strength'] // 2
-            total_damage = base_damage + strength_bonus
-            
-            enemy_health -= total_damage
-            print(f"⚔️ You deal {total_damage} damage!")
-            add_experience(player_stats, 5)
-            
-        elif choice == "2":
-            # Show usable items
-            usable_items = [item for item in player_stats['inventory'] 
-                          if ITEMS_DATABASE[item]['usable']]
-            
-            if not usable_items:
-                print("❌ No usable items!")
-                continue
-            
-            print("\nUsable Items:")
-            for i, item in enumerate(usable_items, 1):
-                print(f"{i}. {ITEMS_DATABASE[item]['name']}")
-            
-            try:
-                item_choice = int(input("Choose item (number): ")) - 1
-                if 0 <= item_choice < len(usable_items):
-                    use_item(player_stats, usable_items[item_choice])
-                else:
-                    print("❌ Invalid item choice!")
-                    continue
-            except ValueError:
-                print("❌ Invalid input!")
-                continue
-                
-        elif choice == "3":
-            # Flee chance based on luck and danger level
-            flee_chance = (player_stats['luck'] + 5) / 20
-            if random.random() < flee_chance:
-                print("🏃 You successfully flee from battle!")
-                player_stats['energy'] = max(0, player_stats['energy'] - 15)
-                return "fled"
-            else:
-                print("❌ You couldn't escape!")
-        
-        # Check if enemy is defeated
-        if enemy_health <= 0:
-            print(f"\n🎉 Victory! You defeated the {enemy_data['name']}!")
-            
-            # Rewards
-            exp_reward = enemy_data.get('exp_reward', 25)
-            add_experience(player_stats, exp_reward)
-            
-            # Item drops
-            if 'item_drops' in enemy_data:
-                for item in enemy_data['item_drops']:
-                    add_item_to_inventory(player_stats, item)
-            
-            player_stats['score'] += enemy_data.get('score_reward', 50)
-            return "victory"
-        
-        # Enemy attack
-        if enemy_health > 0:
-            enemy_damage = random.randint(enemy_data['min_damage'], enemy_data['max_damage'])
-            player_stats['health'] = max(0, player_stats['health'] - enemy_damage)
-            print(f"👹 {enemy_data['name']} attacks for {enemy_damage} damage!")
-            
-            if player_stats['health'] <= 0:
-                print(f"\n💀 You have been defeated by the {enemy_data['name']}...")
-                return "defeat"
-    
+        say(f"🗺️ Connected Areas: {', '.join(connected)}")
+
+# COMBAT - One fight as a dictionary, moved forward one action at a time
+
+def start_combat(enemy_data, say=print):
+    """Begin a fight and return its state dictionary"""
+    say(f"\n⚔️ Combat with {enemy_data['name']}!")
+    say(f"📖 {enemy_data['description']}")
+    return {"enemy": enemy_data, "enemy_health": enemy_data['health'], "round": 0, "usable_items": []}
+
+def show_combat_round(player_stats, combat, say=print):
+    """Start the next battle round and show the combat actions"""
+    combat['round'] += 1
+    say(f"\n🥊 Battle Round {combat['round']}")
+    say(f"Your Health: {player_stats['health']} | Enemy Health: {combat['enemy_health']}")
+
+    # Available combat actions
+    say("\nCombat Actions:")
+    say("1. Attack")
+    say("2. Use Item")
+    say("3. Try to Flee")
+
+def combat_round(player_stats, combat, action, rng=random, say=print):
+    """Handle one combat action ("1"-"3")
+
+    Returns "victory", "defeat" or "fled" when the fight is over, "choose_item"
+    when the player must pick an item (answer with combat_item_choice), or
+    None when the next round begins.
+    """
+    if action == "1":
+        # Attack calculation using player strength
+        base_damage = rng.randint(5, 10)
+        strength_bonus = player_stats['strength'] // 2
+        total_damage = base_damage + strength_bonus
+
+        combat['enemy_health'] -= total_damage
+        say(f"⚔️ You deal {total_damage} damage!")
+        add_experience(player_stats, 5, say)
+
+    elif action == "2":
+        # Show usable items
+        combat['usable_items'] = get_usable_items(player_stats)
+
+        if not combat['usable_items']:
+            say("❌ No usable items!")
+            return None
+
+        say("\nUsable Items:")
+        for i, item in enumerate(combat['usable_items'], 1):
+            say(f"{i}. {ITEMS_DATABASE[item]['name']}")
+        return "choose_item"
+
+    elif action == "3":
+        # Flee chance based on luck and danger level
+        flee_chance = (player_stats['luck'] + 5) / 20
+        if rng.random() < flee_chance:
+            say("🏃 You successfully flee from battle!")
+            player_stats['energy'] = max(0, player_stats['energy'] - 15)
+            return "fled"
+        else:
+            say("❌ You couldn't escape!")
+
+    return _end_combat_round(player_stats, combat, rng, say)
+
+def combat_item_choice(player_stats, combat, answer, rng=random, say=print):
+    """Use the item picked (by number) during a fight - returns like combat_round"""
+    try:
+        item_choice = int(answer) - 1
+    except ValueError:
+        say("❌ Invalid input!")
+        return None
+    if not 0 <= item_choice < len(combat['usable_items']):
+        say("❌ Invalid item choice!")
+        return None
+    use_item(player_stats, combat['usable_items'][item_choice], say)
+    return _end_combat_round(player_stats, combat, rng, say)
+
+def _end_combat_round(player_stats, combat, rng, say):
+    """Check for victory, then let the enemy attack"""
+    enemy_data = combat['enemy']
+
+    # Check if enemy is defeated
+    if combat['enemy_health'] <= 0:
+        say(f"\n🎉 Victory! You defeated the {enemy_data['name']}!")
+
+        # Rewards
+        exp_reward = enemy_data.get('exp_reward', 25)
+        add_experience(player_stats, exp_reward, say)
+
+        # Item drops
+        if 'item_drops' in enemy_data:
+            for item in enemy_data['item_drops']:
+                add_item_to_inventory(player_stats, item, say=say)
+
+        player_stats['score'] += enemy_data.get('score_reward', 50)
+        return "victory"
+
+    # Enemy attack
+    enemy_damage = rng.randint(enemy_data['min_damage'], enemy_data['max_damage'])
+    player_stats['health'] = max(0, player_stats['health'] - enemy_damage)
+    say(f"👹 {enemy_data['name']} attacks for {enemy_damage} damage!")
+
+    if player_stats['health'] <= 0:
+        say(f"\n💀 You have been defeated by the {enemy_data['name']}...")
+        return "defeat"
+    return None
+
+def _ask(prompt, valid_choices):
+    """Ask at the console - a menu choice, or free text when valid_choices is None"""
+    if valid_choices is None:
+        return input(prompt)
+    return validate_input(prompt, valid_choices)
+
+def combat_system(player_stats, enemy_data, choose=None, rng=random, say=print):
+    """Enhanced combat system using dictionaries for enemy data
+
+    Runs a whole fight. choose(prompt, valid_choices) supplies each action
+    (valid_choices is None for the free-text item number); by default the
+    player is asked at the console.
+    """
+    choose = choose or _ask
+    combat = start_combat(enemy_data, say)
+
+    while player_stats['health'] > 0 and combat['enemy_health'] > 0:
+        show_combat_round(player_stats, combat, say)
+        result = combat_round(player_stats, combat, choose("Choose action (1-3): ", ["1", "2", "3"]), rng, say)
+        if result == "choose_item":
+            result = combat_item_choice(player_stats, combat, choose("Choose item (number): ", None), rng, say)
+        if result is not None:
+            return result
+
     return "ongoing"
 
 def puzzle_challenge(player_stats):
@@ -515,20 +577,20 @@ def puzzle_challenge(player_stats):
             "answer": lambda q: "map"
         }
     ]
-    
+
     puzzle = random.choice(puzzles)
     question = puzzle["question"]()
-    
+
     print(f"\n🧩 Puzzle Challenge!")
     print(f"📝 {question}")
-    
+
     attempts = 0
     max_attempts = 3
-    
+
     while attempts < max_attempts:
         attempts += 1
         print(f"\n🔢 Attempt {attempts}/{max_attempts}")
-        
+
         try:
             if puzzle["type"] == "math":
                 player_answer = int(input("Your answer: "))
@@ -536,7 +598,7 @@ def puzzle_challenge(player_stats):
             else:
                 player_answer = input("Your answer: ").lower().strip()
                 correct_answer = puzzle["answer"](question)
-            
+
             if player_answer == correct_answer:
                 print("✅ Correct! Well done!")
                 add_experience(player_stats, 20)
@@ -546,200 +608,289 @@ def puzzle_challenge(player_stats):
                 print(f"❌ Incorrect!")
                 if attempts < max_attempts:
                     print("Try again...")
-                    
+
         except ValueError:
             print("❌ Invalid input!")
             attempts -= 1
-    
+
     print("🔨 You couldn't solve the puzzle, but you find another way forward.")
     player_stats['energy'] = max(0, player_stats['energy'] - 10)
     return False
 
+# GAME FLOW - One adventure as a state machine, moved forward one choice at a time
+
+MENU_PHASES = ["action", "combat"]  # Answered from a fixed menu; the other phases take a number as text
+
+def start_game(rng=random, say=print):
+    """Start a new adventure and return the player stats, waiting for the first action"""
+    player_stats = create_player_stats()
+
+    # Game introduction
+    say("\n🌲 Welcome to the Mystic Forest!")
+    say("You wake up in a mysterious forest with no memory of how you got here.")
+    say("Use your wits and the items you find to escape safely...")
+
+    _start_turn(player_stats, say)
+    return player_stats
+
+def game_prompt(player_stats):
+    """Get what the game is waiting for: (prompt, choices), or (None, None) once it is over
+
+    The choices are the answers that do something. In the menu phases
+    anything else is refused; the numbered-list phases take any text and
+    answer nonsense the way the console game always has.
+    """
+    phase = player_stats['phase']
+    if phase == "action":
+        return "Choose action (1-7): ", ["1", "2", "3", "4", "5", "6", "7"]
+    if phase == "destination":
+        connected_areas = LOCATIONS_DATABASE[player_stats['current_location']]['connected_areas']
+        return "Choose destination: ", [str(i) for i in range(1, len(connected_areas) + 1)]
+    if phase == "use_item":
+        return "Choose item to use: ", [str(i) for i in range(1, len(player_stats['offered_items']) + 1)]
+    if phase == "combat":
+        return "Choose action (1-3): ", ["1", "2", "3"]
+    if phase == "combat_item":
+        return "Choose item (number): ", [str(i) for i in range(1, len(player_stats['combat']['usable_items']) + 1)]
+    return None, None
+
+def game_step(player_stats, choice, rng=random, say=print):
+    """Apply the player's next choice and run the game until it needs another one
+
+    This is the whole game: the console version and headless simulations
+    both call it, one choice at a time. It only touches player_stats, draws
+    from rng and writes through say.
+    """
+    phase = player_stats['phase']
+    if phase == "over":
+        raise ValueError("the adventure is already over")
+    choice = str(choice)
+    if phase in MENU_PHASES:
+        choice = choice.strip().lower()
+        _, valid_choices = game_prompt(player_stats)
+        if choice not in valid_choices:
+            say("❌ Invalid choice! Please try again.")
+            return player_stats
+
+    if phase == "action":
+        _take_action(player_stats, choice, rng, say)
+    elif phase == "destination":
+        _choose_destination(player_stats, choice, rng, say)
+    elif phase == "use_item":
+        try:
+            item_choice = int(choice) - 1
+            if 0 <= item_choice < len(player_stats['offered_items']):
+                use_item(player_stats, player_stats['offered_items'][item_choice], say)
+            else:
+                say("❌ Invalid item choice!")
+        except ValueError:
+            say("❌ Invalid input!")
+        _end_turn(player_stats, say)
+    elif phase == "combat":
+        result = combat_round(player_stats, player_stats['combat'], choice, rng, say)
+        if result == "choose_item":
+            player_stats['phase'] = "combat_item"
+        else:
+            _after_combat_round(player_stats, result, say)
+    else:  # phase == "combat_item"
+        result = combat_item_choice(player_stats, player_stats['combat'], choice, rng, say)
+        _after_combat_round(player_stats, result, say)
+    return player_stats
+
+def _start_turn(player_stats, say):
+    """Show where the player is and the action menu"""
+    player_stats['phase'] = "action"
+
+    # Display current status
+    show_location_info(player_stats, say)
+    display_stats(player_stats, say)
+
+    # Check achievements
+    check_achievements(player_stats, say)
+
+    say("\n🎯 What would you like to do?")
+    say("1. Explore/Move")
+    say("2. Search Area")
+    say("3. Use Item")
+    say("4. View Inventory")
+    say("5. Check Stats")
+    say("6. View History")
+    say("7. Quit Game")
+
+def _take_action(player_stats, choice, rng, say):
+    """Handle a choice from the action menu"""
+    if choice == "1":
+        # Movement system
+        current_location = player_stats['current_location']
+        connected_areas = LOCATIONS_DATABASE[current_location]['connected_areas']
+
+        if connected_areas:
+            say("\n🗺️ Available destinations:")
+            for i, area in enumerate(connected_areas, 1):
+                # Check if the area exists before accessing it
+                if area in LOCATIONS_DATABASE:
+                    say(f"{i}. {LOCATIONS_DATABASE[area]['name']}")
+                else:
+                    say(f"{i}. {area} (Under Construction)")
+            player_stats['phase'] = "destination"
+            return
+        say("🚫 No available destinations from here.")
+        if player_stats['current_location'] == "mystical_spring":
+            say("🎉 Congratulations! You've reached the end of the forest!")
+            say("You've successfully escaped!")
+            _set_ending(player_stats, "escaped")
+
+    elif choice == "2":
+        search_location_for_items(player_stats, rng, say)
+
+    elif choice == "3":
+        if player_stats['inventory']:
+            display_inventory(player_stats, say)
+            usable_items = get_usable_items(player_stats)
+
+            if usable_items:
+                say("\nUsable items:")
+                for i, item in enumerate(usable_items, 1):
+                    say(f"{i}. {ITEMS_DATABASE[item]['name']}")
+                player_stats['offered_items'] = usable_items
+                player_stats['phase'] = "use_item"
+                return
+            say("❌ No usable items in inventory!")
+        else:
+            say("📦 Your inventory is empty!")
+
+    elif choice == "4":
+        display_inventory(player_stats, say)
+
+    elif choice == "5":
+        display_stats(player_stats, say)
+        say(f"\n🏆 Achievements: {', '.join(player_stats['achievements']) if player_stats['achievements'] else 'None'}")
+
+    elif choice == "6":
+        say("\n📜 Game History:")
+        for i, action in enumerate(player_stats['game_history'][-10:], 1):
+            say(f"{i}. {action}")
+        if len(player_stats['game_history']) > 10:
+            say(f"... and {len(player_stats['game_history']) - 10} more actions")
+
+    elif choice == "7":
+        say("👋 Thanks for playing!")
+        _set_ending(player_stats, "quit")
+
+    _end_turn(player_stats, say)
+
+def _choose_destination(player_stats, answer, rng, say):
+    """Move to the destination picked by number, perhaps running into danger"""
+    connected_areas = LOCATIONS_DATABASE[player_stats['current_location']]['connected_areas']
+    try:
+        dest_choice = int(answer) - 1
+    except ValueError:
+        say("❌ Invalid input!")
+        _end_turn(player_stats, say)
+        return
+
+    if 0 <= dest_choice < len(connected_areas):
+        new_location = connected_areas[dest_choice]
+        if new_location in LOCATIONS_DATABASE:
+            move_to_location(player_stats, new_location, say)
+
+            # Random events based on danger level
+            danger = LOCATIONS_DATABASE[new_location]['danger_level']
+            if danger > 0 and rng.random() < (danger / 10):
+                say("\n⚠️ You encounter danger!")
+                player_stats['combat'] = start_combat(dict(SHADOW_CREATURE), say)
+                player_stats['phase'] = "combat"
+                show_combat_round(player_stats, player_stats['combat'], say)
+                return
+        else:
+            say("❌ That area is not accessible yet!")
+    else:
+        say("❌ Invalid destination!")
+    _end_turn(player_stats, say)
+
+def _after_combat_round(player_stats, result, say):
+    """Go on to the next battle round, or back to exploring once the fight is over"""
+    if result is None:
+        player_stats['phase'] = "combat"
+        show_combat_round(player_stats, player_stats['combat'], say)
+        return
+    player_stats['combat'] = None
+    if result == "defeat":
+        say("💀 Game Over!")
+        _set_ending(player_stats, "defeat")
+        player_stats['phase'] = "over"
+        return
+    _end_turn(player_stats, say)
+
+def _set_ending(player_stats, ending):
+    """Remember the first reason the game ended"""
+    if player_stats['ending'] is None:
+        player_stats['ending'] = ending
+
+def _end_turn(player_stats, say):
+    """Check the win and game over conditions, then start the next turn"""
+    # Check win condition
+    if player_stats['current_location'] == "mystical_spring":
+        say("\n🎉 Congratulations! You've reached the mystical spring!")
+        say("You've successfully escaped the forest!")
+        say(f"Final Score: {player_stats['score']}")
+        say(f"Level Reached: {player_stats['level']}")
+        say(f"Locations Visited: {len(player_stats['visited_locations'])}")
+        _set_ending(player_stats, "escaped")
+
+    # Check game over conditions
+    if player_stats['health'] <= 0:
+        say("\n💀 Your health has reached zero!")
+        say("Game Over!")
+        _set_ending(player_stats, "health")
+
+    if player_stats['energy'] <= 0:
+        say("\n😴 You're too exhausted to continue!")
+        say("Game Over!")
+        _set_ending(player_stats, "exhausted")
+
+    if player_stats['ending'] is None:
+        _start_turn(player_stats, say)
+    else:
+        player_stats['phase'] = "over"
+
 def main_game_loop():
     """Main game loop with enhanced data structure management"""
     display_header("🌲 THE MYSTIC FOREST ADVENTURE - DATA STRUCTURES EDITION 🌲")
-    
+
     # Main menu loop
     while True:
         print("\n🎮 MAIN MENU")
         print("1. Start New Adventure")
         print("2. View Game Statistics")
         print("3. Exit Game")
-        
+
         choice = validate_input("Choose option (1-3): ", ["1", "2", "3"])
-        
+
         if choice == "1":
-            # Initialize new game
-            player_stats = create_player_stats()
-            
-            # Game introduction
-            print("\n🌲 Welcome to the Mystic Forest!")
-            print("You wake up in a mysterious forest with no memory of how you got here.")
-            print("Use your wits and the items you find to escape safely...")
-            
-            # Main game loop
-            game_active = True
-            while game_active:
-                # Display current status
-                show_location_info(player_stats)
-                display_stats(player_stats)
-                
-                # Check achievements
-                check_achievements(player_stats)
-                
-                # Get available actions for current location
-                actions = get_available_actions(player_stats)
-                actions.extend(["inventory", "stats", "history", "quit"])
-                
-                print("\n🎯 What would you like to do?")
-                print("1. Explore/Move")
-                print("2. Search Area")
-                print("3. Use Item")
-                print("4. View Inventory")
-                print("5. Check Stats")
-                print("6. View History")
-                print("7. Quit Game")
-                
-                choice = validate_input("Choose action (1-7): ", ["1", "2", "3", "4", "5", "6", "7"])
-                
-                if choice == "1":
-                    # Movement system
-                    current_location = player_stats['current_location']
-                    connected_areas = LOCATIONS_DATABASE[current_location]['connected_areas']
-                    
-                    if connected_areas:
-                        print("\n🗺️ Available destinations:")
-                        for i, area in enumerate(connected_areas, 1):
-                            # Check if the area exists before accessing it
-                            if area in LOCATIONS_DATABASE:
-                                print(f"{i}. {LOCATIONS_DATABASE[area]['name']}")
-                            else:
-                                print(f"{i}. {area} (Under Construction)")
-                        
-                        try:
-                            dest_choice = int(input("Choose destination: ")) - 1
-                            if 0 <= dest_choice < len(connected_areas):
-                                new_location = connected_areas[dest_choice]
-                                if new_location in LOCATIONS_DATABASE:
-                                    move_to_location(player_stats, new_location)
-                                    
-                                    # Random events based on danger level
-                                    danger = LOCATIONS_DATABASE[new_location]['danger_level']
-                                    if danger > 0 and random.random() < (danger / 10):
-                                        print("\n⚠️ You encounter danger!")
-                                        
-                                        # Example enemy encounter
-                                        enemy = {
-                                            "name": "Shadow Creature",
-                                            "description": "A dark creature emerges from the shadows",
-                                            "health": 25,
-                                            "min_damage": 3,
-                                            "max_damage": 8,
-                                            "exp_reward": 30,
-                                            "score_reward": 40,
-                                            "item_drops": ["shadow_essence"]
-                                        }
-                                        
-                                        combat_result = combat_system(player_stats, enemy)
-                                        if combat_result == "defeat":
-                                            print("💀 Game Over!")
-                                            game_active = False
-                                            break
-                                else:
-                                    print("❌ That area is not accessible yet!")
-                            else:
-                                print("❌ Invalid destination!")
-                        except ValueError:
-                            print("❌ Invalid input!")
-                    else:
-                        print("🚫 No available destinations from here.")
-                        if player_stats['current_location'] == "mystical_spring":
-                            print("🎉 Congratulations! You've reached the end of the forest!")
-                            print("You've successfully escaped!")
-                            game_active = False
-                
-                elif choice == "2":
-                    search_location_for_items(player_stats)
-                
-                elif choice == "3":
-                    if player_stats['inventory']:
-                        display_inventory(player_stats)
-                        usable_items = [item for item in player_stats['inventory'] 
-                                      if ITEMS_DATABASE[item]['usable']]
-                        
-                        if usable_items:
-                            print("\nUsable items:")
-                            for i, item in enumerate(usable_items, 1):
-                                print(f"{i}. {ITEMS_DATABASE[item]['name']}")
-                            
-                            try:
-                                item_choice = int(input("Choose item to use: ")) - 1
-                                if 0 <= item_choice < len(usable_items):
-                                    use_item(player_stats, usable_items[item_choice])
-                                else:
-                                    print("❌ Invalid item choice!")
-                            except ValueError:
-                                print("❌ Invalid input!")
-                        else:
-                            print("❌ No usable items in inventory!")
-                    else:
-                        print("📦 Your inventory is empty!")
-                
-                elif choice == "4":
-                    display_inventory(player_stats)
-                
-                elif choice == "5":
-                    display_stats(player_stats)
-                    print(f"\n🏆 Achievements: {', '.join(player_stats['achievements']) if player_stats['achievements'] else 'None'}")
-                
-                elif choice == "6":
-                    print("\n📜 Game History:")
-                    for i, action in enumerate(player_stats['game_history'][-10:], 1):
-                        print(f"{i}. {action}")
-                    if len(player_stats['game_history']) > 10:
-                        print(f"... and {len(player_stats['game_history']) - 10} more actions")
-                
-                elif choice == "7":
-                    print("👋 Thanks for playing!")
-                    game_active = False
-                
-                # Check win condition
-                if player_stats['current_location'] == "mystical_spring":
-                    print("\n🎉 Congratulations! You've reached the mystical spring!")
-                    print("You've successfully escaped the forest!")
-                    print(f"Final Score: {player_stats['score']}")
-                    print(f"Level Reached: {player_stats['level']}")
-                    print(f"Locations Visited: {len(player_stats['visited_locations'])}")
-                    game_active = False
-                
-                # Check game over conditions
-                if player_stats['health'] <= 0:
-                    print("\n💀 Your health has reached zero!")
-                    print("Game Over!")
-                    game_active = False
-                
-                if player_stats['energy'] <= 0:
-                    print("\n😴 You're too exhausted to continue!")
-                    print("Game Over!")
-                    game_active = False
-        
+            # Play one adventure, a choice at a time
+            player_stats = start_game()
+            while player_stats['phase'] != "over":
+                prompt, _ = game_prompt(player_stats)
+                game_step(player_stats, input(prompt))
+
         elif choice == "2":
             print("\n📊 GAME STATISTICS")
             print(f"Total Items in Database: {len(ITEMS_DATABASE)}")
             print(f"Total Locations: {len(LOCATIONS_DATABASE)}")
             print("\nItem Categories:")
-            
+
             # Group items by type using dictionary comprehension
             usable_items = {k: v for k, v in ITEMS_DATABASE.items() if v['usable']}
             print(f"• Usable Items: {len(usable_items)}")
-            
+
             valuable_items = {k: v for k, v in ITEMS_DATABASE.items() if v['value'] > 50}
             print(f"• Valuable Items (>50 value): {len(valuable_items)}")
-            
+
         elif choice == "3":
             print("\n👋 Thanks for playing!")
             break
-    
+
     print("\n📚 DATA STRUCTURES CONCEPTS DEMONSTRATED:")
     print("• Dictionaries for structured game data (items, locations, player stats)")
     print("• Lists for inventory management and game history")
@@ -0,0 +1,135 @@
+# THE MYSTIC FOREST ADVENTURE - HEADLESS ENGINE
+# Play any edition without a console: an input policy makes the choices and an output sink gets the text
+
+import random
+import time
+from collections import Counter
+import mystic_codex_data_structures as data_structures_edition
+import mystic_codex_functions as functions_edition
+
+# Every edition here offers start_game(rng, say), game_prompt(state) and game_step(state, choice, rng, say)
+EDITIONS = {
+    "functions": functions_edition,
+    "data_structures": data_structures_edition
+}
+
+
+def get_edition(edition):
+    """Get an edition module by name (modules are passed through)"""
+    if isinstance(edition, str):
+        if edition not in EDITIONS:
+            raise ValueError(f"unknown edition {edition!r} (choose from {', '.join(EDITIONS)})")
+        return EDITIONS[edition]
+    return edition
+
+
+# OUTPUT SINKS - Called like print with the game's text
+
+def silent(*text):
+    """Throw the game's text away (the fastest sink)"""
+
+
+class TextCollector:
+    """Sink that keeps the game's text, one line per call"""
+
+    def __init__(self):
+        self.lines = []
+
+    def __call__(self, *text):
+        self.lines.append(" ".join(str(part) for part in text))
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+
+# INPUT POLICIES - Called as policy(state, prompt, choices) and return the player's answer
+# choices is None when the game takes free text (the Functions Edition puzzle).
+
+def console_policy(state, prompt, choices):
+    """Ask the person at the keyboard"""
+    return input(prompt)
+
+
+class RandomPolicy:
+    """Pick uniformly among the answers that do something, with its own seeded random stream
+
+    The puzzle is answered correctly with probability puzzle_skill. avoid
+    holds (phase, choice) pairs never picked while another choice is left -
+    by default quitting the Data Structures Edition, so games get played out.
+    """
+
+    DEFAULT_AVOID = frozenset({("action", "7")})
+
+    def __init__(self, seed=None, puzzle_skill=0.7, avoid=DEFAULT_AVOID):
+        self.rng = random.Random(seed)
+        self.puzzle_skill = puzzle_skill
+        self.avoid = avoid
+
+    def __call__(self, state, prompt, choices):
+        if choices is None:
+            answer = state['puzzle']['answer']
+            return str(answer if self.rng.random() < self.puzzle_skill else answer + 1)
+        allowed = [choice for choice in choices if (state['phase'], choice) not in self.avoid]
+        return self.rng.choice(allowed or choices)
+
+
+class ScriptedPolicy:
+    """Give a fixed list of answers in order"""
+
+    def __init__(self, actions):
+        self.actions = list(actions)
+        self.position = 0
+
+    def __call__(self, state, prompt, choices):
+        if self.position >= len(self.actions):
+            raise ValueError(f"the script ran out of answers at {prompt!r}")
+        answer = self.actions[self.position]
+        self.position += 1
+        return answer
+
+
+# PLAYING
+
+def play_game(edition, policy, seed=None, say=silent, max_steps=100000):
+    """Play one whole game headless and return its final state
+
+    The game draws from its own random.Random(seed), so a seed and a
+    deterministic policy always give the same game. Stops with RuntimeError
+    if the game isn't over after max_steps choices.
+    """
+    edition = get_edition(edition)
+    rng = random.Random(seed)
+    state = edition.start_game(rng, say)
+    for _ in range(max_steps):
+        prompt, choices = edition.game_prompt(state)
+        if prompt is None:
+            return state
+        edition.game_step(state, policy(state, prompt, choices), rng, say)
+    raise RuntimeError(f"the game did not finish in {max_steps} steps")
+
+
+def benchmark_engine(games=20000, seed=0):
+    """Play games random playthroughs of every edition and report playthroughs per minute"""
+    results = {}
+    print(f"\n{games:,} random playthroughs per edition, one core, no output")
+    print(f"{'Edition':<17} {'Games/min':<12} {'Mean score':<11} Most common endings")
+    for name, edition in EDITIONS.items():
+        policy = RandomPolicy(seed)
+        endings = Counter()
+        total_score = 0
+        start = time.perf_counter()
+        for game_number in range(games):
+            state = play_game(edition, policy, seed=seed * games + game_number)
+            endings[state['ending']] += 1
+            total_score += state['score']
+        elapsed = time.perf_counter() - start
+        results[name] = {"games": games, "seconds": elapsed, "games_per_minute": games / elapsed * 60,
+                         "mean_score": total_score / games, "endings": dict(endings)}
+        common = ", ".join(f"{ending} {count / games:.0%}" for ending, count in endings.most_common(3))
+        print(f"{name:<17} {results[name]['games_per_minute']:<12,.0f} {results[name]['mean_score']:<11.1f} {common}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_engine()
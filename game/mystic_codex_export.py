@@ -0,0 +1,185 @@
+# THE MYSTIC FOREST ADVENTURE - STATISTICS EXPORT
+# Stream every player profile out once, as CSV, JSONL or per-player text reports
+
+import csv
+import datetime
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CSV_FIELDS = ["name", "games_played", "total_score", "best_score", "average_score",
+              "achievements", "total_playtime", "created_date", "last_played"]
+
+
+def _date_part(value, default="Never"):
+    """Get the YYYY-MM-DD part of an ISO date (default if there is none)"""
+    return value[:10] if value else default
+
+
+def average_score(profile):
+    """Get a player's average score per game"""
+    return profile["total_score"] / max(1, profile["games_played"])
+
+
+def format_text_report(profile, generated=None):
+    """Build the player statistics report as one string"""
+    generated = generated or datetime.datetime.now()
+    lines = [
+        "PLAYER STATISTICS REPORT",
+        "========================",
+        "",
+        f"Player Name: {profile['name']}",
+        f"Profile Created: {_date_part(profile.get('created_date'), 'Unknown')}",
+        f"Last Played: {_date_part(profile.get('last_played'))}",
+        f"Games Played: {profile['games_played']}",
+        f"Total Score: {profile['total_score']}",
+        f"Best Score: {profile['best_score']}",
+        f"Average Score: {average_score(profile):.1f}",
+        "",
+        "Achievements Unlocked:"
+    ]
+    if profile['achievements']:
+        lines.extend(f"• {achievement}" for achievement in profile['achievements'])
+    else:
+        lines.append("• No achievements yet")
+    lines.append("")
+    lines.append(f"Report generated: {generated.strftime('%Y-%m-%d %H:%M:%S')}")
+    return "\n".join(lines) + "\n"
+
+
+def write_text_report(profile, directory, generated=None):
+    """Write one player's report to {name}_stats.txt with a single write"""
+    export_file = directory / f"{profile['name']}_stats.txt"
+    with open(export_file, 'w', encoding='utf-8') as file:
+        file.write(format_text_report(profile, generated))
+    return export_file
+
+
+class ProgressReporter:
+    """Class to print export progress at fixed steps
+
+    Progress is printed every `every` rows (and at the end), so the number of
+    lines printed grows linearly with the number of profiles and checking it
+    costs one comparison per row.
+    """
+
+    def __init__(self, total=None, every=None, label="profiles"):
+        self.total = total
+        self.every = every or max(1, (total or 1000) // 10)
+        self.label = label
+        self.done = 0
+        self._next_report = self.every
+        self._started = time.perf_counter()
+
+    def advance(self, count=1):
+        """Count finished rows and print when the next step is reached"""
+        self.done += count
+        if self.done >= self._next_report:
+            self._next_report += self.every
+            self._print()
+
+    def finish(self):
+        """Print the final line"""
+        self._print(final=True)
+
+    def _print(self, final=False):
+        elapsed = time.perf_counter() - self._started
+        rate = self.done / elapsed if elapsed > 0 else 0
+        total = f"/{self.total}" if self.total is not None else ""
+        marker = "✅" if final else "⏳"
+        print(f"{marker} {self.done}{total} {self.label} exported ({rate:,.0f}/s)")
+
+
+class _AtomicOutput:
+    """Context manager for a text file that only replaces the target once fully written"""
+
+    def __init__(self, filepath, newline=None):
+        self.filepath = filepath
+        self.newline = newline
+
+    def __enter__(self):
+        fd, self.temp_path = tempfile.mkstemp(dir=self.filepath.parent,
+                                              prefix=f".{self.filepath.name}.", suffix=".tmp")
+        self.file = os.fdopen(fd, 'w', encoding='utf-8', newline=self.newline)
+        return self.file
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
+        if exc_type is None:
+            os.replace(self.temp_path, self.filepath)
+        else:
+            os.unlink(self.temp_path)
+        return False
+
+
+def export_csv(profiles, filepath, progress=None):
+    """Stream profiles into a CSV file (one row per player); return the row count"""
+    count = 0
+    with _AtomicOutput(filepath, newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_FIELDS)
+        for profile in profiles:
+            writer.writerow([
+                profile["name"], profile["games_played"], profile["total_score"],
+                profile["best_score"], f"{average_score(profile):.1f}",
+                ";".join(profile["achievements"]), profile.get("total_playtime", 0),
+                profile.get("created_date") or "", profile.get("last_played") or ""
+            ])
+            count += 1
+            if progress:
+                progress.advance()
+    return count
+
+
+def export_jsonl(profiles, filepath, progress=None):
+    """Stream profiles into a JSON Lines file (one object per player); return the row count"""
+    count = 0
+    with _AtomicOutput(filepath) as file:
+        for profile in profiles:
+            file.write(json.dumps(profile, ensure_ascii=False) + "\n")
+            count += 1
+            if progress:
+                progress.advance()
+    return count
+
+
+def export_text_reports(profiles, directory, workers=0, progress=None, batch_size=256):
+    """Write a {name}_stats.txt report per player; return the report count
+
+    With workers > 0 the files are written by a thread pool. Profiles are
+    handed over batch_size at a time so memory stays bounded however many
+    players there are.
+    """
+    generated = datetime.datetime.now()
+    count = 0
+
+    if workers <= 0:
+        for profile in profiles:
+            write_text_report(profile, directory, generated)
+            count += 1
+            if progress:
+                progress.advance()
+        return count
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        batch = []
+        for profile in profiles:
+            batch.append(profile)
+            if len(batch) >= batch_size:
+                count += _write_batch(pool, batch, directory, generated, progress)
+                batch = []
+        if batch:
+            count += _write_batch(pool, batch, directory, generated, progress)
+    return count
+
+
+def _write_batch(pool, batch, directory, generated, progress):
+    """Write one batch of reports on the pool and wait for it"""
+    futures = [pool.submit(write_text_report, profile, directory, generated) for profile in batch]
+    for future in futures:
+        future.result()
+        if progress:
+            progress.advance()
+    return len(futures)
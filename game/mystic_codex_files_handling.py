@@ -2,22 +2,44 @@
 # A text-based game to learn file operations, data persistence, and error handling
 
 import random
+import contextlib
+import io
 import json
 import os
 import datetime
+import shutil
+import tempfile
+import threading
+import time
 from pathlib import Path
+from mystic_codex_backup import BackupStore
+from mystic_codex_export import (ProgressReporter, export_csv, export_jsonl, export_text_reports,
+                                 write_text_report)
+from mystic_codex_memory_storage import MemoryStorageBackend
+from mystic_codex_persistence import IO_STATS, IOStats, WRITE_BEHIND
+from mystic_codex_retention import RetentionPolicy
+from mystic_codex_saves import slot_number_from_name
+from mystic_codex_session import GameDataSession
+from mystic_codex_sqlite_storage import SqliteStorageBackend
+from mystic_codex_storage import FileStorageBackend, backend_name_from_settings, data_dir_from_environment
 
 # FILE PATHS - Using Path objects for cross-platform compatibility
-GAME_DATA_DIR = Path("game_data")
+GAME_DATA_DIR = data_dir_from_environment()  # MYSTIC_GAME_DATA_DIR, or game_data in the current directory
 SAVE_FILES_DIR = GAME_DATA_DIR / "saves"
+SAVE_MANIFEST_FILE = SAVE_FILES_DIR / "manifest.json"
 CONFIG_FILE = GAME_DATA_DIR / "config.json"
 HIGHSCORES_FILE = GAME_DATA_DIR / "highscores.json"
+SCORE_LOG_FILE = GAME_DATA_DIR / "score_log.jsonl"
 PLAYER_PROFILES_FILE = GAME_DATA_DIR / "player_profiles.json"
+PLAYER_PROFILES_EXPORT_FILE = GAME_DATA_DIR / "player_profiles_export.json"  # Never the file imported on first run
+PLAYER_PROFILES_DB = GAME_DATA_DIR / "player_profiles.db"
 GAME_HISTORY_FILE = GAME_DATA_DIR / "game_history.txt"
+STATS_CSV_FILE = GAME_DATA_DIR / "player_stats.csv"
+STATS_JSONL_FILE = GAME_DATA_DIR / "player_stats.jsonl"
+GAME_HISTORY_DIR = GAME_DATA_DIR / "history"
+GAME_HISTORY_INDEX_FILE = GAME_HISTORY_DIR / "index.jsonl"
 
-# Ensure directories exist
-GAME_DATA_DIR.mkdir(exist_ok=True)
-SAVE_FILES_DIR.mkdir(exist_ok=True)
+# The directories are created by the storage backend when it is first used
 
 # GAME DATABASE - Using dictionaries to store structured game data
 ITEMS_DATABASE = {
@@ -58,7 +80,12 @@ DEFAULT_CONFIG = {
     "auto_save": True,
     "player_name": "Adventurer",
     "max_save_slots": 5,
-    "display_hints": True
+    "display_hints": True,
+    "save_format": "json",  # "json" or "binary"
+    "save_generations": 5,  # Old versions kept per save slot for rollback (0 turns this off)
+    "save_retention_days": 30,
+    "backups_to_keep": 10,
+    "backup_before_reset": True  # Take a backup before a reset or a restore replaces the data
 }
 
 # FILE OPERATIONS FUNCTIONS
@@ -66,6 +93,10 @@ DEFAULT_CONFIG = {
 def load_json_file(filepath, default_data=None):
     """Load JSON data from file with error handling"""
     try:
+        # A write that is still queued is newer than what's on disk
+        pending = WRITE_BEHIND.pending_text(filepath)
+        if pending is not None:
+            return json.loads(pending)
         if filepath.exists():
             with open(filepath, 'r', encoding='utf-8') as file:
                 data = json.load(file)
@@ -85,125 +116,225 @@ def load_json_file(filepath, default_data=None):
         print(f"❌ Unexpected error loading {filepath.name}: {e}")
         return default_data if default_data is not None else {}
 
+def load_json_file_quietly(filepath, default_data=None):
+    """Load JSON data without printing anything (for background threads, which mustn't write over a prompt)"""
+    if default_data is None:
+        default_data = {}
+    try:
+        pending = WRITE_BEHIND.pending_text(filepath)
+        if pending is not None:
+            return json.loads(pending)
+        with open(filepath, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return default_data
+
 def save_json_file(filepath, data):
-    """Save data to JSON file with error handling"""
+    """Save data to JSON file with error handling
+    
+    The data is serialized right away (so later changes to it don't leak in)
+    and written by the background worker with an atomic temp-file replace.
+    """
     try:
-        with open(filepath, 'w', encoding='utf-8') as file:
-            json.dump(data, file, indent=2, ensure_ascii=False)
-        print(f"✅ Saved data to {filepath.name}")
-        return True
-    except PermissionError:
-        print(f"❌ Permission denied writing to {filepath.name}")
-        return False
-    except Exception as e:
+        text = json.dumps(data, indent=2, ensure_ascii=False)
+    except (TypeError, ValueError) as e:
         print(f"❌ Error saving to {filepath.name}: {e}")
         return False
+    WRITE_BEHIND.submit(filepath, text)
+    print(f"✅ Saved data to {filepath.name}")
+    return True
+
+def load_bytes_file(filepath, size=None):
+    """Read raw bytes from a file, seeing writes that are still queued"""
+    data = WRITE_BEHIND.pending_text(filepath)
+    if data is None:
+        with open(filepath, 'rb') as file:
+            return file.read() if size is None else file.read(size)
+    return data if size is None else data[:size]
+
+def save_bytes_file(filepath, data):
+    """Queue raw bytes to be written atomically by the background worker"""
+    WRITE_BEHIND.submit(filepath, bytes(data))
+    print(f"✅ Saved data to {filepath.name}")
+    return True
+
+def flush_pending_writes():
+    """Wait until every queued file write has been tried; return {path: error} for the failed ones"""
+    return WRITE_BEHIND.flush()
+
+def get_write_state(filepath):
+    """Get "pending" or "failed" for a file whose queued write hasn't reached the disk (None otherwise)"""
+    return WRITE_BEHIND.write_state(filepath)
+
+def ensure_game_data_dir():
+    """Create the game data directory for files written outside the storage backend (exports)"""
+    GAME_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 def append_to_text_file(filepath, text):
     """Append text to file with timestamp"""
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return append_lines_to_text_file(filepath, [f"[{timestamp}] {text}"])
+
+def append_lines_to_text_file(filepath, lines):
+    """Append several ready-made lines to a file with a single open"""
     try:
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        text = "".join(f"{line}\n" for line in lines)
         with open(filepath, 'a', encoding='utf-8') as file:
-            file.write(f"[{timestamp}] {text}\n")
+            file.write(text)
+        IO_STATS.record(filepath, len(text.encode('utf-8')))
         return True
     except Exception as e:
         print(f"❌ Error writing to {filepath.name}: {e}")
         return False
 
+# STORAGE BACKEND
+
+# Guards the lazily created storage backend, which may be first used from several threads
+SHARED_OBJECTS_LOCK = threading.RLock()
+
+STORAGE_BACKEND = None  # Picked on first use
+STORAGE_BACKEND_NAMES = ("file", "sqlite", "memory")
+
+def create_storage_backend(name, data_dir=None):
+    """Create a storage backend by name ("file", "sqlite" or "memory")"""
+    data_dir = GAME_DATA_DIR if data_dir is None else Path(data_dir)
+    if name == "file":
+        return FileStorageBackend(data_dir,
+                                  load_function=load_json_file,
+                                  save_function=save_json_file,
+                                  flush_function=flush_pending_writes,
+                                  read_bytes_function=load_bytes_file,
+                                  save_bytes_function=save_bytes_file,
+                                  write_state_function=get_write_state,
+                                  quiet_load_function=load_json_file_quietly)
+    if name == "sqlite":
+        return SqliteStorageBackend(data_dir)
+    if name == "memory":
+        return MemoryStorageBackend()
+    raise ValueError(f"Unknown storage backend '{name}' (choose from {', '.join(STORAGE_BACKEND_NAMES)})")
+
+def get_storage_backend():
+    """Get the backend every game data function works with
+    
+    It is picked by the MYSTIC_STORAGE_BACKEND environment variable or the
+    "storage_backend" setting in config.json, and is "file" otherwise.
+    """
+    global STORAGE_BACKEND
+    with SHARED_OBJECTS_LOCK:
+        if STORAGE_BACKEND is None:
+            STORAGE_BACKEND = create_storage_backend(backend_name_from_settings(GAME_DATA_DIR))
+    return STORAGE_BACKEND
+
+def use_storage_backend(backend):
+    """Switch every game data function to another backend; return the previous one"""
+    global STORAGE_BACKEND
+    with SHARED_OBJECTS_LOCK:
+        previous, STORAGE_BACKEND = STORAGE_BACKEND, backend
+    return previous
+
 # CONFIGURATION MANAGEMENT
 
+def get_config_cache():
+    """Get the shared configuration cache"""
+    return get_storage_backend().config_cache(DEFAULT_CONFIG)
+
 def load_config():
-    """Load game configuration from file"""
-    config = load_json_file(CONFIG_FILE, DEFAULT_CONFIG.copy())
-    
-    # Ensure all required keys exist
-    for key, value in DEFAULT_CONFIG.items():
-        if key not in config:
-            config[key] = value
-    
-    return config
+    """Load game configuration (only parsed again when config.json changes)"""
+    # Every key from DEFAULT_CONFIG is guaranteed to be present
+    return get_config_cache().get()
 
 def save_config(config):
     """Save game configuration to file"""
-    return save_json_file(CONFIG_FILE, config)
+    return get_config_cache().save(config)
 
 def update_config_setting(key, value):
     """Update a single configuration setting"""
-    config = load_config()
-    config[key] = value
-    save_config(config)
+    get_config_cache().update(key, value)
     print(f"⚙️ Updated {key} to {value}")
 
+def on_config_reloaded(config):
+    """Tell the player that settings changed outside the game"""
+    print(f"\n⚙️ Settings reloaded from {CONFIG_FILE.name} (difficulty: {config['difficulty']})")
+
 # PLAYER PROFILE MANAGEMENT
 
+def get_profile_store():
+    """Get the profile store, importing the old JSON file the first time"""
+    return get_storage_backend().profile_store()
+
+def close_profile_store():
+    """Close the profile store so its database file can be removed"""
+    if STORAGE_BACKEND is not None:
+        STORAGE_BACKEND.close_profile_store()
+
 def load_player_profiles():
     """Load all player profiles"""
-    return load_json_file(PLAYER_PROFILES_FILE, {})
+    return get_profile_store().all_profiles()
 
 def save_player_profiles(profiles):
     """Save all player profiles"""
-    return save_json_file(PLAYER_PROFILES_FILE, profiles)
+    get_profile_store().put_many(profiles.values())
+    return True
+
+def archive_inactive_profiles(active_days=None):
+    """Move players who haven't played for a while into the compressed profile archive
+    
+    Archived players come back on their own the next time they play.
+    """
+    archived = get_profile_store().archive_inactive(active_days)
+    print(f"📦 Archived {archived} inactive player profile(s)")
+    return archived
+
+def export_player_profiles(filepath=PLAYER_PROFILES_EXPORT_FILE):
+    """Export all player profiles to a JSON file"""
+    try:
+        ensure_game_data_dir()
+        get_profile_store().export_json(filepath)
+        print(f"📤 Exported player profiles to {filepath.name}")
+        return True
+    except Exception as e:
+        print(f"❌ Error exporting profiles to {filepath.name}: {e}")
+        return False
 
 def create_player_profile(player_name):
     """Create a new player profile"""
-    profiles = load_player_profiles()
-    
-    if player_name not in profiles:
-        profiles[player_name] = {
-            "name": player_name,
-            "games_played": 0,
-            "total_score": 0,
-            "best_score": 0,
-            "achievements": [],
-            "total_playtime": 0,
-            "created_date": datetime.datetime.now().isoformat(),
-            "last_played": None
-        }
-        save_player_profiles(profiles)
+    profile, created = get_profile_store().create(player_name)
+    if created:
         print(f"👤 Created new profile for {player_name}")
     
-    return profiles[player_name]
+    return profile
 
 def update_player_profile(player_name, game_stats):
     """Update player profile with game results"""
-    profiles = load_player_profiles()
-    
-    if player_name not in profiles:
-        create_player_profile(player_name)
-    
-    profile = profiles[player_name]
-    profile["games_played"] += 1
-    profile["total_score"] += game_stats.get("score", 0)
-    profile["best_score"] = max(profile["best_score"], game_stats.get("score", 0))
-    profile["last_played"] = datetime.datetime.now().isoformat()
-    
-    # Add new achievements
-    new_achievements = game_stats.get("achievements", [])
-    for achievement in new_achievements:
-        if achievement not in profile["achievements"]:
-            profile["achievements"].append(achievement)
-    
-    profiles[player_name] = profile
-    save_player_profiles(profiles)
+    get_profile_store().record_game(player_name,
+                                    game_stats.get("score", 0),
+                                    game_stats.get("achievements", []))
 
 # HIGH SCORE MANAGEMENT
 
-def load_highscores():
-    """Load high scores from file"""
-    default_scores = {"scores": []}
-    return load_json_file(HIGHSCORES_FILE, default_scores)
+def get_leaderboard():
+    """Get the shared leaderboard (top 10 scores)"""
+    return get_storage_backend().leaderboard(size=10)
+
+def get_leaderboard_snapshot():
+    """Get the reader of the top scores every game process publishes (None if the backend has none)"""
+    return get_storage_backend().leaderboard_snapshot()
 
-def save_highscores(highscores):
-    """Save high scores to file"""
-    return save_json_file(HIGHSCORES_FILE, highscores)
+def read_top_scores():
+    """Get the top scores, from the shared snapshot when there is one (no parsing, no lock)"""
+    snapshot = get_leaderboard_snapshot()
+    scores = snapshot.read() if snapshot is not None else None
+    return scores if scores is not None else get_leaderboard().top()
+
+def load_highscores():
+    """Load high scores from the shared snapshot or the in-memory leaderboard index"""
+    return {"scores": read_top_scores()}
 
 def add_highscore(player_name, score, difficulty, date=None):
     """Add a new high score entry"""
     if date is None:
         date = datetime.datetime.now().isoformat()
     
-    highscores = load_highscores()
-    
     new_score = {
         "player": player_name,
         "score": score,
@@ -211,22 +342,37 @@ def add_highscore(player_name, score, difficulty, date=None):
         "date": date
     }
     
-    highscores["scores"].append(new_score)
-    
-    # Sort by score (descending) and keep top 10
-    highscores["scores"].sort(key=lambda x: x["score"], reverse=True)
-    highscores["scores"] = highscores["scores"][:10]
-    
-    save_highscores(highscores)
-    print(f"🏆 Added high score: {score} points")
+    # Every score goes to the log; the snapshot is only rewritten if it places
+    if get_leaderboard().add(new_score):
+        print(f"🏆 Added high score: {score} points")
+    else:
+        print(f"📝 Recorded score: {score} points")
+
+def get_score_index():
+    """Get the leaderboard queries (per difficulty, rolling day/week, rank and percentile)"""
+    return get_storage_backend().score_index()
+
+PERIOD_NAMES = {None: "All Time", "day": "Last 24 Hours", "week": "Last 7 Days"}
 
-def display_highscores():
-    """Display the high scores leaderboard"""
-    highscores = load_highscores()
-    scores = highscores.get("scores", [])
+def display_highscores(difficulty=None, period=None, page=1, page_size=10):
+    """Display the high scores leaderboard
+    
+    difficulty limits the board to one difficulty, period to the last "day"
+    or "week", and page picks which page_size places are shown.
+    """
+    score_index = get_score_index()
+    if difficulty is None and period is None and page == 1 and page_size <= get_leaderboard().size:
+        scores = read_top_scores()[:page_size]  # The plain board needs no index or score log read
+    else:
+        scores = score_index.page(page, page_size, difficulty=difficulty, period=period)
+    first_rank = (page - 1) * page_size + 1
     
     print("\n" + "="*50)
     print("🏆 HIGH SCORES LEADERBOARD 🏆")
+    if difficulty is not None or period is not None or page > 1:
+        total = score_index.count(difficulty=difficulty, period=period)
+        places = f"places {first_rank}-{first_rank + len(scores) - 1} of {total}" if scores else f"{total} scores"
+        print(f"{(difficulty or 'all difficulties').title()} - {PERIOD_NAMES[period]} - {places}")
     print("="*50)
     
     if not scores:
@@ -236,58 +382,113 @@ def display_highscores():
     print(f"{'Rank':<4} {'Player':<15} {'Score':<8} {'Difficulty':<10} {'Date':<12}")
     print("-" * 55)
     
-    for i, score in enumerate(scores, 1):
+    for i, score in enumerate(scores, first_rank):
         date_str = score["date"][:10] if len(score["date"]) > 10 else score["date"]
         print(f"{i:<4} {score['player']:<15} {score['score']:<8} {score['difficulty']:<10} {date_str:<12}")
 
+def browse_highscores():
+    """Browse the leaderboards by difficulty and period, and look up ranks"""
+    score_index = get_score_index()
+    difficulty = period = None
+    page = 1
+    
+    while True:
+        display_highscores(difficulty, period, page)
+        print("\n1. Next page")
+        print("2. Previous page")
+        print("3. Choose difficulty")
+        print("4. Choose period")
+        print("5. Find a player's best rank")
+        print("6. Rank of a score")
+        print("7. Back")
+        
+        choice = validate_input("Choose option (1-7): ", [str(i) for i in range(1, 8)])
+        
+        if choice == "1":
+            if page * 10 < score_index.count(difficulty=difficulty, period=period):
+                page += 1
+        elif choice == "2":
+            page = max(1, page - 1)
+        elif choice == "3":
+            selected = validate_input("Difficulty (all/easy/normal/hard): ", ["all", "easy", "normal", "hard"])
+            difficulty = None if selected == "all" else selected
+            page = 1
+        elif choice == "4":
+            selected = validate_input("Period (all/day/week): ", ["all", "day", "week"])
+            period = None if selected == "all" else selected
+            page = 1
+        elif choice == "5":
+            player_name = input("Player name: ").strip()
+            best = score_index.best_rank(player_name, difficulty=difficulty, period=period)
+            if best is None:
+                print(f"❌ {player_name} has no score on this board")
+            else:
+                rank, entry = best
+                print(f"🏅 {player_name}'s best: {entry['score']} points, rank {rank} "
+                      f"of {score_index.count(difficulty=difficulty, period=period)}")
+        elif choice == "6":
+            try:
+                score = int(input("Score: "))
+            except ValueError:
+                print("❌ Invalid number")
+                continue
+            percentile = score_index.percentile(score, difficulty=difficulty, period=period)
+            print(f"📈 {score} points would rank {score_index.rank_of(score, difficulty=difficulty, period=period)}"
+                  + (f" (better than or equal to {percentile:.1f}% of scores)" if percentile is not None else ""))
+        elif choice == "7":
+            break
+
 # SAVE GAME MANAGEMENT
 
+def get_save_store():
+    """Get the shared save slot store (on disk: a snapshot + delta journal per slot)"""
+    return get_storage_backend().save_store(load_config().get("save_format", "json"))
+
 def get_save_slots():
     """Get list of available save slots"""
-    save_files = list(SAVE_FILES_DIR.glob("save_*.json"))
-    slots = {}
+    return get_save_store().list_slots()
+
+def save_game(game_state, slot_number, wait=True):
+    """Save game state to specified slot
     
-    for save_file in save_files:
-        try:
-            slot_num = int(save_file.stem.split("_")[1])
-            save_data = load_json_file(save_file)
-            if save_data:
-                slots[slot_num] = {
-                    "filename": save_file.name,
-                    "player_name": save_data.get("player_name", "Unknown"),
-                    "save_date": save_data.get("save_date", "Unknown"),
-                    "location": save_data.get("current_location", "Unknown"),
-                    "level": save_data.get("level", 1),
-                    "score": save_data.get("score", 0)
-                }
-        except (ValueError, IndexError):
-            continue
-    
-    return slots
-
-def save_game(game_state, slot_number):
-    """Save game state to specified slot"""
-    save_file = SAVE_FILES_DIR / f"save_{slot_number}.json"
+    With wait the save is only reported once it is on disk. Game data
+    sessions pass wait=False so a finished game isn't held up by the disk;
+    a save that then fails never shows up in the slot list.
+    """
+    save_store = get_save_store()
+    save_store.snapshot_format = load_config().get("save_format", "json")
     
     # Add metadata
     save_data = game_state.copy()
     save_data["save_date"] = datetime.datetime.now().isoformat()
     save_data["save_slot"] = slot_number
     
-    if save_json_file(save_file, save_data):
+    # Only what changed since the last save is written, unless the journal is due for compaction
+    earlier_failures = WRITE_BEHIND.failures()  # Not this save's to report
+    if save_store.save(slot_number, save_data):
+        if wait:
+            failures = get_storage_backend().flush()
+            for filepath, error in failures.items():
+                if earlier_failures.get(filepath) is error:
+                    continue
+                if slot_number_from_name(filepath.name) == slot_number:
+                    print(f"❌ Game was not saved to slot {slot_number}: {error}")
+                    return False
         print(f"💾 Game saved to slot {slot_number}")
+        retention = get_save_retention()
+        if retention is not None:
+            retention.schedule(slot_number)  # Kept as a generation in the background
         return True
     return False
 
 def load_game(slot_number):
     """Load game state from specified slot"""
-    save_file = SAVE_FILES_DIR / f"save_{slot_number}.json"
-    
-    if not save_file.exists():
+    save_store = get_save_store()
+    if not save_store.has_save(slot_number):
         print(f"❌ Save slot {slot_number} is empty")
         return None
     
-    save_data = load_json_file(save_file)
+    save_data = save_store.load(slot_number)
     if save_data:
         print(f"📁 Loaded game from slot {slot_number}")
         return save_data
@@ -295,11 +496,8 @@ def load_game(slot_number):
 
 def delete_save(slot_number):
     """Delete a save file"""
-    save_file = SAVE_FILES_DIR / f"save_{slot_number}.json"
-    
     try:
-        if save_file.exists():
-            save_file.unlink()
+        if get_save_store().delete(slot_number):
             print(f"🗑️ Deleted save slot {slot_number}")
             return True
         else:
@@ -309,40 +507,134 @@ def delete_save(slot_number):
         print(f"❌ Error deleting save slot {slot_number}: {e}")
         return False
 
+def convert_saves_to_binary():
+    """Convert every JSON save snapshot to the binary save format"""
+    converted = get_save_store().convert_to_binary()
+    print(f"💾 Converted {len(converted)} save(s) to the binary format")
+    return converted
+
+def get_save_retention():
+    """Get the keeper of old save generations with the current settings (None if the backend has none)"""
+    retention = get_storage_backend().save_retention()
+    if retention is not None:
+        retention.policy = RetentionPolicy.from_config(load_config())
+    return retention
+
+def list_save_generations(slot_number):
+    """Get the old versions of a save slot, newest first"""
+    retention = get_save_retention()
+    return retention.list_generations(slot_number) if retention is not None else []
+
+def restore_save_generation(slot_number, generation_number):
+    """Make an old version of a slot its current save (the replaced save is kept as a generation)"""
+    retention = get_save_retention()
+    state = retention.load_generation(slot_number, generation_number) if retention is not None else None
+    if state is None:
+        print(f"❌ Slot {slot_number} has no generation {generation_number}")
+        return False
+    if save_game(state, slot_number):
+        print(f"⏪ Slot {slot_number} rolled back to generation {generation_number}")
+        return True
+    return False
+
+def run_save_retention():
+    """Prune and compress old save generations now and report what was reclaimed"""
+    retention = get_save_retention()
+    if retention is None:
+        print("❌ This storage backend doesn't keep old saves")
+        return None
+    report = retention.run()
+    print(f"🧹 Removed {report['generations_pruned']} old generation(s) and "
+          f"{report['stale_files_removed']} stale file(s), compressed {report['generations_compressed']}, "
+          f"retired {report['slots_retired']} slot(s)")
+    print(f"   Saves directory: {report['bytes_before']:,} → {report['bytes_after']:,} bytes "
+          f"({report['bytes_reclaimed']:,} reclaimed)")
+    print(f"   Listing save slots: {report['listing_seconds_before'] * 1000:.2f} ms "
+          f"({report['listing_entries_before']} entries) → {report['listing_seconds_after'] * 1000:.2f} ms "
+          f"({report['listing_entries_after']} entries)")
+    return report
+
+# BACKUPS
+
+BACKUP_STORES = {}  # data directory -> its backup store, opened on first use
+
+def get_backup_dir(data_dir):
+    """Get where a game data directory is backed up (beside it, so a reset never touches it)"""
+    return data_dir.parent / f"{data_dir.name}_backups"
+
+def get_backup_store():
+    """Get the incremental backup store for the storage backend's data directory (None without one)"""
+    data_dir = getattr(get_storage_backend(), "data_dir", None)
+    if data_dir is None:
+        return None  # The memory backend keeps nothing on disk
+    with SHARED_OBJECTS_LOCK:
+        if data_dir not in BACKUP_STORES:
+            BACKUP_STORES[data_dir] = BackupStore(data_dir, get_backup_dir(data_dir))
+        return BACKUP_STORES[data_dir]
+
+def backup_game_data(label="manual"):
+    """Take an incremental backup of the game data directory; return its id (None if it failed)
+    
+    Only files that changed since the last backup are read, and only the
+    parts of them that changed are stored. The oldest backups beyond the
+    "backups_to_keep" setting are removed afterwards.
+    """
+    backend = get_storage_backend()
+    if backend.name == "memory":
+        print("❌ The memory backend keeps no game data on disk to back up")
+        return None
+    try:
+        backend.flush()  # Queued writes and buffered history lines belong in the backup
+        backup_store = get_backup_store()
+        report = backup_store.backup(label)
+        backup_store.prune(load_config().get("backups_to_keep", 10))
+    except Exception as e:
+        print(f"❌ Error backing up game data: {e}")
+        return None
+    print(f"💾 Backup {report['id']}: {report['files']} files ({report['files_unchanged']} unchanged), "
+          f"{report['bytes_read']:,} bytes read, {report['bytes_stored']:,} new bytes stored "
+          f"in {report['seconds']:.2f}s")
+    return report["id"]
+
+def list_backups():
+    """Get every backup, newest first"""
+    backup_store = get_backup_store()
+    return backup_store.list_snapshots() if backup_store is not None else []
+
+def restore_game_data(snapshot_id):
+    """Put the game data back the way it was when a backup was taken"""
+    backend = get_storage_backend()
+    if backend.name == "memory":
+        print("❌ The memory backend keeps no game data on disk to restore")
+        return False
+    if load_config().get("backup_before_reset", True) and backup_game_data("before restore") is None:
+        print("❌ Restore cancelled: the current data could not be backed up first")
+        return False
+    try:
+        backend.close()  # Finish background work and let go of open files first
+        report = get_backup_store().restore(snapshot_id)
+        backend.reload()
+    except Exception as e:
+        print(f"❌ Error restoring backup {snapshot_id}: {e}")
+        return False
+    print(f"⏪ Restored backup {snapshot_id}: {report['files_restored']} files written, "
+          f"{report['files_unchanged']} unchanged, {report['files_removed']} removed "
+          f"in {report['seconds']:.2f}s")
+    return True
+
 # GAME STATISTICS AND EXPORT
 
 def export_player_statistics(player_name):
     """Export player statistics to a text file"""
-    profiles = load_player_profiles()
+    profile = get_profile_store().get(player_name)
     
-    if player_name not in profiles:
+    if profile is None:
         print(f"❌ No profile found for {player_name}")
         return False
     
-    profile = profiles[player_name]
-    export_file = GAME_DATA_DIR / f"{player_name}_stats.txt"
-    
     try:
-        with open(export_file, 'w', encoding='utf-8') as file:
-            file.write(f"PLAYER STATISTICS REPORT\n")
-            file.write(f"========================\n\n")
-            file.write(f"Player Name: {profile['name']}\n")
-            file.write(f"Profile Created: {profile['created_date'][:10]}\n")
-            file.write(f"Last Played: {profile.get('last_played', 'Never')[:10]}\n")
-            file.write(f"Games Played: {profile['games_played']}\n")
-            file.write(f"Total Score: {profile['total_score']}\n")
-            file.write(f"Best Score: {profile['best_score']}\n")
-            file.write(f"Average Score: {profile['total_score'] / max(1, profile['games_played']):.1f}\n")
-            file.write(f"\nAchievements Unlocked:\n")
-            
-            if profile['achievements']:
-                for achievement in profile['achievements']:
-                    file.write(f"• {achievement}\n")
-            else:
-                file.write("• No achievements yet\n")
-            
-            file.write(f"\nReport generated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        
+        ensure_game_data_dir()
+        export_file = write_text_report(profile, GAME_DATA_DIR)
         print(f"📊 Statistics exported to {export_file.name}")
         return True
         
@@ -350,9 +642,145 @@ def export_player_statistics(player_name):
         print(f"❌ Error exporting statistics: {e}")
         return False
 
+def export_all_statistics(export_format="text", workers=4):
+    """Export every player in one pass over the profile store
+    
+    export_format is "text" (a report file per player), "csv" or "jsonl".
+    """
+    profile_store = get_profile_store()
+    progress = ProgressReporter(total=profile_store.count())
+    profiles = profile_store.iter_profiles()
+    
+    try:
+        ensure_game_data_dir()
+        if export_format == "csv":
+            export_csv(profiles, STATS_CSV_FILE, progress)
+            print(f"📊 Statistics exported to {STATS_CSV_FILE.name}")
+        elif export_format == "jsonl":
+            export_jsonl(profiles, STATS_JSONL_FILE, progress)
+            print(f"📊 Statistics exported to {STATS_JSONL_FILE.name}")
+        else:
+            export_text_reports(profiles, GAME_DATA_DIR, workers=workers, progress=progress)
+        progress.finish()
+        return True
+    except Exception as e:
+        print(f"❌ Error exporting statistics: {e}")
+        return False
+
+def get_history_log():
+    """Get the shared game history log (kept open between events)"""
+    return get_storage_backend().history_log()
+
+def get_history_index():
+    """Get the time/player index over the game history"""
+    return get_storage_backend().history_index()
+
 def log_game_event(event_text):
     """Log game events to history file"""
-    return append_to_text_file(GAME_HISTORY_FILE, event_text)
+    return get_history_log().append(event_text)
+
+# GAME DATA SESSIONS
+
+def game_data_session():
+    """Start a unit of work that writes everything a game changed in one commit"""
+    return GameDataSession(get_profile_store(), get_leaderboard(),
+                           lambda game_state, slot_number: save_game(game_state, slot_number, wait=False),
+                           get_history_log())
+
+def benchmark_finished_games(games=20):
+    """Compare files touched and bytes written per finished game, with and without a session
+    
+    Runs in a throwaway directory so the real game data is left alone.
+    """
+    flush_pending_writes()
+    results = {}
+    
+    for mode in ("direct", "session"):
+        work_dir = Path(tempfile.mkdtemp(prefix="mystic_bench_"))
+        backend = create_storage_backend("file", work_dir)
+        previous_backend = use_storage_backend(backend)
+        
+        totals = {"files_touched": 0, "bytes_written": 0, "writes": 0}
+        try:
+            for game_number in range(games):
+                before = IO_STATS.snapshot()
+                _play_benchmark_game(game_number, use_session=(mode == "session"))
+                flush_pending_writes()
+                
+                usage = IOStats.difference(before, IO_STATS.snapshot())
+                for key in totals:
+                    totals[key] += usage[key]
+        finally:
+            backend.close()
+            use_storage_backend(previous_backend)
+            shutil.rmtree(work_dir, ignore_errors=True)
+        
+        results[mode] = {key: value / games for key, value in totals.items()}
+    
+    print(f"\n{'Mode':<10} {'Files/game':<12} {'Writes/game':<12} {'Bytes/game':<12}")
+    for mode, usage in results.items():
+        print(f"{mode:<10} {usage['files_touched']:<12.1f} {usage['writes']:<12.1f} {usage['bytes_written']:<12.0f}")
+    return results
+
+def _play_benchmark_game(game_number, use_session=True):
+    """Record one finished game the way start_new_game does"""
+    player_name = f"Bench{game_number % 3}"
+    game_state = create_player_stats(player_name)
+    game_state["score"] = 50 + (game_number * 37) % 150
+    game_state["achievements"] = ["first_game"]
+    
+    if not use_session:
+        create_player_profile(player_name)
+        log_game_event(f"New game started by {player_name}")
+        save_game(game_state, 1, wait=False)
+        update_player_profile(player_name, game_state)
+        add_highscore(player_name, game_state["score"], "normal")
+        log_game_event(f"Game completed by {player_name} with score {game_state['score']}")
+        return
+    
+    with game_data_session() as session:
+        session.create_player_profile(player_name)
+        session.log_game_event(f"New game started by {player_name}")
+        session.save_game(game_state, 1)
+        session.update_player_profile(player_name, game_state)
+        session.add_highscore(player_name, game_state["score"], "normal")
+        session.log_game_event(f"Game completed by {player_name} with score {game_state['score']}")
+
+def benchmark_storage_backends(games=1000, backend_names=STORAGE_BACKEND_NAMES):
+    """Play the same finished games against each storage backend and compare them
+    
+    Each backend gets a throwaway directory; the game messages are hidden so
+    only the timing and the bytes written are measured.
+    """
+    flush_pending_writes()
+    results = {}
+    
+    for name in backend_names:
+        work_dir = Path(tempfile.mkdtemp(prefix="mystic_backend_"))
+        backend = create_storage_backend(name, work_dir)
+        previous_backend = use_storage_backend(backend)
+        try:
+            before = IO_STATS.snapshot()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for game_number in range(games):
+                    _play_benchmark_game(game_number)
+                backend.flush()
+            elapsed = time.perf_counter() - start
+            usage = IOStats.difference(before, IO_STATS.snapshot())
+        finally:
+            backend.close()
+            use_storage_backend(previous_backend)
+            shutil.rmtree(work_dir, ignore_errors=True)
+        
+        results[name] = {"seconds": elapsed, "games_per_second": games / elapsed if elapsed else 0.0,
+                         "bytes_per_game": usage["bytes_written"] / games}
+    
+    print(f"\n{'Backend':<10} {'Seconds':<10} {'Games/s':<12} {'Bytes/game':<12}")
+    for name, result in results.items():
+        print(f"{name:<10} {result['seconds']:<10.2f} {result['games_per_second']:<12,.0f} "
+              f"{result['bytes_per_game']:<12.0f}")
+    return results
 
 # UTILITY FUNCTIONS
 
@@ -404,15 +832,17 @@ def show_file_management_menu():
         print("4. Game Settings")
         print("5. Export Statistics")
         print("6. View Game History")
-        print("7. Reset All Data")
-        print("8. Back to Main Menu")
+        print("7. Search Game History")
+        print("8. Backups")
+        print("9. Reset All Data")
+        print("10. Back to Main Menu")
         
-        choice = validate_input("Choose option (1-8): ", [str(i) for i in range(1, 9)])
+        choice = validate_input("Choose option (1-10): ", [str(i) for i in range(1, 11)])
         
         if choice == "1":
             manage_save_games()
         elif choice == "2":
-            display_highscores()
+            browse_highscores()
         elif choice == "3":
             manage_player_profiles()
         elif choice == "4":
@@ -422,8 +852,12 @@ def show_file_management_menu():
         elif choice == "6":
             view_game_history()
         elif choice == "7":
-            reset_all_data()
+            search_game_history()
         elif choice == "8":
+            manage_backups()
+        elif choice == "9":
+            reset_all_data()
+        elif choice == "10":
             break
 
 def manage_save_games():
@@ -444,9 +878,11 @@ def manage_save_games():
                 print(f"{i}. [Empty Slot]")
         
         print(f"\n{max_slots + 1}. Delete a save")
-        print(f"{max_slots + 2}. Back to File Management")
+        print(f"{max_slots + 2}. Roll back a save")
+        print(f"{max_slots + 3}. Clean up old saves")
+        print(f"{max_slots + 4}. Back to File Management")
         
-        choice = validate_input("Choose option: ", [str(i) for i in range(1, max_slots + 3)])
+        choice = validate_input("Choose option: ", [str(i) for i in range(1, max_slots + 5)])
         choice_num = int(choice)
         
         if 1 <= choice_num <= max_slots:
@@ -466,26 +902,56 @@ def manage_save_games():
             if delete_slot != "cancel":
                 delete_save(int(delete_slot))
         elif choice_num == max_slots + 2:
+            roll_back_slot = validate_input("Enter slot number to roll back (or 'cancel'): ",
+                                            [str(i) for i in range(1, max_slots + 1)] + ["cancel"])
+            if roll_back_slot != "cancel":
+                roll_back_save(int(roll_back_slot))
+        elif choice_num == max_slots + 3:
+            run_save_retention()
+        elif choice_num == max_slots + 4:
             break
 
+def roll_back_save(slot_number):
+    """Pick an old version of a save slot to restore"""
+    generations = list_save_generations(slot_number)
+    if not generations:
+        print(f"\nSave slot {slot_number} has no older versions")
+        return False
+    
+    print(f"\nOlder versions of slot {slot_number}:")
+    for generation in generations:
+        print(f"{generation['generation']}. {generation['player_name']} - Level {generation['level']} - "
+              f"{generation['location']} - saved {str(generation['save_date'])[:19]}")
+    
+    numbers = [str(generation["generation"]) for generation in generations]
+    choice = validate_input("Restore which version? (or 'cancel'): ", numbers + ["cancel"])
+    if choice == "cancel":
+        return False
+    return restore_save_generation(slot_number, int(choice))
+
 def manage_player_profiles():
     """Manage player profiles"""
     display_header("👤 PLAYER PROFILES")
     
-    profiles = load_player_profiles()
-    
-    if not profiles:
-        print("No player profiles found.")
-        return
-    
-    print("Player Profiles:")
-    for name, profile in profiles.items():
-        print(f"\n👤 {name}")
+    # Streamed from the store a batch at a time, so memory stays flat however many players there are
+    profile_store = get_profile_store()
+    shown = 0
+    for profile in profile_store.iter_profiles(include_archived=False):
+        if not shown:
+            print("Player Profiles:")
+        shown += 1
+        print(f"\n👤 {profile['name']}")
         print(f"   Games Played: {profile['games_played']}")
         print(f"   Best Score: {profile['best_score']}")
         print(f"   Total Score: {profile['total_score']}")
         print(f"   Achievements: {len(profile['achievements'])}")
-        print(f"   Last Played: {profile.get('last_played', 'Never')[:10]}")
+        print(f"   Last Played: {(profile.get('last_played') or 'Never')[:10]}")
+    
+    archived = profile_store.count_archived()
+    if archived:
+        print(f"\n📦 {archived} inactive player(s) archived - they come back when they play again")
+    elif not shown:
+        print("No player profiles found.")
 
 def manage_game_settings():
     """Manage game configuration settings"""
@@ -500,10 +966,11 @@ def manage_game_settings():
         print(f"4. Default Player Name: {config['player_name']}")
         print(f"5. Max Save Slots: {config['max_save_slots']}")
         print(f"6. Display Hints: {config['display_hints']}")
-        print("7. Reset to Defaults")
-        print("8. Back to File Management")
+        print(f"7. Save Format: {config['save_format']}")
+        print("8. Reset to Defaults")
+        print("9. Back to File Management")
         
-        choice = validate_input("Choose option (1-8): ", [str(i) for i in range(1, 9)])
+        choice = validate_input("Choose option (1-9): ", [str(i) for i in range(1, 10)])
         
         if choice == "1":
             difficulty = validate_input("Choose difficulty (easy/normal/hard): ", ["easy", "normal", "hard"])
@@ -526,62 +993,151 @@ def manage_game_settings():
         elif choice == "6":
             config["display_hints"] = not config["display_hints"]
         elif choice == "7":
+            config["save_format"] = validate_input("Choose save format (json/binary): ", ["json", "binary"])
+            if config["save_format"] == "binary":
+                convert = validate_input("Convert existing saves now? (yes/no): ", ["yes", "no"])
+                if convert == "yes":
+                    convert_saves_to_binary()
+        elif choice == "8":
             config = DEFAULT_CONFIG.copy()
             print("⚙️ Settings reset to defaults")
-        elif choice == "8":
+        elif choice == "9":
             break
         
-        if choice != "8":
+        if choice != "9":
             save_config(config)
 
 def export_statistics_menu():
     """Menu for exporting statistics"""
     display_header("📊 EXPORT STATISTICS")
     
-    profiles = load_player_profiles()
+    # Only the names of active players are listed; Export All Players includes the archived ones
+    profile_store = get_profile_store()
+    players = [profile["name"] for profile in profile_store.iter_profiles(include_archived=False)]
     
-    if not profiles:
+    if not players and not profile_store.count_archived():
         print("No player profiles found to export.")
         return
     
     print("Available players:")
-    players = list(profiles.keys())
     for i, player in enumerate(players, 1):
         print(f"{i}. {player}")
     
     print(f"{len(players) + 1}. Export All Players")
-    print(f"{len(players) + 2}. Cancel")
+    print(f"{len(players) + 2}. Export All Profiles (JSON)")
+    print(f"{len(players) + 3}. Cancel")
     
-    choice = validate_input("Choose option: ", [str(i) for i in range(1, len(players) + 3)])
+    choice = validate_input("Choose option: ", [str(i) for i in range(1, len(players) + 4)])
     choice_num = int(choice)
     
     if 1 <= choice_num <= len(players):
         export_player_statistics(players[choice_num - 1])
     elif choice_num == len(players) + 1:
-        for player in players:
-            export_player_statistics(player)
-        print("📊 Exported statistics for all players")
+        export_format = validate_input("Format (text/csv/jsonl): ", ["text", "csv", "jsonl"])
+        if export_all_statistics(export_format):
+            print("📊 Exported statistics for all players")
+    elif choice_num == len(players) + 2:
+        export_player_profiles()
 
 def view_game_history():
     """View game history log"""
     display_header("📜 GAME HISTORY")
     
     try:
-        if GAME_HISTORY_FILE.exists():
-            with open(GAME_HISTORY_FILE, 'r', encoding='utf-8') as file:
-                history = file.readlines()
-            
-            if history:
-                print("Recent game events (last 20):")
-                for line in history[-20:]:
-                    print(line.strip())
-            else:
-                print("No game history recorded yet.")
+        # Reads backwards from the end, so this stays fast however long the history is
+        history = get_history_log().tail(20)
+        
+        if history:
+            print("Recent game events (last 20):")
+            for line in history:
+                print(line.strip())
         else:
-            print("No game history file found.")
+            print("No game history recorded yet.")
     except Exception as e:
         print(f"❌ Error reading game history: {e}")
 
+def search_game_history():
+    """Search the game history by player and time range using the history index"""
+    display_header("🔎 SEARCH GAME HISTORY")
+    
+    history_index = get_history_index()
+    players = history_index.players()
+    if players:
+        print(f"Players in history: {', '.join(players)}")
+    
+    player_name = input("Player name (or press Enter for everyone): ").strip() or None
+    
+    print("1. Today")
+    print("2. Last 7 days")
+    print("3. Custom range")
+    print("4. All time")
+    period = validate_input("Choose period (1-4): ", ["1", "2", "3", "4"])
+    
+    now = datetime.datetime.now()
+    start = end = None
+    if period == "1":
+        start = datetime.datetime.combine(now.date(), datetime.time())
+    elif period == "2":
+        start = now - datetime.timedelta(days=7)
+    elif period == "3":
+        try:
+            start = datetime.datetime.fromisoformat(input("From (YYYY-MM-DD [HH:MM]): ").strip())
+            end_text = input("To (YYYY-MM-DD [HH:MM], Enter for now): ").strip()
+            end = datetime.datetime.fromisoformat(end_text) if end_text else None
+            if end and len(end_text) <= len("YYYY-MM-DD"):
+                end = datetime.datetime.combine(end.date(), datetime.time.max)  # The whole "To" day
+        except ValueError:
+            print("❌ Invalid date")
+            return
+    
+    only_completed = validate_input("Only completed games? (yes/no): ", ["yes", "no"]) == "yes"
+    
+    try:
+        if only_completed:
+            games = history_index.games_completed(start=start, end=end, player=player_name)
+            print(f"\n🏁 {len(games)} completed game(s)")
+            for when, player, score in games[-20:]:
+                print(f"{when:%Y-%m-%d %H:%M}  {player:<15} {score if score is not None else '?'} points")
+        else:
+            events = history_index.events(player=player_name, start=start, end=end)
+            print(f"\n📜 {len(events)} event(s)" + (" - showing the last 20" if len(events) > 20 else ""))
+            for line in events[-20:]:
+                print(line)
+    except Exception as e:
+        print(f"❌ Error searching game history: {e}")
+
+def manage_backups():
+    """Take backups of the game data and restore them"""
+    while True:
+        display_header("🗄️ BACKUPS")
+        
+        backups = list_backups()
+        if backups:
+            for number, backup in enumerate(backups, 1):
+                print(f"{number}. {backup['created'][:19]} - {backup['label']} - {backup['files']} files, "
+                      f"{backup['size']:,} bytes ({backup['bytes_stored']:,} new)")
+        else:
+            print("No backups yet")
+        
+        print("\n1. Back up now")
+        print("2. Restore a backup")
+        print("3. Back to File Management")
+        
+        choice = validate_input("Choose option (1-3): ", ["1", "2", "3"])
+        
+        if choice == "1":
+            backup_game_data()
+        elif choice == "2":
+            if not backups:
+                print("❌ There is no backup to restore")
+                continue
+            numbers = [str(number) for number in range(1, len(backups) + 1)]
+            restore_choice = validate_input("Restore which backup? (or 'cancel'): ", numbers + ["cancel"])
+            if restore_choice != "cancel":
+                restore_game_data(backups[int(restore_choice) - 1]["id"])
+        elif choice == "3":
+            break
+
 def reset_all_data():
     """Reset all game data with confirmation"""
     display_header("🗑️ RESET ALL DATA")
@@ -596,21 +1152,28 @@ def reset_all_data():
     confirm = validate_input("Are you sure? Type 'DELETE ALL' to confirm: ", ["delete all", "cancel"])
     
     if confirm == "delete all":
+        backup_id = None
+        if load_config().get("backup_before_reset", True) and get_storage_backend().name != "memory":
+            backup_id = backup_game_data("before reset")
+            if backup_id is None:
+                print("❌ Reset cancelled: the data could not be backed up first")
+                return
         try:
-            # Delete all files
-            for file_path in [CONFIG_FILE, HIGHSCORES_FILE, PLAYER_PROFILES_FILE, GAME_HISTORY_FILE]:
-                if file_path.exists():
-                    file_path.unlink()
+            flush_pending_writes()
             
-            # Delete save files
-            for save_file in SAVE_FILES_DIR.glob("save_*.json"):
-                save_file.unlink()
+            # Delete profiles, scores, saves, settings and history from the storage backend
+            get_storage_backend().delete_all()
             
             # Delete exported statistics
             for stats_file in GAME_DATA_DIR.glob("*_stats.txt"):
                 stats_file.unlink()
+            for stats_file in [STATS_CSV_FILE, STATS_JSONL_FILE]:
+                if stats_file.exists():
+                    stats_file.unlink()
             
             print("🗑️ All game data has been deleted.")
+            if backup_id is not None:
+                print(f"💾 Backup {backup_id} can bring it back (File Management → Backups)")
             
         except Exception as e:
             print(f"❌ Error deleting data: {e}")
@@ -630,14 +1193,17 @@ def start_new_game():
     if not player_name:
         player_name = default_name
     
+    # Everything this game changes is written together when it finishes
+    session = game_data_session()
+    
     # Create player profile
-    create_player_profile(player_name)
+    session.create_player_profile(player_name)
     
     # Initialize game state
     game_state = create_player_stats(player_name)
     
     # Log game start
-    log_game_event(f"New game started by {player_name}")
+    session.log_game_event(f"New game started by {player_name}")
     
     # Simple game simulation
     print(f"\n🌲 Welcome to the Mystic Forest, {player_name}!")
@@ -651,16 +1217,18 @@ def start_new_game():
     
     # Auto-save if enabled
     if config.get("auto_save", True):
-        save_game(game_state, 1)
+        session.save_game(game_state, 1)
     
     # Update player profile
-    update_player_profile(player_name, game_state)
+    session.update_player_profile(player_name, game_state)
     
     # Add to high scores
-    add_highscore(player_name, game_state["score"], config["difficulty"])
+    session.add_highscore(player_name, game_state["score"], config["difficulty"])
     
     # Log game completion
-    log_game_event(f"Game completed by {player_name} with score {game_state['score']}")
+    session.log_game_event(f"Game completed by {player_name} with score {game_state['score']}")
+    
+    session.commit()
     
     print(f"\n🎉 Game completed! Final score: {game_state['score']}")
 
@@ -687,15 +1255,17 @@ def load_existing_game():
     game_state = load_game(int(choice))
     if game_state:
         print(f"🎮 Resuming game for {game_state['player_name']}")
-        log_game_event(f"Game loaded by {game_state['player_name']} from slot {choice}")
-        
-        # Continue game simulation
-        print("Continuing your adventure...")
-        game_state["score"] += random.randint(20, 80)
         
-        # Save progress
-        save_game(game_state, int(choice))
-        update_player_profile(game_state["player_name"], game_state)
+        with game_data_session() as session:
+            session.log_game_event(f"Game loaded by {game_state['player_name']} from slot {choice}")
+            
+            # Continue game simulation
+            print("Continuing your adventure...")
+            game_state["score"] += random.randint(20, 80)
+            
+            # Save progress
+            session.save_game(game_state, int(choice))
+            session.update_player_profile(game_state["player_name"], game_state)
         
         print(f"🎉 Adventure continues! Current score: {game_state['score']}")
 
@@ -703,9 +1273,12 @@ def main_game_loop():
     """Main game loop with file handling capabilities"""
     display_header("🌲 THE MYSTIC FOREST ADVENTURE - FILE HANDLING EDITION 🌲")
     
-    # Load configuration
+    # Load configuration and pick up edits made while the game runs
     config = load_config()
     print(f"⚙️ Game difficulty: {config['difficulty']}")
+    config_cache = get_config_cache()
+    config_cache.subscribe(on_config_reloaded)
+    config_cache.start_watching()
     
     while True:
         print("\n🎮 MAIN MENU")
@@ -728,6 +1301,10 @@ def main_game_loop():
         elif choice == "5":
             print("\n👋 Thanks for playing!")
             log_game_event("Game session ended")
+            get_history_log().close()
+            config_cache.stop_watching()
+            config_cache.unsubscribe(on_config_reloaded)
+            flush_pending_writes()
             break
     
     print("\n📚 FILE HANDLING CONCEPTS DEMONSTRATED:")
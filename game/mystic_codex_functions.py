@@ -3,24 +3,28 @@
 
 import random
 
+# The story functions never call input() or print() themselves: each one gets the
+# player's choice as a parameter and writes its text through say (print by default).
+# game_step() strings them together, so the same game runs at the console or headless.
+
 # UTILITY FUNCTIONS - These handle common tasks throughout the game
 
-def display_header(title):
+def display_header(title, say=print):
     """Display a formatted header for different game sections"""
-    print("\n" + "=" * 50)
-    print(f"    {title}")
-    print("=" * 50)
+    say("\n" + "=" * 50)
+    say(f"    {title}")
+    say("=" * 50)
 
-def display_stats(health, energy, inventory=None, score=0):
+def display_stats(health, energy, inventory=None, score=0, say=print):
     """Display current player stats in a formatted way"""
-    print("\n--- Your Stats ---")
-    print(f"Health: {health}/100")
-    print(f"Energy: {energy}/100")
+    say("\n--- Your Stats ---")
+    say(f"Health: {health}/100")
+    say(f"Energy: {energy}/100")
     if inventory is not None:
-        print(f"Inventory: {inventory}")
+        say(f"Inventory: {inventory}")
     if score > 0:
-        print(f"Score: {score}")
-    print("------------------")
+        say(f"Score: {score}")
+    say("------------------")
 
 def validate_input(prompt, valid_choices):
     """Get valid input from player with error handling - uses loops"""
@@ -32,14 +36,14 @@ def validate_input(prompt, valid_choices):
         else:
             print("❌ Invalid choice! Please try again.")
 
-def show_inventory(inventory):
+def show_inventory(inventory, say=print):
     """Display inventory contents in a nice format"""
     if not inventory:
-        print("📦 Your inventory is empty.")
+        say("📦 Your inventory is empty.")
     else:
-        print("📦 Your inventory contains:")
+        say("📦 Your inventory contains:")
         for i, item in enumerate(inventory, 1):
-            print(f"  {i}. {item}")
+            say(f"  {i}. {item}")
 
 def calculate_ending_score(health, energy, inventory, locations_visited):
     """Calculate final score based on player performance"""
@@ -60,9 +64,9 @@ def show_main_menu():
         print("2. View High Scores")
         print("3. Exit Game")
         print()
-        
+
         choice = input("Choose an option (1-3): ")
-        
+
         # Use conditions to handle different menu choices
         if choice == "1":
             return "start"
@@ -83,540 +87,530 @@ def show_high_scores():
     print("Most Items Found: Treasure Hunter - 8 items")
     print()
 
-def initialize_game():
+def initialize_game(say=print):
     """Initialize game variables and show introduction"""
-    display_header("🌲 THE MYSTIC FOREST ADVENTURE 🌲")
-    print("\nYou wake up in a dark, mysterious forest with no memory of how you got here.")
-    print("Strange sounds echo through the trees, and an eerie mist surrounds you.")
-    print("Your goal is to find your way out safely...\n")
-    
+    display_header("🌲 THE MYSTIC FOREST ADVENTURE 🌲", say)
+    say("\nYou wake up in a dark, mysterious forest with no memory of how you got here.")
+    say("Strange sounds echo through the trees, and an eerie mist surrounds you.")
+    say("Your goal is to find your way out safely...\n")
+
     # Return initial game state
     return {
         'health': 100,
         'energy': 100,
         'inventory': [],
         'score': 0,
-        'locations_visited': []
+        'locations_visited': [],
+        # Where the game is up to, so game_step knows what the next choice means
+        'phase': None,
+        'path': None,
+        'ending': None,
+        'search_number': 0,
+        'puzzle': None,
+        'combat': None,
+        'explore_prompt': None
     }
 
 # PATH SELECTION AND STORY FUNCTIONS
 
-def choose_initial_path():
+def show_initial_paths(say=print):
+    """Describe the three paths at the forest entrance"""
+    display_header("🌲 FOREST ENTRANCE", say)
+    say("You see three paths ahead:")
+    say("1. A well-lit path with singing birds")
+    say("2. A dark, narrow trail with glowing mushrooms")
+    say("3. A rocky path leading uphill")
+
+def choose_initial_path(choice, say=print):
     """Handle the first major decision point - uses conditions"""
-    display_header("🌲 FOREST ENTRANCE")
-    print("You see three paths ahead:")
-    print("1. A well-lit path with singing birds")
-    print("2. A dark, narrow trail with glowing mushrooms")
-    print("3. A rocky path leading uphill")
-    
-    choice = validate_input("Which path do you choose? (1, 2, or 3): ", ['1', '2', '3'])
-    
     # Use conditions to determine path effects
     if choice == '1':
-        print("\n🐦 You chose the well-lit path...")
-        print("The birds guide you safely, but you feel tired from the long walk.")
-        print("You lose 20 energy but stay safe.")
+        say("\n🐦 You chose the well-lit path...")
+        say("The birds guide you safely, but you feel tired from the long walk.")
+        say("You lose 20 energy but stay safe.")
         return "bright", -20, 0  # path_type, energy_change, health_change
     elif choice == '2':
-        print("\n🍄 You chose the dark trail...")
-        print("The glowing mushrooms are beautiful but emit strange spores.")
-        print("You lose 15 health but gain 10 energy from the magical mushrooms.")
+        say("\n🍄 You chose the dark trail...")
+        say("The glowing mushrooms are beautiful but emit strange spores.")
+        say("You lose 15 health but gain 10 energy from the magical mushrooms.")
         return "dark", 10, -15
     else:  # choice == '3'
-        print("\n🗻 You chose the rocky uphill path...")
-        print("The climb is exhausting but you get a great view of the area.")
-        print("You lose 30 energy from the difficult climb.")
+        say("\n🗻 You chose the rocky uphill path...")
+        say("The climb is exhausting but you get a great view of the area.")
+        say("You lose 30 energy from the difficult climb.")
         return "mountain", -30, 0
 
-def bright_path_adventure(game_state):
+def show_bright_path(say=print):
+    """Describe the clearing at the end of the bright path"""
+    display_header("🌞 THE BRIGHT PATH", say)
+    say("You reach a clearing with a sparkling fountain and a friendly hermit.")
+    say("The hermit offers you a choice:")
+    say("1. Drink from the magical fountain")
+    say("2. Ask the hermit for directions")
+    say("3. Rest by the fountain")
+
+def bright_path_adventure(game_state, choice, say=print):
     """Handle the bright path storyline - uses conditions"""
-    display_header("🌞 THE BRIGHT PATH")
-    print("You reach a clearing with a sparkling fountain and a friendly hermit.")
-    print("The hermit offers you a choice:")
-    print("1. Drink from the magical fountain")
-    print("2. Ask the hermit for directions")
-    print("3. Rest by the fountain")
-    
-    choice = validate_input("What do you do? (1, 2, or 3): ", ['1', '2', '3'])
-    
     # Use nested conditions for different outcomes
     if choice == '1':
-        print("\n💧 You drink from the fountain...")
+        say("\n💧 You drink from the fountain...")
         if game_state['health'] >= 80:
-            print("The water tastes amazing! You feel completely refreshed.")
+            say("The water tastes amazing! You feel completely refreshed.")
             game_state['health'] = 100
             game_state['energy'] = 100
-            print("Your health and energy are fully restored!")
+            say("Your health and energy are fully restored!")
         else:
-            print("The water helps, but you needed more healing.")
+            say("The water helps, but you needed more healing.")
             game_state['health'] = min(100, game_state['health'] + 30)
             game_state['energy'] = min(100, game_state['energy'] + 20)
-            print("You gain 30 health and 20 energy.")
+            say("You gain 30 health and 20 energy.")
         game_state['score'] += 25
         return "fountain"
     elif choice == '2':
-        print("\n🧙 You ask the hermit for help...")
-        print("The hermit gives you a map and some advice about avoiding dangers.")
+        say("\n🧙 You ask the hermit for help...")
+        say("The hermit gives you a map and some advice about avoiding dangers.")
         game_state['energy'] = min(100, game_state['energy'] + 15)
         game_state['inventory'].append("hermit's map")
         game_state['score'] += 20
-        print("You gain 15 energy and receive a helpful map!")
+        say("You gain 15 energy and receive a helpful map!")
         return "hermit"
     else:
-        print("\n😴 You rest by the fountain...")
+        say("\n😴 You rest by the fountain...")
         game_state['energy'] = min(100, game_state['energy'] + 25)
         game_state['score'] += 15
-        print("You gain 25 energy from the peaceful rest.")
+        say("You gain 25 energy from the peaceful rest.")
         return "rest"
 
-def dark_path_adventure(game_state):
+def show_dark_path(say=print):
+    """Describe the creature on the dark trail"""
+    display_header("🌙 THE DARK TRAIL", say)
+    say("You encounter a mysterious creature blocking your path!")
+    say("It doesn't seem hostile, but it's watching you carefully.")
+    say("1. Try to communicate with the creature")
+    say("2. Sneak around it quietly")
+    say("3. Offer it some food from your backpack")
+
+def dark_path_adventure(game_state, choice, say=print):
     """Handle the dark path storyline - uses conditions"""
-    display_header("🌙 THE DARK TRAIL")
-    print("You encounter a mysterious creature blocking your path!")
-    print("It doesn't seem hostile, but it's watching you carefully.")
-    print("1. Try to communicate with the creature")
-    print("2. Sneak around it quietly")
-    print("3. Offer it some food from your backpack")
-    
-    choice = validate_input("What do you do? (1, 2, or 3): ", ['1', '2', '3'])
-    
     # Conditions based on current stats
     if choice == '1':
-        print("\n🗣️ You try to communicate...")
+        say("\n🗣️ You try to communicate...")
         if game_state['health'] >= 70:
-            print("Your strong presence impresses the creature!")
-            print("It leads you to a secret exit from the forest.")
+            say("Your strong presence impresses the creature!")
+            say("It leads you to a secret exit from the forest.")
             game_state['score'] += 30
             return "creature_ally"
         else:
-            print("The creature senses your weakness and growls menacingly.")
-            print("It attacks! You barely escape but are badly injured.")
-            if apply_stat_changes(game_state, -25, -15):
+            say("The creature senses your weakness and growls menacingly.")
+            say("It attacks! You barely escape but are badly injured.")
+            if apply_stat_changes(game_state, -25, -15, say):
                 return "game_over"
             return "barely_escaped"
-            
+
     elif choice == '2':
-        print("\n🤫 You sneak around quietly...")
+        say("\n🤫 You sneak around quietly...")
         if game_state['energy'] >= 60:
-            print("You successfully sneak past! The creature never noticed.")
+            say("You successfully sneak past! The creature never noticed.")
             game_state['energy'] -= 20
             game_state['score'] += 25
             return "stealth"
         else:
-            print("You're too tired to sneak properly and step on a branch!")
-            print("The creature notices and chases you! You run but trip and fall.")
-            if apply_stat_changes(game_state, -20, -20):
+            say("You're too tired to sneak properly and step on a branch!")
+            say("The creature notices and chases you! You run but trip and fall.")
+            if apply_stat_changes(game_state, -20, -20, say):
                 return "game_over"
-            print("You manage to get away but are hurt and exhausted.")
+            say("You manage to get away but are hurt and exhausted.")
             return "failed_stealth"
     else:
-        print("\n🍞 You offer food to the creature...")
-        print("The creature accepts your gift gratefully!")
+        say("\n🍞 You offer food to the creature...")
+        say("The creature accepts your gift gratefully!")
         game_state['energy'] = max(0, game_state['energy'] - 5)
         game_state['inventory'].append("creature's blessing")
         game_state['score'] += 35
         return "friendship"
 
-def mountain_path_adventure(game_state):
+def show_mountain_path(say=print):
+    """Describe the view from the mountain top"""
+    display_header("⛰️ THE MOUNTAIN PATH", say)
+    say("From the mountain top, you see the entire forest spread below you.")
+    say("You spot three possible ways down:")
+    say("1. A steep but direct path down")
+    say("2. A winding path through caves")
+    say("3. Wait for help (you saw smoke from a distant cabin)")
+
+def mountain_path_adventure(game_state, choice, say=print):
     """Handle the mountain path storyline - uses conditions"""
-    display_header("⛰️ THE MOUNTAIN PATH")
-    print("From the mountain top, you see the entire forest spread below you.")
-    print("You spot three possible ways down:")
-    print("1. A steep but direct path down")
-    print("2. A winding path through caves")
-    print("3. Wait for help (you saw smoke from a distant cabin)")
-    
-    choice = validate_input("What do you choose? (1, 2, or 3): ", ['1', '2', '3'])
-    
     # Energy-dependent outcomes with real consequences
     if choice == '1':
-        print("\n⬇️ You take the steep path...")
+        say("\n⬇️ You take the steep path...")
         if game_state['energy'] >= 40:
-            print("You carefully make your way down without injury.")
+            say("You carefully make your way down without injury.")
             game_state['energy'] -= 20
             game_state['score'] += 20
             return "safe_descent"
         else:
-            print("You're too tired and slip badly, tumbling down the rocky slope!")
-            print("You hit your head on a rock and lose consciousness...")
-            if apply_stat_changes(game_state, -40, -25):
+            say("You're too tired and slip badly, tumbling down the rocky slope!")
+            say("You hit your head on a rock and lose consciousness...")
+            if apply_stat_changes(game_state, -40, -25, say):
                 return "game_over"
-            print("You wake up battered and bleeding but somehow still alive.")
+            say("You wake up battered and bleeding but somehow still alive.")
             return "dangerous_fall"
-            
+
     elif choice == '2':
-        print("\n🕳️ You enter the caves...")
+        say("\n🕳️ You enter the caves...")
         if game_state['energy'] >= 20:
-            print("The caves are dark but lead to an underground river.")
+            say("The caves are dark but lead to an underground river.")
             game_state['energy'] -= 15
             game_state['score'] += 30
             return "cave_river"
         else:
-            print("You're too exhausted to navigate the dark caves safely.")
-            print("You get lost in the darkness and panic, using up your remaining energy.")
-            if apply_stat_changes(game_state, -10, -15):
+            say("You're too exhausted to navigate the dark caves safely.")
+            say("You get lost in the darkness and panic, using up your remaining energy.")
+            if apply_stat_changes(game_state, -10, -15, say):
                 return "game_over"
-            print("You eventually find your way out, but you're in terrible condition.")
+            say("You eventually find your way out, but you're in terrible condition.")
             return "lost_in_caves"
     else:
-        print("\n🏠 You wait for help...")
-        print("A friendly ranger finds you and escorts you to safety.")
+        say("\n🏠 You wait for help...")
+        say("A friendly ranger finds you and escorts you to safety.")
         game_state['energy'] = max(0, game_state['energy'] - 10)
         game_state['score'] += 25
         return "rescue"
 
 # EXPLORATION AND COLLECTION FUNCTIONS
 
-def item_collection_phase(game_state):
-    """Handle item collection using loops"""
-    display_header("🔍 EXPLORATION PHASE")
-    print("You notice several items scattered around the area...")
-    
-    possible_items = ["healing potion", "energy crystal", "magic rope", "ancient coin", "forest map"]
-    
-    # FOR LOOP - Check each possible item location
-    for i in range(3):  # Player can search 3 locations
-        print(f"\n📍 Search location {i + 1}:")
-        search_choice = validate_input("Do you want to search this area? (y/n): ", ['y', 'n'])
-        
-        if search_choice == 'y':
-            # Use conditions with random chance
-            if random.random() > 0.3:  # 70% chance to find something
-                found_item = random.choice(possible_items)
-                game_state['inventory'].append(found_item)
-                print(f"✨ You found a {found_item}!")
-                
-                # Apply item effects using conditions
-                if found_item == "healing potion":
-                    game_state['health'] = min(100, game_state['health'] + 20)
-                    print("You drink it immediately and gain 20 health!")
-                elif found_item == "energy crystal":
-                    game_state['energy'] = min(100, game_state['energy'] + 15)
-                    print("You absorb its power and gain 15 energy!")
-                
-                game_state['score'] += 10
-            else:
-                print("🚫 You found nothing here.")
+POSSIBLE_ITEMS = ["healing potion", "energy crystal", "magic rope", "ancient coin", "forest map"]
+SEARCH_LOCATIONS = 3  # Player can search 3 locations
+
+def search_location(game_state, choice, rng=random, say=print):
+    """Handle searching one location of the item collection phase"""
+    if choice == 'y':
+        # Use conditions with random chance
+        if rng.random() > 0.3:  # 70% chance to find something
+            found_item = rng.choice(POSSIBLE_ITEMS)
+            game_state['inventory'].append(found_item)
+            say(f"✨ You found a {found_item}!")
+
+            # Apply item effects using conditions
+            if found_item == "healing potion":
+                game_state['health'] = min(100, game_state['health'] + 20)
+                say("You drink it immediately and gain 20 health!")
+            elif found_item == "energy crystal":
+                game_state['energy'] = min(100, game_state['energy'] + 15)
+                say("You absorb its power and gain 15 energy!")
+
+            game_state['score'] += 10
         else:
-            print("⏭️ You skip searching this area.")
-
-def solve_puzzle(game_state):
-    """Handle puzzle solving with multiple attempts - uses loops"""
-    display_header("🧩 ANCIENT PUZZLE")
-    print("You encounter an ancient stone puzzle that blocks your path.")
-    print("The puzzle has mystical numbers that must be solved...")
-    
+            say("🚫 You found nothing here.")
+    else:
+        say("⏭️ You skip searching this area.")
+
+def start_puzzle(rng=random, say=print):
+    """Show the ancient puzzle and make up its numbers"""
+    display_header("🧩 ANCIENT PUZZLE", say)
+    say("You encounter an ancient stone puzzle that blocks your path.")
+    say("The puzzle has mystical numbers that must be solved...")
+
     # Generate puzzle
-    puzzle_num1 = random.randint(5, 15)
-    puzzle_num2 = random.randint(3, 8)
-    correct_answer = puzzle_num1 + puzzle_num2
-    
-    attempts = 0
-    max_attempts = 3
-    
-    # WHILE LOOP - Multiple attempts
-    while attempts < max_attempts:
-        attempts += 1
-        print(f"\n🔢 Attempt {attempts}/{max_attempts}")
-        print(f"What is {puzzle_num1} + {puzzle_num2}?")
-        
-        try:
-            player_answer = int(input("Enter your answer: "))
-            
-            # Use conditions to check answer
-            if player_answer == correct_answer:
-                print("✅ Correct! The puzzle glows and moves aside.")
-                game_state['energy'] = min(100, game_state['energy'] + 10)
-                game_state['score'] += 30
-                print("You gain 10 energy and 30 points for solving the puzzle!")
-                return True
-            else:
-                print(f"❌ Incorrect. The correct answer was {correct_answer}.")
-                if attempts < max_attempts:
-                    print("The puzzle gives you another chance...")
-                    
-        except ValueError:
-            print("❌ Please enter a valid number.")
-            attempts -= 1  # Don't count invalid input
-    
-    print("\n🔨 The puzzle remains unsolved, but you find a way around it.")
+    puzzle_num1 = rng.randint(5, 15)
+    puzzle_num2 = rng.randint(3, 8)
+    return {'numbers': (puzzle_num1, puzzle_num2), 'answer': puzzle_num1 + puzzle_num2,
+            'attempts': 0, 'max_attempts': 3}
+
+def show_puzzle_attempt(puzzle, say=print):
+    """Show the next attempt at the puzzle"""
+    say(f"\n🔢 Attempt {puzzle['attempts'] + 1}/{puzzle['max_attempts']}")
+    say(f"What is {puzzle['numbers'][0]} + {puzzle['numbers'][1]}?")
+
+def solve_puzzle(game_state, puzzle, answer, say=print):
+    """Handle one answer to the puzzle - True if solved, False if out of attempts, None to try again"""
+    try:
+        player_answer = int(answer)
+    except ValueError:
+        say("❌ Please enter a valid number.")
+        return None  # Don't count invalid input
+    puzzle['attempts'] += 1
+
+    # Use conditions to check answer
+    if player_answer == puzzle['answer']:
+        say("✅ Correct! The puzzle glows and moves aside.")
+        game_state['energy'] = min(100, game_state['energy'] + 10)
+        game_state['score'] += 30
+        say("You gain 10 energy and 30 points for solving the puzzle!")
+        return True
+    say(f"❌ Incorrect. The correct answer was {puzzle['answer']}.")
+    if puzzle['attempts'] < puzzle['max_attempts']:
+        say("The puzzle gives you another chance...")
+        return None
+
+    say("\n🔨 The puzzle remains unsolved, but you find a way around it.")
     game_state['energy'] = max(0, game_state['energy'] - 5)
-    print("You lose 5 energy finding an alternate path.")
+    say("You lose 5 energy finding an alternate path.")
     return False
 
-def combat_encounter(game_state):
-    """Handle combat system using loops and conditions"""
-    display_header("⚔️ COMBAT ENCOUNTER")
-    print("A shadow creature emerges from the darkness!")
-    
-    enemy_health = 35  # Made slightly stronger
-    battle_round = 0
-    
-    # WHILE LOOP - Battle continues until someone is defeated
-    while game_state['health'] > 0 and enemy_health > 0:
-        battle_round += 1
-        print(f"\n🥊 Battle Round {battle_round}")
-        print(f"Your Health: {game_state['health']} | Enemy Health: {enemy_health}")
-        
-        print("\nChoose your action:")
-        print("1. Attack (deal 8-12 damage)")
-        print("2. Use healing potion (if you have one)")
-        print("3. Try to flee")
-        
-        action = validate_input("What do you do? (1-3): ", ['1', '2', '3'])
-        
-        # Use conditions to handle different actions
-        if action == '1':
-            damage = random.randint(8, 12)
-            enemy_health -= damage
-            print(f"⚔️ You deal {damage} damage to the creature!")
-            
-        elif action == '2':
-            if "healing potion" in game_state['inventory']:
-                game_state['inventory'].remove("healing potion")
-                game_state['health'] = min(100, game_state['health'] + 25)
-                print("🧪 You drink a healing potion and recover 25 health!")
-            else:
-                print("❌ You don't have any healing potions!")
-                print("You waste your turn searching your inventory!")
-                # Enemy gets extra attack for wasted turn
-                enemy_damage = random.randint(8, 15)
-                game_state['health'] = max(0, game_state['health'] - enemy_damage)
-                print(f"👹 The creature takes advantage and deals {enemy_damage} extra damage!")
-                if game_state['health'] <= 0:
-                    print("\n💀 You have been defeated in battle...")
-                    return "combat_death"
-                continue
-                
-        elif action == '3':
-            # Flee chance depends on current health and energy
-            flee_chance = 0.3 if game_state['health'] < 30 else 0.5
-            if random.random() < flee_chance:
-                print("🏃 You successfully escape from the battle!")
-                game_state['energy'] = max(0, game_state['energy'] - 15)
-                return "fled_combat"
-            else:
-                print("❌ You couldn't escape! The creature blocks your path.")
-                print("Your failed escape attempt leaves you vulnerable!")
-        
-        # Check if enemy is defeated
-        if enemy_health <= 0:
-            print("\n🎉 Victory! You defeated the shadow creature!")
-            game_state['score'] += 50
-            game_state['inventory'].append("shadow essence")
-            print("You gain 50 points and find a magical artifact!")
-            return "combat_victory"
-        
-        # Enemy's turn - damage increases as battle goes on
-        if enemy_health > 0:
-            base_damage = random.randint(5, 12)
-            # Creature gets more dangerous when wounded
-            if enemy_health <= 15:
-                base_damage += 3
-                print("The creature becomes more vicious as it's wounded!")
-            
-            game_state['health'] = max(0, game_state['health'] - base_damage)
-            print(f"👹 The creature attacks you for {base_damage} damage!")
-            
+# COMBAT
+
+SHADOW_CREATURE_HEALTH = 35  # Made slightly stronger
+
+def start_combat(say=print):
+    """Begin the fight with the shadow creature"""
+    display_header("⚔️ COMBAT ENCOUNTER", say)
+    say("A shadow creature emerges from the darkness!")
+    return {'enemy_health': SHADOW_CREATURE_HEALTH, 'round': 0}
+
+def show_combat_round(game_state, combat, say=print):
+    """Start the next battle round and show the choices"""
+    combat['round'] += 1
+    say(f"\n🥊 Battle Round {combat['round']}")
+    say(f"Your Health: {game_state['health']} | Enemy Health: {combat['enemy_health']}")
+
+    say("\nChoose your action:")
+    say("1. Attack (deal 8-12 damage)")
+    say("2. Use healing potion (if you have one)")
+    say("3. Try to flee")
+
+def combat_encounter(game_state, combat, action, rng=random, say=print):
+    """Handle one battle round - returns how the fight ended, or None if it goes on"""
+    # Use conditions to handle different actions
+    if action == '1':
+        damage = rng.randint(8, 12)
+        combat['enemy_health'] -= damage
+        say(f"⚔️ You deal {damage} damage to the creature!")
+
+    elif action == '2':
+        if "healing potion" in game_state['inventory']:
+            game_state['inventory'].remove("healing potion")
+            game_state['health'] = min(100, game_state['health'] + 25)
+            say("🧪 You drink a healing potion and recover 25 health!")
+        else:
+            say("❌ You don't have any healing potions!")
+            say("You waste your turn searching your inventory!")
+            # Enemy gets extra attack for wasted turn
+            enemy_damage = rng.randint(8, 15)
+            game_state['health'] = max(0, game_state['health'] - enemy_damage)
+            say(f"👹 The creature takes advantage and deals {enemy_damage} extra damage!")
             if game_state['health'] <= 0:
-                print("\n💀 You have been defeated in battle...")
+                say("\n💀 You have been defeated in battle...")
                 return "combat_death"
-    
-    return "combat_victory"
-
-def exploration_system(game_state):
-    """Handle location exploration using loops"""
-    display_header("🗺️ EXPLORATION SYSTEM")
-    print("You can now explore different areas of the forest...")
-    
-    # Check if player has enough energy to explore
+            return None
+
+    elif action == '3':
+        # Flee chance depends on current health and energy
+        flee_chance = 0.3 if game_state['health'] < 30 else 0.5
+        if rng.random() < flee_chance:
+            say("🏃 You successfully escape from the battle!")
+            game_state['energy'] = max(0, game_state['energy'] - 15)
+            return "fled_combat"
+        else:
+            say("❌ You couldn't escape! The creature blocks your path.")
+            say("Your failed escape attempt leaves you vulnerable!")
+
+    # Check if enemy is defeated
+    if combat['enemy_health'] <= 0:
+        say("\n🎉 Victory! You defeated the shadow creature!")
+        game_state['score'] += 50
+        game_state['inventory'].append("shadow essence")
+        say("You gain 50 points and find a magical artifact!")
+        return "combat_victory"
+
+    # Enemy's turn - damage increases as battle goes on
+    base_damage = rng.randint(5, 12)
+    # Creature gets more dangerous when wounded
+    if combat['enemy_health'] <= 15:
+        base_damage += 3
+        say("The creature becomes more vicious as it's wounded!")
+
+    game_state['health'] = max(0, game_state['health'] - base_damage)
+    say(f"👹 The creature attacks you for {base_damage} damage!")
+
+    if game_state['health'] <= 0:
+        say("\n💀 You have been defeated in battle...")
+        return "combat_death"
+    return None
+
+# LOCATION EXPLORATION
+
+AVAILABLE_LOCATIONS = {
+    '1': 'Crystal Cave',
+    '2': 'Ancient Grove',
+    '3': 'Mystical Spring'
+}
+
+def show_exploration_choices(game_state, say=print):
+    """List the places left to explore"""
+    say("\n🌲 Available Locations:")
+    for key, location in AVAILABLE_LOCATIONS.items():
+        visited = "✓" if location in game_state['locations_visited'] else ""
+        say(f"{key}. {location} {visited}")
+    say("4. Continue to Exit")
+
+def exploration_system(game_state, choice, rng=random, say=print):
+    """Handle one choice of where to explore - returns "exit", "game_over", "tired" or "rested"
+
+    "tired" means the player is dangerously exhausted and is asked whether to
+    risk more; "rested" means they can go on and are asked whether to.
+    """
+    if choice == '4':
+        say("\n➡️ You decide to head toward the forest exit.")
+        return "exit"
+
+    location = AVAILABLE_LOCATIONS[choice]
+    if explore_location(game_state, location, rng, say):
+        return "game_over"
+
+    # Each exploration costs energy
+    game_state['energy'] = max(0, game_state['energy'] - 8)
+
+    # Check for exhaustion
     if game_state['energy'] <= 15:
-        print("You're too exhausted to explore safely.")
-        print("You must find the exit before you collapse!")
-        return
-    
-    available_locations = {
-        '1': 'Crystal Cave',
-        '2': 'Ancient Grove', 
-        '3': 'Mystical Spring'
-    }
-    
-    # WHILE LOOP - Continue exploring until player chooses to stop
-    while game_state['energy'] > 15:
-        print("\n🌲 Available Locations:")
-        for key, location in available_locations.items():
-            visited = "✓" if location in game_state['locations_visited'] else ""
-            print(f"{key}. {location} {visited}")
-        print("4. Continue to Exit")
-        
-        choice = validate_input("Where do you want to explore? (1-4): ", ['1', '2', '3', '4'])
-        
-        if choice == '4':
-            print("\n➡️ You decide to head toward the forest exit.")
-            break
-        
-        location = available_locations[choice]
-        if explore_location(game_state, location):
-            return  # Game over occurred
-        
-        # Each exploration costs energy
-        game_state['energy'] = max(0, game_state['energy'] - 8)
-        
-        # Check for exhaustion
-        if game_state['energy'] <= 15:
-            print("\n⚠️ You're getting dangerously exhausted!")
-            print("You should head to the exit before you collapse!")
-            continue_exploring = validate_input("Do you want to risk exploring more? (y/n): ", ['y', 'n'])
-            if continue_exploring == 'n':
-                break
-        elif game_state['energy'] > 15:
-            continue_exploring = validate_input("Do you want to continue exploring? (y/n): ", ['y', 'n'])
-            if continue_exploring == 'n':
-                break
-
-def explore_location(game_state, location):
+        say("\n⚠️ You're getting dangerously exhausted!")
+        say("You should head to the exit before you collapse!")
+        return "tired"
+    return "rested"
+
+def explore_location(game_state, location, rng=random, say=print):
     """Handle individual location exploration - uses conditions"""
     # Random chance of danger in each location
     danger_chance = 0.2  # 20% chance of dangerous encounter
-    
-    if random.random() < danger_chance:
-        print(f"\n⚠️ Danger in {location}!")
+
+    if rng.random() < danger_chance:
+        say(f"\n⚠️ Danger in {location}!")
         if location == "Crystal Cave":
-            print("A crystal shard falls and cuts you!")
-            if apply_stat_changes(game_state, -15, -5):
+            say("A crystal shard falls and cuts you!")
+            if apply_stat_changes(game_state, -15, -5, say):
                 return True
         elif location == "Ancient Grove":
-            print("Poisonous thorns scratch you as you explore!")
-            if apply_stat_changes(game_state, -10, -10):
+            say("Poisonous thorns scratch you as you explore!")
+            if apply_stat_changes(game_state, -10, -10, say):
                 return True
         elif location == "Mystical Spring":
-            print("You slip on wet rocks and injure yourself!")
-            if apply_stat_changes(game_state, -12, -8):
+            say("You slip on wet rocks and injure yourself!")
+            if apply_stat_changes(game_state, -12, -8, say):
                 return True
-    
+
     # Use conditions to handle different locations
     if location == "Crystal Cave":
         if location not in game_state['locations_visited']:
-            print("\n💎 You discover a beautiful crystal cave!")
-            print("The crystals energize you!")
+            say("\n💎 You discover a beautiful crystal cave!")
+            say("The crystals energize you!")
             game_state['energy'] = min(100, game_state['energy'] + 20)
             game_state['score'] += 15
             game_state['locations_visited'].append(location)
         else:
-            print("\n💎 You revisit the crystal cave.")
-            print("The crystals still provide some energy.")
+            say("\n💎 You revisit the crystal cave.")
+            say("The crystals still provide some energy.")
             game_state['energy'] = min(100, game_state['energy'] + 5)
-            
+
     elif location == "Ancient Grove":
         if location not in game_state['locations_visited']:
-            print("\n🌳 You find an ancient grove with wise trees!")
-            print("The trees share their wisdom with you.")
+            say("\n🌳 You find an ancient grove with wise trees!")
+            say("The trees share their wisdom with you.")
             if "ancient coin" in game_state['inventory']:
-                print("Your ancient coin glows! The trees are impressed.")
+                say("Your ancient coin glows! The trees are impressed.")
                 game_state['score'] += 25
             else:
                 game_state['score'] += 10
             game_state['locations_visited'].append(location)
         else:
-            print("\n🌳 You return to the ancient grove.")
-            print("The trees nod in recognition.")
+            say("\n🌳 You return to the ancient grove.")
+            say("The trees nod in recognition.")
             game_state['energy'] = min(100, game_state['energy'] + 3)
-            
+
     elif location == "Mystical Spring":
         if location not in game_state['locations_visited']:
-            print("\n🌊 You discover a mystical spring!")
-            print("The water heals your wounds.")
+            say("\n🌊 You discover a mystical spring!")
+            say("The water heals your wounds.")
             game_state['health'] = min(100, game_state['health'] + 30)
             game_state['score'] += 20
             game_state['locations_visited'].append(location)
         else:
-            print("\n🌊 You return to the mystical spring.")
-            print("The water still provides some healing.")
+            say("\n🌊 You return to the mystical spring.")
+            say("The water still provides some healing.")
             game_state['health'] = min(100, game_state['health'] + 10)
-    
+
     return False
 
-def check_game_over(game_state):
+def check_game_over(game_state, say=print):
     """Check if the game should end due to low health or energy"""
     if game_state['health'] <= 0:
-        display_header("💀 GAME OVER - HEALTH DEPLETED")
-        print("Your health has reached zero. You collapse in the forest...")
-        print("The mysterious forest claims another victim.")
-        print("Your adventure ends here.")
+        display_header("💀 GAME OVER - HEALTH DEPLETED", say)
+        say("Your health has reached zero. You collapse in the forest...")
+        say("The mysterious forest claims another victim.")
+        say("Your adventure ends here.")
         return True
     elif game_state['energy'] <= 0:
-        display_header("😴 GAME OVER - EXHAUSTED")
-        print("You are completely exhausted and can no longer continue.")
-        print("You sit down to rest and fall into a deep sleep...")
-        print("When you wake up, you're back where you started - outside the forest.")
-        print("You failed to escape, but at least you're alive.")
+        display_header("😴 GAME OVER - EXHAUSTED", say)
+        say("You are completely exhausted and can no longer continue.")
+        say("You sit down to rest and fall into a deep sleep...")
+        say("When you wake up, you're back where you started - outside the forest.")
+        say("You failed to escape, but at least you're alive.")
         return True
     return False
 
-def apply_stat_changes(game_state, health_change, energy_change):
+def apply_stat_changes(game_state, health_change, energy_change, say=print):
     """Apply health and energy changes and check for game over"""
     game_state['health'] = max(0, game_state['health'] + health_change)
     game_state['energy'] = max(0, game_state['energy'] + energy_change)
-    
+
     # Check if changes caused game over
-    if check_game_over(game_state):
+    if check_game_over(game_state, say):
         return True
     return False
 
 # ENDING FUNCTIONS
 
-def determine_ending(game_state, ending_type):
+def determine_ending(game_state, ending_type, say=print):
     """Determine and display the appropriate ending - uses conditions"""
     # Check for failure endings first
     if ending_type == "game_over":
         return  # Game over already handled
-    
+
     if ending_type == "combat_death":
-        display_header("💀 DEFEAT")
-        print("You fought bravely but the shadow creature was too powerful.")
-        print("Your adventure ends in the dark forest...")
-        print("Better luck next time!")
+        display_header("💀 DEFEAT", say)
+        say("You fought bravely but the shadow creature was too powerful.")
+        say("Your adventure ends in the dark forest...")
+        say("Better luck next time!")
         return
-    
+
     if ending_type in ["barely_escaped", "failed_stealth", "dangerous_fall", "lost_in_caves"]:
-        display_header("😰 NARROW ESCAPE")
-        print("You barely survived your ordeal in the forest.")
-        print("Though you eventually found your way out, you're badly injured.")
-        print("You'll need weeks to recover from this adventure.")
-        print("Next time, be more careful with your choices!")
+        display_header("😰 NARROW ESCAPE", say)
+        say("You barely survived your ordeal in the forest.")
+        say("Though you eventually found your way out, you're badly injured.")
+        say("You'll need weeks to recover from this adventure.")
+        say("Next time, be more careful with your choices!")
         return
-    
+
     # Calculate final score for successful endings
     final_score = calculate_ending_score(
-        game_state['health'], 
-        game_state['energy'], 
-        game_state['inventory'], 
+        game_state['health'],
+        game_state['energy'],
+        game_state['inventory'],
         game_state['locations_visited']
     )
     game_state['score'] += final_score
-    
-    display_header("🎉 ADVENTURE COMPLETE!")
-    display_stats(game_state['health'], game_state['energy'], game_state['inventory'], game_state['score'])
-    print(f"Locations Visited: {len(game_state['locations_visited'])}")
-    
+
+    display_header("🎉 ADVENTURE COMPLETE!", say)
+    display_stats(game_state['health'], game_state['energy'], game_state['inventory'], game_state['score'], say)
+    say(f"Locations Visited: {len(game_state['locations_visited'])}")
+
     # Use conditions to determine ending quality
     if game_state['score'] >= 150:
-        print("\n⭐ LEGENDARY EXPLORER ENDING!")
-        print("You mastered the forest and became a legend!")
+        say("\n⭐ LEGENDARY EXPLORER ENDING!")
+        say("You mastered the forest and became a legend!")
     elif game_state['score'] >= 100:
-        print("\n🌟 EXPERT ADVENTURER ENDING!")
-        print("You navigated the forest with great skill!")
+        say("\n🌟 EXPERT ADVENTURER ENDING!")
+        say("You navigated the forest with great skill!")
     elif game_state['score'] >= 50:
-        print("\n😊 SUCCESSFUL ESCAPE ENDING!")
-        print("You made it out safely with some discoveries!")
+        say("\n😊 SUCCESSFUL ESCAPE ENDING!")
+        say("You made it out safely with some discoveries!")
     else:
-        print("\n😅 SURVIVOR ENDING!")
-        print("You barely escaped, but you're alive!")
-    
+        say("\n😅 SURVIVOR ENDING!")
+        say("You barely escaped, but you're alive!")
+
     # Add specific ending flavor based on story path
-    add_story_ending_flavor(ending_type)
+    add_story_ending_flavor(ending_type, say)
 
-def add_story_ending_flavor(ending_type):
+def add_story_ending_flavor(ending_type, say=print):
     """Add specific story details based on the path taken"""
     story_endings = {
         "fountain": "The fountain's magic will always be with you.",
@@ -630,9 +624,9 @@ def add_story_ending_flavor(ending_type):
         "rescue": "Sometimes the best choice is to wait for help.",
         "fled_combat": "Sometimes running away is the smartest choice."
     }
-    
+
     if ending_type in story_endings:
-        print(story_endings[ending_type])
+        say(story_endings[ending_type])
 
 def show_programming_concepts():
     """Display the programming concepts demonstrated"""
@@ -647,73 +641,193 @@ def show_programming_concepts():
     print("• Code organization and reusability")
     print("• Parameter passing and state management")
 
+# GAME FLOW - One adventure as a state machine, moved forward one choice at a time
+
+ADVENTURE_SCENES = {"bright": show_bright_path, "dark": show_dark_path, "mountain": show_mountain_path}
+ADVENTURES = {"bright": bright_path_adventure, "dark": dark_path_adventure, "mountain": mountain_path_adventure}
+
+def start_game(rng=random, say=print):
+    """Start a new adventure and return its state, waiting for the first choice"""
+    game_state = initialize_game(say)
+    display_stats(game_state['health'], game_state['energy'], game_state['inventory'], say=say)
+    game_state['phase'] = "path"
+    show_initial_paths(say)
+    return game_state
+
+def game_prompt(game_state):
+    """Get what the game is waiting for: (prompt, valid choices), or (None, None) once it is over
+
+    The choices are None when any answer is accepted (the puzzle).
+    """
+    phase = game_state['phase']
+    if phase == "path":
+        return "Which path do you choose? (1, 2, or 3): ", ['1', '2', '3']
+    if phase == "search":
+        return "Do you want to search this area? (y/n): ", ['y', 'n']
+    if phase == "puzzle":
+        return "Enter your answer: ", None
+    if phase == "adventure":
+        if game_state['path'] == "mountain":
+            return "What do you choose? (1, 2, or 3): ", ['1', '2', '3']
+        return "What do you do? (1, 2, or 3): ", ['1', '2', '3']
+    if phase == "combat":
+        return "What do you do? (1-3): ", ['1', '2', '3']
+    if phase == "explore":
+        return "Where do you want to explore? (1-4): ", ['1', '2', '3', '4']
+    if phase == "keep_exploring":
+        return game_state['explore_prompt'], ['y', 'n']
+    return None, None
+
+def game_step(game_state, choice, rng=random, say=print):
+    """Apply the player's next choice and run the game until it needs another one
+
+    This is the whole game: the console version and headless simulations
+    both call it, one choice at a time. It only touches game_state, draws
+    from rng and writes through say. A choice that isn't valid here is
+    answered the way validate_input does and changes nothing.
+    """
+    choice = str(choice).strip()
+    phase = game_state['phase']
+    _, valid_choices = game_prompt(game_state)
+    if phase == "over":
+        raise ValueError("the adventure is already over")
+    if valid_choices is not None and choice not in valid_choices:
+        say("❌ Invalid choice! Please try again.")
+        return game_state
+
+    if phase == "path":
+        chosen_path, energy_change, health_change = choose_initial_path(choice, say)
+        game_state['path'] = chosen_path
+        if apply_stat_changes(game_state, health_change, energy_change, say):
+            return _finish(game_state, "game_over", say)
+        display_stats(game_state['health'], game_state['energy'], say=say)
+
+        # Item collection phase
+        display_header("🔍 EXPLORATION PHASE", say)
+        say("You notice several items scattered around the area...")
+        return _next_search(game_state, say)
+
+    if phase == "search":
+        search_location(game_state, choice, rng, say)
+        game_state['search_number'] += 1
+        if game_state['search_number'] < SEARCH_LOCATIONS:
+            return _next_search(game_state, say)
+        display_stats(game_state['health'], game_state['energy'], game_state['inventory'],
+                      game_state['score'], say)
+
+        # Puzzle solving
+        game_state['puzzle'] = start_puzzle(rng, say)
+        game_state['phase'] = "puzzle"
+        show_puzzle_attempt(game_state['puzzle'], say)
+        return game_state
+
+    if phase == "puzzle":
+        if solve_puzzle(game_state, game_state['puzzle'], choice, say) is None:
+            show_puzzle_attempt(game_state['puzzle'], say)
+            return game_state
+        # Path-specific adventures
+        game_state['phase'] = "adventure"
+        ADVENTURE_SCENES[game_state['path']](say)
+        return game_state
+
+    if phase == "adventure":
+        ending_type = ADVENTURES[game_state['path']](game_state, choice, say)
+        if ending_type == "game_over":
+            return _finish(game_state, ending_type, say)
+        game_state['ending'] = ending_type
+        if game_state['path'] == "dark" and game_state['health'] > 0:
+            # Combat encounter for dark path
+            game_state['combat'] = start_combat(say)
+            game_state['phase'] = "combat"
+            show_combat_round(game_state, game_state['combat'], say)
+            return game_state
+        return _start_exploring(game_state, say)
+
+    if phase == "combat":
+        combat_result = combat_encounter(game_state, game_state['combat'], choice, rng, say)
+        if combat_result is None:
+            show_combat_round(game_state, game_state['combat'], say)
+            return game_state
+        if combat_result == "combat_death":
+            return _finish(game_state, "combat_death", say)
+        return _start_exploring(game_state, say)
+
+    if phase == "explore":
+        outcome = exploration_system(game_state, choice, rng, say)
+        if outcome == "tired":
+            game_state['explore_prompt'] = "Do you want to risk exploring more? (y/n): "
+        elif outcome == "rested":
+            game_state['explore_prompt'] = "Do you want to continue exploring? (y/n): "
+        else:  # Headed for the exit, or collapsed (the ending is still shown, as it always was)
+            return _finish(game_state, game_state['ending'], say)
+        game_state['phase'] = "keep_exploring"
+        return game_state
+
+    # phase == "keep_exploring"
+    if choice == 'y' and game_state['energy'] > 15:
+        game_state['phase'] = "explore"
+        show_exploration_choices(game_state, say)
+        return game_state
+    return _finish(game_state, game_state['ending'], say)
+
+def _next_search(game_state, say):
+    """Move on to the next location of the item collection phase"""
+    game_state['phase'] = "search"
+    say(f"\n📍 Search location {game_state['search_number'] + 1}:")
+    return game_state
+
+def _start_exploring(game_state, say):
+    """Begin the exploration system (only if still alive)"""
+    display_header("🗺️ EXPLORATION SYSTEM", say)
+    say("You can now explore different areas of the forest...")
+
+    # Check if player has enough energy to explore
+    if game_state['energy'] <= 15:
+        say("You're too exhausted to explore safely.")
+        say("You must find the exit before you collapse!")
+        return _finish(game_state, game_state['ending'], say)
+    game_state['phase'] = "explore"
+    show_exploration_choices(game_state, say)
+    return game_state
+
+def _finish(game_state, ending_type, say):
+    """Show the ending and mark the adventure as over"""
+    game_state['ending'] = ending_type
+    game_state['phase'] = "over"
+    determine_ending(game_state, ending_type, say)
+    return game_state
+
 # MAIN GAME FUNCTION
 
 def main():
     """Main game function - coordinates all game systems"""
     display_header("🌲 THE MYSTIC FOREST ADVENTURE - FUNCTIONS EDITION 🌲")
-    
+
     # MAIN GAME LOOP
     while True:
         menu_choice = show_main_menu()
-        
+
         if menu_choice == "exit":
             print("\n👋 Thanks for playing! Goodbye!")
             break
-        
-        # Initialize new game
-        game_state = initialize_game()
-        
-        # Main game flow
-        display_stats(game_state['health'], game_state['energy'], game_state['inventory'])
-        
-        # Choose initial path
-        chosen_path, energy_change, health_change = choose_initial_path()
-        if apply_stat_changes(game_state, health_change, energy_change):
+
+        # Play one adventure, a choice at a time
+        game_state = start_game()
+        while game_state['phase'] != "over":
+            prompt, _ = game_prompt(game_state)
+            game_step(game_state, input(prompt))
+
+        if game_state['ending'] == "game_over":
             continue  # Game over, restart
-        
-        display_stats(game_state['health'], game_state['energy'])
-        
-        # Item collection phase
-        item_collection_phase(game_state)
-        display_stats(game_state['health'], game_state['energy'], game_state['inventory'], game_state['score'])
-        
-        # Puzzle solving
-        solve_puzzle(game_state)
-        
-        # Path-specific adventures
-        if chosen_path == "bright":
-            ending_type = bright_path_adventure(game_state)
-        elif chosen_path == "dark":
-            ending_type = dark_path_adventure(game_state)
-            # Check if game over occurred
-            if ending_type == "game_over":
-                continue
-            # Combat encounter for dark path
-            if game_state['health'] > 0:
-                combat_result = combat_encounter(game_state)
-                if combat_result == "combat_death":
-                    ending_type = "combat_death"
-        else:  # mountain path
-            ending_type = mountain_path_adventure(game_state)
-            # Check if game over occurred
-            if ending_type == "game_over":
-                continue
-        
-        # Exploration system (only if still alive)
-        if game_state['health'] > 0 and ending_type not in ["combat_death", "game_over"]:
-            exploration_system(game_state)
-        
-        # Show final results
-        determine_ending(game_state, ending_type)
+
         show_programming_concepts()
-        
+
         # Ask if player wants to play again
         print("\n" + "="*50)
         play_again = validate_input("Do you want to play again? (y/n): ", ['y', 'n'])
         if play_again == 'n':
             break
-    
+
     print("\n🎮 Thanks for playing The Mystic Forest Adventure!")
     print("You've learned about functions, conditions, and loops!")
     print("Remember: sometimes you lose, but that's how you learn to play better!")
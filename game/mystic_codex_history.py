@@ -0,0 +1,317 @@
+# THE MYSTIC FOREST ADVENTURE - GAME HISTORY LOG
+# A buffered, rotating event log whose tail can be read without scanning the whole history
+
+import atexit
+import datetime
+import gzip
+import os
+import threading
+from mystic_codex_locking import FileLock
+from mystic_codex_persistence import IO_STATS
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def format_event(text, when=None):
+    """Turn an event into a history line like "[2025-07-06 12:00:00] text" """
+    when = when or datetime.datetime.now()
+    return f"[{when.strftime(TIMESTAMP_FORMAT)}] {text}"
+
+
+def parse_timestamp(line):
+    """Get the datetime at the start of a history line (None if it has none)"""
+    if not line.startswith("[") or len(line) < 21 or line[20] != "]":
+        return None
+    try:
+        return datetime.datetime.strptime(line[1:20], TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def read_last_lines(filepath, count, block_size=8192):
+    """Read the last count lines of a text file by seeking backwards from its end
+
+    Only the blocks that hold those lines are read, so the cost depends on
+    count and line length, not on the size of the file.
+    """
+    if count <= 0:
+        return []
+    with open(filepath, 'rb') as file:
+        file.seek(0, os.SEEK_END)
+        position = file.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            step = min(block_size, position)
+            position -= step
+            file.seek(position)
+            data = file.read(step) + data
+    lines = data.decode('utf-8', errors='replace').splitlines()
+    return lines[-count:]
+
+
+class HistoryLog:
+    """Class to append game events to a rotating set of log segments
+
+    The active segment (game_history.txt) is kept open, so logging an event
+    doesn't open and close the file. Once the active segment is larger than
+    max_segment_bytes, or older than max_segment_age seconds, it is moved to
+    the segments directory as game_history.<n>.txt (gzipped when
+    compress_segments is on) and a fresh one is started.
+
+    Several game processes may share the log. Appends and rotations hold an
+    advisory lock on game_history.txt.lock and each append is written through
+    before the lock is released, so every process sees the true end of the
+    file and listeners get real offsets.
+    """
+
+    def __init__(self, active_file, segments_dir, max_segment_bytes=1024 * 1024,
+                 max_segment_age=None, compress_segments=False):
+        self.active_file = active_file
+        self.segments_dir = segments_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.compress_segments = compress_segments
+        self.lock = FileLock(active_file.with_name(active_file.name + ".lock"))
+        self._lock = threading.RLock()
+        self._handle = None
+        self._segment_size = 0  # Bytes in the active segment while the handle is open
+        self._segment_started = None
+        self._active_number = None
+        self._listeners = []
+
+    # SEGMENTS
+
+    def _segment_name(self, number, compressed):
+        """Get the file name of a rotated segment"""
+        stem, suffix = self.active_file.stem, self.active_file.suffix
+        return f"{stem}.{number:06d}{suffix}" + (".gz" if compressed else "")
+
+    def segments(self):
+        """Get the rotated segment files, oldest first"""
+        if not self.segments_dir.exists():
+            return []
+        numbered = []
+        prefix = self.active_file.stem + "."
+        for path in self.segments_dir.iterdir():
+            if not path.name.startswith(prefix):
+                continue
+            number = path.name[len(prefix):].split(".", 1)[0]
+            if number.isdigit():
+                numbered.append((int(number), path))
+        return [path for _, path in sorted(numbered)]
+
+    def _next_segment_number(self):
+        """Get the number for the next rotated segment"""
+        segments = self.segments()
+        if not segments:
+            return 1
+        return int(segments[-1].name[len(self.active_file.stem) + 1:].split(".", 1)[0]) + 1
+
+    def active_segment_number(self):
+        """Get the number the active segment will have once it is rotated"""
+        with self._lock:
+            if self._active_number is None:
+                self._active_number = self._next_segment_number()
+            return self._active_number
+
+    def segment_path(self, number):
+        """Get the file that holds segment number (None if it doesn't exist)"""
+        if number == self.active_segment_number():
+            return self.active_file
+        for compressed in (False, True):
+            path = self.segments_dir / self._segment_name(number, compressed)
+            if path.exists():
+                return path
+        return None
+
+    def open_segment(self, number):
+        """Open a segment for reading bytes (gzipped segments are decompressed on the fly)"""
+        self.flush()
+        path = self.segment_path(number)
+        if path is None:
+            return None
+        if path.suffix == ".gz":
+            return gzip.open(path, 'rb')
+        return open(path, 'rb')
+
+    def _read_segment_start(self):
+        """Get when the active segment was started, from its first line"""
+        try:
+            with open(self.active_file, 'r', encoding='utf-8', errors='replace') as file:
+                return parse_timestamp(file.readline())
+        except FileNotFoundError:
+            return None
+
+    def _should_rotate(self):
+        """Check whether the active segment is full or too old"""
+        if self._handle is not None:
+            size = self._segment_size  # Brought up to date by _follow_active_file
+        else:
+            try:
+                size = os.stat(self.active_file).st_size
+            except FileNotFoundError:
+                return False
+        if size >= self.max_segment_bytes:
+            return True
+        if self.max_segment_age is not None and self._segment_started is not None:
+            age = (datetime.datetime.now() - self._segment_started).total_seconds()
+            return size > 0 and age >= self.max_segment_age
+        return False
+
+    def rotate(self):
+        """Move the active segment into the segments directory and start a new one"""
+        with self._lock, self.lock:
+            self._close_handle()
+            if not self.active_file.exists() or self.active_file.stat().st_size == 0:
+                return None
+            self.segments_dir.mkdir(parents=True, exist_ok=True)
+            number = self._next_segment_number()
+            if self.compress_segments:
+                segment = self.segments_dir / self._segment_name(number, compressed=True)
+                with open(self.active_file, 'rb') as source, gzip.open(segment, 'wb') as target:
+                    target.writelines(source)
+                self.active_file.unlink()
+            else:
+                segment = self.segments_dir / self._segment_name(number, compressed=False)
+                os.replace(self.active_file, segment)
+            self._segment_started = None
+            self._active_number = number + 1
+            return segment
+
+    # WRITING
+
+    def _open_handle(self):
+        """Open the active segment for appending the first time it's needed"""
+        if self._handle is None:
+            self._segment_started = self._read_segment_start()
+            # No newline translation, so the bytes counted are the bytes written
+            self._handle = open(self.active_file, 'a', encoding='utf-8', newline='\n')
+            self._segment_size = os.fstat(self._handle.fileno()).st_size
+        return self._handle
+
+    def _follow_active_file(self):
+        """Catch up with other processes: reopen a segment they rotated away and take its real size"""
+        if self._handle is None:
+            self._active_number = None  # Another process may have rotated since we last looked
+            return
+        opened = os.fstat(self._handle.fileno())
+        try:
+            current = os.stat(self.active_file)
+        except FileNotFoundError:
+            current = None
+        if current is None or (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+            self._close_handle()
+            self._segment_started = None
+            self._active_number = None
+        else:
+            self._segment_size = current.st_size
+
+    def _close_handle(self):
+        """Flush and close the append handle"""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def add_listener(self, callback):
+        """Call callback(segment_number, offset, lines) after lines are appended
+
+        offset is the byte position of the first line in that segment.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def append(self, text):
+        """Log one event with the current timestamp"""
+        return self.append_lines([format_event(text)])
+
+    def append_lines(self, lines):
+        """Append ready-made history lines"""
+        if not lines:
+            return True
+        try:
+            with self._lock, self.lock:
+                self._follow_active_file()
+                if self._should_rotate():
+                    self.rotate()
+                handle = self._open_handle()
+                if self._segment_started is None:
+                    self._segment_started = parse_timestamp(lines[0]) or datetime.datetime.now()
+                text = "".join(f"{line}\n" for line in lines)
+                handle.write(text)
+                handle.flush()  # Other processes append too, so nothing may wait in a buffer
+                size = len(text.encode('utf-8'))
+                self._segment_size = os.fstat(handle.fileno()).st_size
+                IO_STATS.record(self.active_file, size)
+                # Listeners (the history index) run under the lock, so their records follow log order
+                for callback in self._listeners:
+                    callback(self.active_segment_number(), self._segment_size - size, lines)
+            return True
+        except Exception as e:
+            print(f"❌ Error writing to {self.active_file.name}: {e}")
+            return False
+
+    def flush(self):
+        """Push buffered lines to the file (appends are written through, so normally there are none)"""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.flush()
+
+    def close(self):
+        """Flush and close the log (it reopens on the next append)"""
+        with self._lock:
+            self._close_handle()
+
+    # READING
+
+    @staticmethod
+    def _read_segment(segment):
+        """Read every line of a rotated segment"""
+        opener = gzip.open if segment.suffix == ".gz" else open
+        with opener(segment, 'rt', encoding='utf-8', errors='replace') as file:
+            return file.read().splitlines()
+
+    def tail(self, count=20):
+        """Get the last count lines, newest last
+
+        Only the end of the active segment is read; older segments are opened
+        only when the active one holds fewer than count lines.
+        """
+        self.flush()
+        lines = []
+        if self.active_file.exists():
+            lines = read_last_lines(self.active_file, count)
+        for segment in reversed(self.segments()):
+            if len(lines) >= count:
+                break
+            if segment.suffix == ".gz":
+                older = self._read_segment(segment)[-(count - len(lines)):]
+            else:
+                older = read_last_lines(segment, count - len(lines))
+            lines = older + lines
+        return lines
+
+    def iter_lines(self):
+        """Yield every line of the history, oldest first"""
+        self.flush()
+        for segment in self.segments():
+            yield from self._read_segment(segment)
+        if self.active_file.exists():
+            with open(self.active_file, 'r', encoding='utf-8', errors='replace') as file:
+                for line in file:
+                    yield line.rstrip("\n")
+
+    def delete_all(self):
+        """Remove the active segment and every rotated one"""
+        with self._lock, self.lock:
+            self._close_handle()
+            for segment in self.segments():
+                segment.unlink()
+            if self.active_file.exists():
+                self.active_file.unlink()
+            self._segment_started = None
+            self._active_number = None
+
+    def register_atexit(self):
+        """Close the append handle when the game exits"""
+        atexit.register(self.close)
+        return self
@@ -0,0 +1,325 @@
+# THE MYSTIC FOREST ADVENTURE - GAME HISTORY INDEX
+# A sparse side index of time buckets and players so history queries only read what they need
+
+import datetime
+import json
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from mystic_codex_history import parse_timestamp
+from mystic_codex_persistence import atomic_write_text
+
+BUCKET_FORMAT = "%Y-%m-%d %H"  # One bucket per hour
+PLAYER_PATTERN = re.compile(r" by (.+?)(?: with score (-?\d+)| from slot \d+)?$")
+COMPLETED_PREFIX = "Game completed by "
+
+
+def parse_event(line):
+    """Split a history line into (timestamp, text, player) - any of them may be None"""
+    when = parse_timestamp(line)
+    text = line[22:] if when else line
+    match = PLAYER_PATTERN.search(text)
+    return when, text, match.group(1) if match else None
+
+
+def matches_event(line, player=None, start=None, end=None):
+    """Check a history line against the player and time filters"""
+    when, _, line_player = parse_event(line)
+    if when is None:
+        return False
+    if (start and when < start) or (end and when > end):
+        return False
+    return player is None or line_player == player
+
+
+class HistoryQueries(ABC):
+    """Base class for the history searches built on events()
+
+    Subclasses decide how events(player, start, end) finds its lines; the
+    completed-game queries are worked out from those lines the same way.
+    """
+
+    @abstractmethod
+    def events(self, player=None, start=None, end=None):
+        """Get history lines, optionally for one player and between start and end (datetimes)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def players(self):
+        """Get every player name that appears in the history"""
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget anything cached about the history"""
+
+    def games_completed(self, start=None, end=None, player=None):
+        """Get (timestamp, player, score) for every game completed in a time range"""
+        completed = []
+        for line in self.events(player=player, start=start, end=end):
+            when, text, line_player = parse_event(line)
+            if not text.startswith(COMPLETED_PREFIX):
+                continue
+            match = PLAYER_PATTERN.search(text)
+            score = int(match.group(2)) if match and match.group(2) else None
+            completed.append((when, line_player, score))
+        return completed
+
+    def games_completed_today(self):
+        """Get every game completed since midnight"""
+        midnight = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        return self.games_completed(start=midnight)
+
+
+class ScanningHistoryIndex(HistoryQueries):
+    """Class to answer history queries by reading every line of a history log
+
+    Used for logs that have no byte offsets to index (like the in-memory
+    log), where a full scan is cheap anyway.
+    """
+
+    def __init__(self, history_log):
+        self.history_log = history_log
+
+    def events(self, player=None, start=None, end=None):
+        """Get history lines, optionally for one player and between start and end (datetimes)"""
+        return [line for line in self.history_log.iter_lines() if matches_event(line, player, start, end)]
+
+    def players(self):
+        """Get every player name that appears in the history"""
+        return sorted({player for _, _, player in map(parse_event, self.history_log.iter_lines())
+                       if player is not None})
+
+
+class HistoryIndex(HistoryQueries):
+    """Class to find history lines by time and player without reading the whole log
+
+    The history is cut into hourly buckets. For every bucket the index keeps
+    the segment it lives in and the byte offset where it starts, plus the
+    buckets each player appears in. It grows as events are appended (it
+    listens to the HistoryLog) and is stored as a small append-only file of
+    records, so only a new bucket or a player's first event in a bucket adds
+    a line. A query picks the matching buckets and reads just those byte
+    ranges.
+
+    Several processes may share the index. Records name a bucket by its
+    (segment, start offset), never by a position in one process's memory,
+    and they are written under the history log's file lock right after the
+    lines they describe. Before indexing or answering a query, the records
+    other processes added since the last look are read in.
+    """
+
+    def __init__(self, history_log, index_file):
+        self.history_log = history_log
+        self.index_file = index_file
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._clear()
+        history_log.add_listener(self._on_append)
+
+    def _clear(self):
+        """Forget the in-memory index"""
+        self._buckets = []        # [segment_number, bucket_key, start_offset], in log order
+        self._bucket_numbers = {}  # (segment_number, start_offset) -> position in _buckets
+        self._players = {}        # player -> set of positions in _buckets
+        self._index_read = 0      # Bytes of the index file read so far
+        self._index_identity = None  # (st_dev, st_ino) of the index file read
+
+    # BUILDING
+
+    def _ensure_loaded(self):
+        """Read what was added to the index file, or build the index if it is missing or out of date
+
+        Returns True if the index was rebuilt.
+        """
+        with self._lock:
+            if self._loaded:
+                usable = self._read_new_records()
+            else:
+                self._loaded = True
+                usable = (self._read_new_records()
+                          and (bool(self._buckets) or not self._history_exists())
+                          and (not self._buckets or self._matches_history()))
+            if not usable:
+                self.rebuild()
+            return not usable
+
+    def _matches_history(self):
+        """Check that the last indexed bucket still points inside its segment"""
+        segment, _, start = self._buckets[-1]
+        handle = self.history_log.open_segment(segment)
+        if handle is None:
+            return False
+        with handle:
+            handle.seek(start)
+            return parse_timestamp(handle.readline().decode('utf-8', errors='replace')) is not None
+
+    def _history_exists(self):
+        """Check whether there is any history to index"""
+        return self.history_log.active_file.exists() or bool(self.history_log.segments())
+
+    def _add_bucket(self, bucket):
+        """Add a bucket record to the in-memory index"""
+        self._bucket_numbers[(bucket[0], bucket[2])] = len(self._buckets)
+        self._buckets.append(bucket)
+
+    def _read_new_records(self):
+        """Read the records added to the index file since the last read (by any process)
+
+        Returns False if the file holds records this version can't use.
+        """
+        try:
+            stat_result = os.stat(self.index_file)
+        except FileNotFoundError:
+            if self._index_read:
+                self._clear()  # Reset by another process
+            return True
+        identity = (stat_result.st_dev, stat_result.st_ino)
+        if identity != self._index_identity or stat_result.st_size < self._index_read:
+            self._clear()  # Rebuilt by another process (or never read) - start from the top
+            self._index_identity = identity
+        if stat_result.st_size == self._index_read:
+            return True
+
+        with open(self.index_file, 'rb') as file:
+            file.seek(self._index_read)
+            data = file.read(stat_result.st_size - self._index_read)
+        complete = data.rfind(b"\n") + 1  # A record still being written is read next time
+        for raw_record in data[:complete].splitlines():
+            try:
+                record = json.loads(raw_record)
+            except json.JSONDecodeError:
+                continue  # Torn by a crash - the rest of the file is still good
+            if "bucket" in record:
+                self._add_bucket(record["bucket"])
+            elif "at" in record:
+                number = self._bucket_numbers.get(tuple(record["at"]))
+                if number is not None:
+                    self._players.setdefault(record["player"], set()).add(number)
+            elif "in" in record:
+                return False  # Numbered against one process's buckets by an older version
+        self._index_read += complete
+        return True
+
+    def rebuild(self):
+        """Build the index from scratch by reading every segment once"""
+        with self._lock, self.history_log.lock:
+            self._clear()
+            self._loaded = True
+            records = []
+            numbers = [self._segment_number(path) for path in self.history_log.segments()]
+            numbers.append(self.history_log.active_segment_number())
+            for number in numbers:
+                handle = self.history_log.open_segment(number)
+                if handle is None:
+                    continue
+                with handle:
+                    offset = 0
+                    for raw_line in handle:
+                        line = raw_line.decode('utf-8', errors='replace').rstrip("\n")
+                        records.extend(self._index_line(number, offset, line))
+                        offset += len(raw_line)
+            # Written beside the old file and swapped in, so other processes see a new file
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            data = "".join(json.dumps(record) + "\n" for record in records).encode('utf-8')
+            atomic_write_text(self.index_file, data)
+            stat_result = os.stat(self.index_file)
+            self._index_identity = (stat_result.st_dev, stat_result.st_ino)
+            self._index_read = len(data)
+
+    def _segment_number(self, path):
+        """Get the number of a rotated segment from its file name"""
+        return int(path.name[len(self.history_log.active_file.stem) + 1:].split(".", 1)[0])
+
+    def _index_line(self, segment_number, offset, line):
+        """Add one history line to the in-memory index; return the new records"""
+        when, _, player = parse_event(line)
+        if when is None:
+            return []
+        records = []
+        bucket_key = when.strftime(BUCKET_FORMAT)
+        last = self._buckets[-1] if self._buckets else None
+        if last is None or last[0] != segment_number or last[1] != bucket_key:
+            last = [segment_number, bucket_key, offset]
+            self._add_bucket(last)
+            records.append({"bucket": last})
+        if player is not None:
+            bucket_number = len(self._buckets) - 1
+            seen = self._players.setdefault(player, set())
+            if bucket_number not in seen:
+                seen.add(bucket_number)
+                records.append({"player": player, "at": [last[0], last[2]]})
+        return records
+
+    def _on_append(self, segment_number, offset, lines):
+        """HistoryLog listener - index lines as they are written (the log's file lock is held)"""
+        with self._lock:
+            if self._ensure_loaded():
+                return  # The rebuild has read the lines just appended
+            records = []
+            for line in lines:
+                records.extend(self._index_line(segment_number, offset, line))
+                offset += len(line.encode('utf-8')) + 1
+            if records:
+                self.index_file.parent.mkdir(parents=True, exist_ok=True)
+                data = "".join(json.dumps(record) + "\n" for record in records).encode('utf-8')
+                with open(self.index_file, 'ab') as file:
+                    file.write(data)
+                    stat_result = os.fstat(file.fileno())
+                self._index_identity = (stat_result.st_dev, stat_result.st_ino)
+                self._index_read += len(data)
+
+    def reset(self):
+        """Forget the index and remove its file (used after the history is deleted)"""
+        with self._lock:
+            self._clear()
+            self._loaded = False
+            if self.index_file.exists():
+                self.index_file.unlink()
+
+    # QUERIES
+
+    def _bucket_ranges(self, bucket_numbers):
+        """Turn bucket numbers into (segment, start, end) byte ranges, merging neighbours"""
+        ranges = []
+        for number in sorted(bucket_numbers):
+            segment, _, start = self._buckets[number]
+            following = self._buckets[number + 1] if number + 1 < len(self._buckets) else None
+            end = following[2] if following and following[0] == segment else None
+            if ranges and ranges[-1][0] == segment and ranges[-1][2] == start:
+                ranges[-1][2] = end
+            else:
+                ranges.append([segment, start, end])
+        return ranges
+
+    def _read_ranges(self, ranges):
+        """Yield the lines stored in the given byte ranges"""
+        for segment, start, end in ranges:
+            handle = self.history_log.open_segment(segment)
+            if handle is None:
+                continue
+            with handle:
+                handle.seek(start)
+                data = handle.read() if end is None else handle.read(end - start)
+            for line in data.decode('utf-8', errors='replace').splitlines():
+                yield line
+
+    def events(self, player=None, start=None, end=None):
+        """Get history lines, optionally for one player and between start and end (datetimes)"""
+        with self._lock:
+            self._ensure_loaded()
+            start_key = start.strftime(BUCKET_FORMAT) if start else None
+            end_key = end.strftime(BUCKET_FORMAT) if end else None
+            candidates = self._players.get(player, set()) if player is not None else range(len(self._buckets))
+            selected = [number for number in candidates
+                        if (start_key is None or self._buckets[number][1] >= start_key)
+                        and (end_key is None or self._buckets[number][1] <= end_key)]
+            ranges = self._bucket_ranges(selected)
+
+        return [line for line in self._read_ranges(ranges) if matches_event(line, player, start, end)]
+
+    def players(self):
+        """Get every player name that appears in the history"""
+        with self._lock:
+            self._ensure_loaded()
+            return sorted(self._players)
@@ -0,0 +1,282 @@
+# THE MYSTIC FOREST ADVENTURE - JOURNALED SAVES
+# A full snapshot per slot plus an append-only journal of what changed since then
+
+import copy
+import json
+import os
+from mystic_codex_persistence import IO_STATS
+from mystic_codex_savecodec import (BINARY_EXTENSION, JSON_EXTENSION, SaveFormatError,
+                                    decode_header, decode_save, encode_save, HEADER_SIZE)
+
+
+def _read_json(filepath, default_data=None):
+    """Default loader used when no load function is supplied"""
+    try:
+        with open(filepath, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return default_data
+
+
+def _write_json(filepath, data):
+    """Default writer used when no save function is supplied"""
+    with open(filepath, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2, ensure_ascii=False)
+    return True
+
+
+def _read_bytes(filepath, size=None):
+    """Default binary reader used when no read function is supplied"""
+    with open(filepath, 'rb') as file:
+        return file.read() if size is None else file.read(size)
+
+
+def _write_bytes(filepath, data):
+    """Default binary writer used when no save function is supplied"""
+    with open(filepath, 'wb') as file:
+        file.write(data)
+    return True
+
+
+def compute_delta(old_state, new_state):
+    """Describe how new_state differs from old_state (None if nothing changed)
+
+    Lists that only grew at the end (game_history, visited_locations, ...) are
+    recorded as appends so the journal never repeats what it already holds.
+    """
+    delta = {}
+    for key, value in new_state.items():
+        if key not in old_state:
+            delta.setdefault("set", {})[key] = value
+            continue
+        old_value = old_state[key]
+        if old_value == value:
+            continue
+        if (isinstance(old_value, list) and isinstance(value, list)
+                and len(value) > len(old_value) and value[:len(old_value)] == old_value):
+            delta.setdefault("append", {})[key] = value[len(old_value):]
+        else:
+            delta.setdefault("set", {})[key] = value
+
+    removed = [key for key in old_state if key not in new_state]
+    if removed:
+        delta["remove"] = removed
+    return delta or None
+
+
+def apply_delta(state, delta):
+    """Apply one journal record to a state dictionary (in place)"""
+    for key, value in delta.get("set", {}).items():
+        state[key] = value
+    for key, items in delta.get("append", {}).items():
+        state.setdefault(key, []).extend(items)
+    for key in delta.get("remove", []):
+        state.pop(key, None)
+    return state
+
+
+class JournaledSaveStore:
+    """Class to save game slots as a snapshot plus a delta journal
+
+    The first save of a slot writes save_N.json in full. Later saves append one
+    JSON line with only the changed keys and list appends to
+    save_N.journal.jsonl, so an autosave costs about as much as the turn
+    changed. When a delta would take the journal past journal_limit bytes,
+    the slot gets a fresh snapshot instead. Loading reads the snapshot and
+    replays the journal.
+
+    Snapshots are JSON (save_N.json) or the binary format (save_N.sav) picked
+    by snapshot_format. A slot keeps its current format until its next full
+    snapshot, so both kinds can be read at any time.
+    """
+
+    def __init__(self, saves_dir, journal_limit=64 * 1024, load_function=None,
+                 save_function=None, flush_function=None, snapshot_format="json",
+                 read_bytes_function=None, save_bytes_function=None, write_state_function=None):
+        self.saves_dir = saves_dir
+        self.journal_limit = journal_limit
+        self.load_function = load_function or _read_json
+        self.save_function = save_function or _write_json
+        self.flush_function = flush_function or (lambda: {})
+        self.snapshot_format = snapshot_format
+        self.read_bytes_function = read_bytes_function or _read_bytes
+        self.save_bytes_function = save_bytes_function or _write_bytes
+        self.write_state_function = write_state_function or (lambda filepath: None)
+        self._states = {}  # slot_number -> state as it is on disk (snapshot + journal)
+        self._torn = set()   # slots whose journal ends in a partly written record
+        self._paths = {}     # slot_number -> snapshot path written by this store
+
+    def _format_path(self, slot_number, snapshot_format):
+        """Get the snapshot path a slot would have in the given format"""
+        extension = BINARY_EXTENSION if snapshot_format == "binary" else JSON_EXTENSION
+        return self.saves_dir / f"save_{slot_number}{extension}"
+
+    def snapshot_path(self, slot_number):
+        """Get the path of a slot's full snapshot (whichever format it is in)"""
+        if slot_number in self._paths:
+            return self._paths[slot_number]
+        for snapshot_format in ("binary", "json"):
+            path = self._format_path(slot_number, snapshot_format)
+            if path.exists():
+                return path
+        return self._format_path(slot_number, self.snapshot_format)
+
+    def has_snapshot(self, slot_number):
+        """Check whether a slot has a snapshot (written or still queued)"""
+        return slot_number in self._paths or self.snapshot_path(slot_number).exists()
+
+    def journal_path(self, slot_number):
+        """Get the path of a slot's delta journal"""
+        return self.saves_dir / f"save_{slot_number}.journal.jsonl"
+
+    @staticmethod
+    def _journal_for(snapshot_file):
+        """Get the journal that belongs to a snapshot file"""
+        return snapshot_file.with_name(f"{snapshot_file.stem}.journal.jsonl")
+
+    def _read_snapshot(self, snapshot_file):
+        """Read a snapshot in either format (None if it can't be read)"""
+        if snapshot_file.suffix != BINARY_EXTENSION:
+            return self.load_function(snapshot_file)
+        try:
+            return decode_save(self.read_bytes_function(snapshot_file))
+        except (OSError, SaveFormatError) as e:
+            print(f"❌ Error reading {snapshot_file.name}: {e}")
+            return None
+
+    # LOADING
+
+    def _replay(self, snapshot_file):
+        """Read a snapshot and its journal; return (state, journal_is_clean)"""
+        state = self._read_snapshot(snapshot_file)
+        if not state:
+            return None, True
+        journal_file = self._journal_for(snapshot_file)
+        if journal_file.exists():
+            with open(journal_file, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        apply_delta(state, json.loads(line))
+                    except (json.JSONDecodeError, AttributeError):
+                        return state, False  # A torn last record - everything before it is good
+        return state, True
+
+    def load_path(self, snapshot_file):
+        """Load a snapshot file and replay its journal (None if it can't be read)"""
+        return self._replay(snapshot_file)[0]
+
+    def load_summary(self, snapshot_file):
+        """Get the fields shown in slot listings, reading only a binary header when possible"""
+        if snapshot_file.suffix == BINARY_EXTENSION and not self._journal_for(snapshot_file).exists():
+            try:
+                return decode_header(self.read_bytes_function(snapshot_file, HEADER_SIZE))
+            except (OSError, SaveFormatError) as e:
+                print(f"❌ Error reading {snapshot_file.name}: {e}")
+                return None
+        return self.load_path(snapshot_file)
+
+    def load(self, slot_number):
+        """Load a slot's current state (None if the slot is empty)"""
+        state, clean = self._replay(self.snapshot_path(slot_number))
+        if state is not None:
+            self._states[slot_number] = copy.deepcopy(state)
+            if not clean:
+                self._torn.add(slot_number)
+        return state
+
+    # SAVING
+
+    def save(self, slot_number, state):
+        """Save a slot, appending a delta when a snapshot already exists"""
+        if slot_number in self._paths and self.write_state_function(self._paths[slot_number]) == "failed":
+            self.forget(slot_number)  # The baseline's snapshot never reached the disk
+        if slot_number not in self._states and self.has_snapshot(slot_number):
+            self.load(slot_number)
+        baseline = self._states.get(slot_number)
+        if baseline is None or slot_number in self._torn:
+            # Nothing to append to, or appending after a torn record would hide it
+            return self.write_snapshot(slot_number, state)
+
+        delta = compute_delta(baseline, state)
+        if delta is None:
+            return True
+
+        journal_file = self.journal_path(slot_number)
+        record = json.dumps(delta, ensure_ascii=False) + "\n"
+        record_size = len(record.encode('utf-8'))
+        if self.journal_size(slot_number) + record_size > self.journal_limit:
+            # Compact instead of appending, so a snapshot that fails to write loses nothing
+            return self.write_snapshot(slot_number, state)
+
+        with open(journal_file, 'a', encoding='utf-8') as file:
+            file.write(record)
+        IO_STATS.record(journal_file, record_size)
+        apply_delta(baseline, copy.deepcopy(delta))
+        return True
+
+    def write_snapshot(self, slot_number, state):
+        """Write a full snapshot in the current format and start an empty journal"""
+        previous_file = self.snapshot_path(slot_number)
+        snapshot_file = self._format_path(slot_number, self.snapshot_format)
+        if self.snapshot_format == "binary":
+            saved = self.save_bytes_function(snapshot_file, encode_save(state))
+        else:
+            saved = self.save_function(snapshot_file, state)
+        if not saved:
+            return False
+
+        # The journal always goes; the old snapshot only if it was in the other format
+        journal_file = self.journal_path(slot_number)
+        stale_files = [path for path in (journal_file, previous_file)
+                       if path != snapshot_file and path.exists()]
+        if stale_files:
+            # Old files may only go once the snapshot that replaces them is on disk
+            failures = self.flush_function() or {}
+            if snapshot_file in failures:
+                return False  # The old files still hold the last good save
+            for path in stale_files:
+                path.unlink()
+        self._paths[slot_number] = snapshot_file
+        self._states[slot_number] = copy.deepcopy(state)
+        self._torn.discard(slot_number)
+        return True
+
+    def compact(self, slot_number):
+        """Fold a slot's journal into its snapshot"""
+        state = self.load(slot_number)
+        if state is None:
+            return False
+        return self.write_snapshot(slot_number, state)
+
+    def delete(self, slot_number):
+        """Remove a slot's snapshot and journal; return True if there was a snapshot"""
+        self.forget(slot_number)
+        journal_file = self.journal_path(slot_number)
+        if journal_file.exists():
+            journal_file.unlink()
+        deleted = False
+        for snapshot_format in ("binary", "json"):
+            snapshot_file = self._format_path(slot_number, snapshot_format)
+            if snapshot_file.exists():
+                snapshot_file.unlink()
+                deleted = True
+        return deleted
+
+    def forget(self, slot_number):
+        """Forget one slot's in-memory baseline so its files are read again"""
+        self._states.pop(slot_number, None)
+        self._torn.discard(slot_number)
+        self._paths.pop(slot_number, None)
+
+    def reset(self):
+        """Forget the in-memory baselines (used after the data files are deleted)"""
+        self._states = {}
+        self._torn = set()
+        self._paths = {}
+
+    def journal_size(self, slot_number):
+        """Get the size of a slot's journal in bytes"""
+        try:
+            return os.stat(self.journal_path(slot_number)).st_size
+        except FileNotFoundError:
+            return 0
@@ -0,0 +1,208 @@
+# THE MYSTIC FOREST ADVENTURE - STREAMING JSON
+# Read the entries of a huge JSON object or array one at a time, and write one the same way
+
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")  # Matches when a number may go on in the next chunk
+
+
+class JsonStreamReader:
+    """Class to decode the top-level entries of a JSON document lazily
+
+    The file is read in chunks and each entry is decoded with
+    json.JSONDecoder.raw_decode straight from the buffer, so only the entry
+    being decoded (plus one chunk) is in memory however large the file is.
+    Stopping the iteration early stops reading the file.
+    """
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size=None):
+        """Read more of the file into the buffer; return False at the end of the file"""
+        if self._eof:
+            return False
+        if self._pos > self.chunk_size:
+            self._buffer = self._buffer[self._pos:]  # Drop what was already decoded
+            self._pos = 0
+        chunk = self.file.read(size or self.chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer += chunk
+        return True
+
+    def _peek(self):
+        """Skip whitespace and get the next character ("" at the end of the file)"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, *characters):
+        """Consume the next character, which must be one of characters"""
+        character = self._peek()
+        if character not in characters or not character:
+            raise json.JSONDecodeError(f"Expecting {' or '.join(map(repr, characters))}",
+                                       self._buffer, self._pos)
+        self._pos += 1
+        return character
+
+    def _value(self):
+        """Decode the next JSON value"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Probably cut off at the end of the buffer - read more (doubling,
+                # so a huge entry isn't decoded again for every chunk) and retry
+                if not self._fill(max(self.chunk_size, len(self._buffer) - self._pos)):
+                    raise
+                continue
+            # A number at the end of the buffer ("12" or "3.") may continue in the next chunk
+            if (isinstance(value, (int, float)) and NUMBER_TAIL.match(self._buffer, end)
+                    and self._fill()):
+                continue
+            self._pos = end
+            return value
+
+    def items(self):
+        """Yield (key, value) for a top-level object, or (index, value) for an array"""
+        opening = self._expect("{", "[")
+        closing = "}" if opening == "{" else "]"
+        index = 0
+        if self._peek() == closing:
+            self._pos += 1
+            return
+        while True:
+            if opening == "{":
+                key = self._value()
+                if not isinstance(key, str):
+                    raise json.JSONDecodeError("Expecting property name", self._buffer, self._pos)
+                self._expect(":")
+            else:
+                key = index
+            yield key, self._value()
+            index += 1
+            if self._expect(",", closing) == closing:
+                return
+
+
+def iter_json_items(filepath, chunk_size=CHUNK_SIZE):
+    """Yield the (key, value) entries of a JSON object file (or (index, value) of an array)"""
+    with open(filepath, 'r', encoding='utf-8') as file:
+        yield from JsonStreamReader(file, chunk_size).items()
+
+
+def find_json_item(filepath, key, default=None):
+    """Get one top-level entry of a JSON object file, reading no further than it"""
+    for item_key, value in iter_json_items(filepath):
+        if item_key == key:
+            return value
+    return default
+
+
+def write_json_items(file, items, indent=2):
+    """Write (key, value) pairs as a JSON object, one entry at a time
+
+    The output is the same as json.dump(dict(items), file, indent=indent,
+    ensure_ascii=False), but only one entry is serialized at a time.
+    """
+    padding = " " * indent
+    file.write("{")
+    count = 0
+    for key, value in items:
+        text = json.dumps(value, indent=indent, ensure_ascii=False).replace("\n", "\n" + padding)
+        file.write(("," if count else "") + f"\n{padding}{json.dumps(key, ensure_ascii=False)}: {text}")
+        count += 1
+    file.write("\n}" if count else "}")
+    return count
+
+
+# BENCHMARK
+
+def _peak_rss_mb():
+    """Get the peak resident memory of this process in MB (None where it can't be measured)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def _measure_lookup(json_file, name, loader):
+    """Look one profile up in a fresh process; return (found, seconds, peak RSS in MB)"""
+    start = time.perf_counter()
+    if loader == "json.load":
+        with open(json_file, 'r', encoding='utf-8') as file:
+            profile = json.load(file).get(name)
+    elif loader == "stream":
+        profile = find_json_item(json_file, name)
+    else:
+        profile = None
+    return profile is not None, time.perf_counter() - start, _peak_rss_mb()
+
+
+def benchmark_json_loading(profile_count=200000):
+    """Compare peak memory and time of json.load against the streaming reader
+
+    A player_profiles.json with profile_count profiles is written to a
+    temporary directory, then each loader looks up the last player in its
+    own process, so the peak RSS it reports belongs to that loader alone.
+    "baseline" is a process that doesn't read the file at all.
+    """
+    work_dir = Path(tempfile.mkdtemp(prefix="mystic_json_"))
+    json_file = work_dir / "player_profiles.json"
+    names = (f"Player{number}" for number in range(profile_count))
+    with open(json_file, 'w', encoding='utf-8') as file:
+        write_json_items(file, ((name, {
+            "name": name, "games_played": 12, "total_score": 1800, "best_score": 240,
+            "achievements": ["first_game", "high_scorer"], "total_playtime": 0,
+            "created_date": "2025-01-01T12:00:00", "last_played": "2025-06-01T12:00:00"
+        }) for name in names))
+    size_mb = json_file.stat().st_size / (1024 * 1024)
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    try:
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            for loader in ("baseline", "json.load", "stream"):
+                found, seconds, peak = pool.apply(_measure_lookup,
+                                                  (str(json_file), f"Player{profile_count - 1}", loader))
+                results[loader] = {"found": found, "seconds": seconds, "peak_rss_mb": peak}
+    finally:
+        for path in work_dir.iterdir():
+            path.unlink()
+        work_dir.rmdir()
+
+    print(f"\n{profile_count:,} profiles ({size_mb:.1f} MB), looking up the last one")
+    print(f"{'Loader':<10} {'Seconds':<10} {'Peak RSS':<10}")
+    for loader, result in results.items():
+        peak = f"{result['peak_rss_mb']:.1f} MB" if result["peak_rss_mb"] is not None else "n/a"
+        print(f"{loader:<10} {result['seconds']:<10.2f} {peak:<10}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_json_loading()
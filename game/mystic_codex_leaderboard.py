@@ -0,0 +1,207 @@
+# THE MYSTIC FOREST ADVENTURE - LEADERBOARD ENGINE
+# An append-only score log with an in-memory top-N heap for the high score table
+
+import heapq
+import itertools
+import json
+from mystic_codex_locking import FileLock
+from mystic_codex_persistence import IO_STATS, atomic_write_text
+
+
+def _write_json(filepath, data):
+    """Default snapshot writer used when no save function is supplied"""
+    text = json.dumps(data, indent=2, ensure_ascii=False)
+    atomic_write_text(filepath, text)
+    IO_STATS.record(filepath, len(text.encode('utf-8')))
+    return True
+
+
+class Leaderboard:
+    """Class to keep the top scores in memory, backed by an append-only score log
+
+    Every finished game is appended as one JSON line to the score log, so no
+    score is ever thrown away. The top entries live in a bounded min-heap, which
+    makes an insertion O(log N). The snapshot file (highscores.json) is only
+    rewritten when a new score actually places on the board.
+
+    Several game processes can share the files: every change happens under an
+    advisory lock on score_log.jsonl.lock, and before adding a score the index
+    first reads whatever other processes appended to the log since it last
+    looked. The snapshot is written while the lock is held, so it always
+    reflects every logged score.
+
+    With a shared_snapshot (a SharedLeaderboardSnapshot) the board is also
+    published to a memory-mapped file whenever it changes, so other processes
+    can read the top scores without parsing highscores.json or taking the lock.
+    """
+
+    def __init__(self, log_file, snapshot_file, size=10, save_function=None, shared_snapshot=None):
+        self.log_file = log_file
+        self.snapshot_file = snapshot_file
+        self.size = size
+        self.save_function = save_function or _write_json
+        self.shared_snapshot = shared_snapshot
+        self.lock = FileLock(log_file.with_name(log_file.name + ".lock"))
+        self._heap = []  # (score, -sequence, entry) - the weakest entry sits at the root
+        self._sequence = itertools.count()
+        self._log_offset = 0  # How far into the score log the index has read
+        self._torn_bytes = 0  # Length of an unfinished record at the end of the log
+        self._loaded = False
+
+    # INDEX MANAGEMENT
+
+    def _push(self, entry):
+        """Offer an entry to the heap and return True if it placed"""
+        item = (entry["score"], -next(self._sequence), entry)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, item)
+            return True
+        # Ties keep the older entry, just like the original stable sort did
+        return heapq.heappushpop(self._heap, item) is not item
+
+    def _ensure_loaded(self):
+        """Build the index the first time it is needed, then pick up other processes' scores"""
+        with self.lock:
+            if not self._loaded:
+                self.rebuild()
+            else:
+                self._catch_up()
+
+    def rebuild(self):
+        """Rebuild the top-N index by replaying the score log"""
+        with self.lock:
+            self._heap = []
+            self._sequence = itertools.count()
+            self._log_offset = 0
+            self._torn_bytes = 0
+            self._loaded = True
+
+            if not self.log_file.exists():
+                self._import_snapshot()
+            self._catch_up()
+            self._publish()
+
+    def _catch_up(self):
+        """Push the log records written since the index last read it (caller holds the lock)"""
+        try:
+            with open(self.log_file, 'rb') as file:
+                file.seek(self._log_offset)
+                data = file.read()
+        except FileNotFoundError:
+            return
+        # A record without its newline is still being written; read it next time
+        complete = data[:data.rfind(b"\n") + 1]
+        self._log_offset += len(complete)
+        self._torn_bytes = len(data) - len(complete)
+        for entry in self._parse_records(complete):
+            self._push(entry)
+
+    @staticmethod
+    def _parse_records(data):
+        """Decode complete score log lines, skipping corrupted records"""
+        entries = []
+        for line in data.decode('utf-8', errors='replace').splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Skip a corrupted record
+            if isinstance(entry, dict) and isinstance(entry.get("score"), int):
+                entries.append(entry)
+        return entries
+
+    def _import_snapshot(self):
+        """Seed the score log from an existing highscores.json (one-time migration)"""
+        if not self.snapshot_file.exists():
+            return
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as file:
+                scores = json.load(file).get("scores", [])
+        except (json.JSONDecodeError, OSError, AttributeError):
+            return
+
+        if scores:
+            self._append_to_log(*scores)  # _catch_up pushes them
+
+    def _append_to_log(self, *entries):
+        """Append score records to the log with a single open; return the bytes written"""
+        text = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        if self._torn_bytes:
+            text = "\n" + text  # End a record a crashed writer left unfinished
+        data = text.encode('utf-8')
+        with open(self.log_file, 'ab') as file:
+            file.write(data)
+        IO_STATS.record(self.log_file, len(data))
+        return len(data)
+
+    def _publish(self):
+        """Put the current board in the shared snapshot (caller holds the lock)"""
+        if self.shared_snapshot is not None:
+            self.shared_snapshot.publish(self._top())
+
+    def reset(self):
+        """Forget the in-memory index (used after the data files are deleted)"""
+        with self.lock:
+            self._heap = []
+            self._sequence = itertools.count()
+            self._log_offset = 0
+            self._torn_bytes = 0
+            self._loaded = False
+            self._publish()  # Other processes keep the file mapped, so it is emptied rather than deleted
+
+    # PUBLIC API
+
+    def add(self, entry):
+        """Record a score and return True if it made it onto the board"""
+        return self.add_many([entry])[0]
+
+    def add_many(self, entries):
+        """Record several scores at once; the snapshot is rewritten at most once
+
+        Returns a list of booleans telling which entries made it onto the board.
+        """
+        if not entries:
+            return []
+        with self.lock:
+            self._ensure_loaded()
+            # The index is caught up and we hold the lock, so the log ends with our records
+            self._log_offset += self._append_to_log(*entries) + self._torn_bytes
+            self._torn_bytes = 0
+            placed = [self._push(entry) for entry in entries]
+            if any(placed):
+                self.save_function(self.snapshot_file, {"scores": self._top()})
+                self._publish()
+        return placed
+
+    def scores_since(self, offset=0):
+        """Get the scores logged after byte offset of the score log; return (entries, new offset)
+
+        Used by the leaderboard queries to read only what is new since they last looked.
+        """
+        with self.lock:
+            self._ensure_loaded()  # Imports an old highscores.json into the log first
+            try:
+                with open(self.log_file, 'rb') as file:
+                    file.seek(offset)
+                    data = file.read()
+            except FileNotFoundError:
+                return [], 0
+        complete = data[:data.rfind(b"\n") + 1]
+        return self._parse_records(complete), offset + len(complete)
+
+    def would_place(self, score):
+        """Check whether a score is high enough to enter the board"""
+        self._ensure_loaded()
+        return len(self._heap) < self.size or score > self._heap[0][0]
+
+    def top(self, count=None):
+        """Return the best entries, highest score first"""
+        self._ensure_loaded()
+        return self._top(count)
+
+    def _top(self, count=None):
+        """Return the best entries without refreshing the index"""
+        count = self.size if count is None else count
+        return [item[2] for item in heapq.nlargest(count, self._heap)]
@@ -0,0 +1,71 @@
+# THE MYSTIC FOREST ADVENTURE - FILE LOCKING
+# Advisory locks so several game processes can share one game_data directory
+
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # Everything except Windows
+    msvcrt = None
+
+
+class FileLock:
+    """Class for an exclusive advisory lock held on a separate .lock file
+
+    Works across processes (fcntl.flock on POSIX, msvcrt.locking on Windows)
+    and across threads of one process. The lock is re-entrant, so code that
+    already holds it can call other locked methods.
+    """
+
+    def __init__(self, lock_file):
+        self.lock_file = lock_file
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self):
+        """Block until the lock is held"""
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX)
+                elif msvcrt is not None:
+                    msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+            except BaseException:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        """Release the lock (the file lock goes when the outermost holder releases)"""
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                elif msvcrt is not None:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
@@ -0,0 +1,381 @@
+# THE MYSTIC FOREST ADVENTURE - IN-MEMORY STORAGE
+# Every store held in dictionaries and lists, for simulations and benchmarks that must not touch the disk
+
+import collections
+import datetime
+import heapq
+import itertools
+import json
+import threading
+from mystic_codex_config import ConfigCache
+from mystic_codex_history import format_event
+from mystic_codex_history_index import ScanningHistoryIndex
+from mystic_codex_jsonstream import write_json_items
+from mystic_codex_saves import summarize_save
+from mystic_codex_storage import CONFIG_KEY, StorageBackend
+
+MAX_HISTORY_LINES = 100_000  # Newest history lines kept, so a million simulated games stay in bounded memory
+
+
+def _copy_profile(profile):
+    """Copy a profile so callers can't change the stored one"""
+    copied = dict(profile)
+    copied["achievements"] = list(profile["achievements"])
+    return copied
+
+
+class MemoryProfileStore:
+    """Class to keep player profiles in a dictionary (same methods and dictionaries as ProfileStore)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = {}  # name -> profile, in creation order
+
+    def close(self):
+        """Nothing to close - the profiles stay in memory"""
+
+    # SINGLE PLAYER OPERATIONS
+
+    def get(self, name):
+        """Get one profile, or None if the player doesn't exist"""
+        with self._lock:
+            profile = self._profiles.get(name)
+            return _copy_profile(profile) if profile else None
+
+    def create(self, name):
+        """Create a profile if it doesn't exist; return (profile, created)"""
+        with self._lock:
+            created = self._create(name)
+            return _copy_profile(self._profiles[name]), created
+
+    def _create(self, name, created_date=None):
+        """Add an empty profile (caller holds the lock); return True if it was new"""
+        if name in self._profiles:
+            return False
+        self._profiles[name] = {
+            "name": name,
+            "games_played": 0,
+            "total_score": 0,
+            "best_score": 0,
+            "achievements": [],
+            "total_playtime": 0,
+            "created_date": created_date or datetime.datetime.now().isoformat(),
+            "last_played": None
+        }
+        return True
+
+    def record_game(self, name, score, achievements=()):
+        """Add one finished game to a player's totals"""
+        with self._lock:
+            self._record_game(name, score, achievements)
+
+    def _record_game(self, name, score, achievements):
+        """Apply one finished game (caller holds the lock)"""
+        now = datetime.datetime.now().isoformat()
+        if self._create(name, now):
+            profile = self._profiles[name]
+            profile["best_score"] = score
+        else:
+            profile = self._profiles[name]
+            profile["best_score"] = max(profile["best_score"], score)
+        profile["games_played"] += 1
+        profile["total_score"] += score
+        profile["last_played"] = now
+        for achievement in achievements:
+            if achievement not in profile["achievements"]:
+                profile["achievements"].append(achievement)
+
+    def apply_changes(self, new_players=(), games=()):
+        """Create profiles and record finished games together; return the names created"""
+        with self._lock:
+            created = [name for name in new_players if self._create(name)]
+            for name, score, achievements in games:
+                self._record_game(name, score, achievements)
+        return created
+
+    def put(self, profile):
+        """Insert or replace a full profile dictionary"""
+        self.put_many([profile])
+
+    def put_many(self, profiles):
+        """Insert or replace many profiles"""
+        with self._lock:
+            for profile in profiles:
+                stored = {
+                    "name": profile["name"],
+                    "games_played": profile.get("games_played", 0),
+                    "total_score": profile.get("total_score", 0),
+                    "best_score": profile.get("best_score", 0),
+                    "achievements": [],
+                    "total_playtime": profile.get("total_playtime", 0),
+                    "created_date": profile.get("created_date"),
+                    "last_played": profile.get("last_played")
+                }
+                old = self._profiles.get(profile["name"])
+                for achievement in (old["achievements"] if old else []) + list(profile.get("achievements", [])):
+                    if achievement not in stored["achievements"]:
+                        stored["achievements"].append(achievement)
+                self._profiles[profile["name"]] = stored
+
+    # WHOLE STORE OPERATIONS
+
+    def count(self):
+        """Count the stored profiles"""
+        return len(self._profiles)
+
+    def iter_profiles(self, batch_size=500, include_archived=True):
+        """Yield every profile in creation order, copied batch_size at a time"""
+        with self._lock:
+            names = list(self._profiles)
+        for start in range(0, len(names), batch_size):
+            with self._lock:
+                batch = [_copy_profile(self._profiles[name]) for name in names[start:start + batch_size]
+                         if name in self._profiles]
+            yield from batch
+
+    def all_profiles(self):
+        """Get every profile as a {name: profile} dictionary"""
+        return {profile["name"]: profile for profile in self.iter_profiles()}
+
+    def count_active(self):
+        """Every profile counts as active - nothing is archived in memory"""
+        return self.count()
+
+    def count_archived(self):
+        return 0
+
+    def archive_inactive(self, active_days=None, batch_size=500):
+        """Nothing to archive to - the profiles only live as long as the process"""
+        return 0
+
+    def export_json(self, json_file):
+        """Write every profile to a JSON file in the original format"""
+        with open(json_file, 'w', encoding='utf-8') as file:
+            write_json_items(file, ((profile["name"], profile) for profile in self.iter_profiles()))
+        return True
+
+    def delete_all(self):
+        """Remove every profile"""
+        with self._lock:
+            self._profiles = {}
+
+
+class MemoryLeaderboard:
+    """Class to keep every recorded score in a list and the top entries in a bounded min-heap"""
+
+    def __init__(self, size=10):
+        self.size = size
+        self._lock = threading.Lock()
+        self.scores = []  # Every recorded score, oldest first (the score log)
+        self._heap = []   # (score, -sequence, entry) - the weakest entry sits at the root
+        self._sequence = itertools.count()
+
+    def _push(self, entry):
+        """Offer an entry to the heap and return True if it placed"""
+        item = (entry["score"], -next(self._sequence), entry)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, item)
+            return True
+        # Ties keep the older entry, like the file leaderboard
+        return heapq.heappushpop(self._heap, item) is not item
+
+    def add(self, entry):
+        """Record a score and return True if it made it onto the board"""
+        return self.add_many([entry])[0]
+
+    def add_many(self, entries):
+        """Record several scores; returns which of them made it onto the board"""
+        with self._lock:
+            entries = [dict(entry) for entry in entries]
+            self.scores.extend(entries)
+            return [self._push(entry) for entry in entries]
+
+    def scores_since(self, position=0):
+        """Get the scores recorded after the first position ones; return (entries, new position)"""
+        with self._lock:
+            return [dict(entry) for entry in self.scores[position:]], len(self.scores)
+
+    def would_place(self, score):
+        """Check whether a score is high enough to enter the board"""
+        with self._lock:
+            return len(self._heap) < self.size or score > self._heap[0][0]
+
+    def top(self, count=None):
+        """Return the best entries, highest score first"""
+        count = self.size if count is None else count
+        with self._lock:
+            return [dict(item[2]) for item in heapq.nlargest(count, self._heap)]
+
+    def reset(self):
+        """Nothing is cached apart from the data itself"""
+
+    def delete_all(self):
+        """Remove every recorded score"""
+        with self._lock:
+            self.scores = []
+            self._heap = []
+            self._sequence = itertools.count()
+
+
+class MemorySaveStore:
+    """Class to keep save slots as JSON text in a dictionary
+
+    States are stored serialized, so a save behaves like the file one: later
+    changes to the saved dictionary don't leak in, and anything that couldn't
+    be written to a file is refused here too.
+    """
+
+    def __init__(self, snapshot_format="json"):
+        self.snapshot_format = snapshot_format  # Kept for the interface; there is no file format
+        self._lock = threading.Lock()
+        self._saves = {}      # slot_number -> JSON text
+        self._summaries = {}  # slot_number -> slot summary
+
+    def save(self, slot_number, save_data):
+        """Save a slot"""
+        try:
+            text = json.dumps(save_data, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            print(f"❌ Error saving slot {slot_number}: {e}")
+            return False
+        with self._lock:
+            self._saves[slot_number] = text
+            self._summaries[slot_number] = summarize_save(f"save_{slot_number}", save_data)
+        return True
+
+    def has_save(self, slot_number):
+        """Check whether a slot holds a save"""
+        return slot_number in self._saves
+
+    def load(self, slot_number):
+        """Load a slot's game state (None if it is empty)"""
+        text = self._saves.get(slot_number)
+        return json.loads(text) if text is not None else None
+
+    def delete(self, slot_number):
+        """Delete a slot; return True if there was a save in it"""
+        with self._lock:
+            self._summaries.pop(slot_number, None)
+            return self._saves.pop(slot_number, None) is not None
+
+    def list_slots(self):
+        """Get {slot_number: summary} for every save slot"""
+        with self._lock:
+            return {slot: dict(summary) for slot, summary in sorted(self._summaries.items())}
+
+    def convert_to_binary(self):
+        """Nothing to convert - saves in memory have no file format"""
+        return []
+
+    def delete_all(self):
+        """Remove every save"""
+        with self._lock:
+            self._saves = {}
+            self._summaries = {}
+
+
+class MemoryHistoryLog:
+    """Class to keep the game history as a list of lines
+
+    With max_lines set only the newest lines are kept, so very long
+    simulations use bounded memory.
+    """
+
+    def __init__(self, max_lines=None):
+        self._lock = threading.Lock()
+        self._lines = collections.deque(maxlen=max_lines)
+
+    def append(self, text):
+        """Log one event with the current timestamp"""
+        return self.append_lines([format_event(text)])
+
+    def append_lines(self, lines):
+        """Append ready-made history lines"""
+        with self._lock:
+            self._lines.extend(lines)
+        return True
+
+    def flush(self):
+        """Nothing is buffered"""
+
+    def close(self):
+        """Nothing to close"""
+
+    def tail(self, count=20):
+        """Get the last count lines, newest last"""
+        if count <= 0:
+            return []
+        with self._lock:
+            return list(itertools.islice(reversed(self._lines), count))[::-1]
+
+    def iter_lines(self):
+        """Yield every line of the history, oldest first"""
+        with self._lock:
+            lines = list(self._lines)
+        yield from lines
+
+    def delete_all(self):
+        """Remove every line"""
+        with self._lock:
+            self._lines.clear()
+
+
+class MemoryStorageBackend(StorageBackend):
+    """Class for game data that only lives as long as the process
+
+    Nothing is read from or written to the disk, which makes it the backend
+    for large simulations, benchmarks of the game logic and throwaway runs.
+    Only the newest max_history_lines history lines are kept (None keeps all).
+    """
+
+    name = "memory"
+
+    def __init__(self, max_history_lines=MAX_HISTORY_LINES):
+        super().__init__()
+        self.max_history_lines = max_history_lines
+        self._config_text = None
+        self._config_version = 0
+
+    def _load_config(self, config_key, default_data=None):
+        text = self._config_text
+        return json.loads(text) if text is not None else default_data
+
+    def _save_config(self, config_key, data):
+        self._config_text = json.dumps(data, ensure_ascii=False)
+        self._config_version += 1
+        return True
+
+    def _config_signature(self):
+        return self._config_version if self._config_text is not None else None
+
+    def _open_config_cache(self, defaults):
+        return ConfigCache(CONFIG_KEY, defaults,
+                           load_function=self._load_config,
+                           save_function=self._save_config,
+                           signature_function=self._config_signature)
+
+    def _open_profile_store(self):
+        return MemoryProfileStore()
+
+    def _open_leaderboard(self, size):
+        return MemoryLeaderboard(size)
+
+    def _open_save_store(self, snapshot_format):
+        return MemorySaveStore(snapshot_format)
+
+    def _open_history_log(self):
+        return MemoryHistoryLog(self.max_history_lines)
+
+    def _open_history_index(self, history_log):
+        return ScanningHistoryIndex(history_log)
+
+    def close_profile_store(self):
+        """Keep the profiles - closing would throw them away"""
+
+    def delete_all(self):
+        """Forget every profile, score, save, setting and history line"""
+        with self._lock:
+            for store in (self.profile_store(), self.leaderboard(), self.save_store(), self.history_log()):
+                store.delete_all()
+            self._config_text = None
+            self._reset_cached_stores()
@@ -0,0 +1,196 @@
+# THE MYSTIC FOREST ADVENTURE - BACKGROUND PERSISTENCE
+# Crash-safe file writes handed to a background thread so the game never waits on disk
+
+import atexit
+import os
+import tempfile
+import threading
+import time
+
+
+def atomic_write_text(filepath, text):
+    """Write text (or bytes) to a temp file next to filepath, then swap it into place
+
+    os.replace is atomic, so a crash leaves either the old file or the new
+    one on disk - never a half-written file.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix=".tmp")
+    try:
+        if isinstance(text, bytes):
+            file = os.fdopen(fd, 'wb')
+        else:
+            file = os.fdopen(fd, 'w', encoding='utf-8')
+        with file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, filepath)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class IOStats:
+    """Class to count which files were written and how many bytes went to disk
+
+    Used by the persistence benchmark; take a snapshot() before some work and
+    compare it with another one afterwards.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bytes_by_path = {}
+        self.writes = 0
+
+    def record(self, filepath, byte_count):
+        """Count one write of byte_count bytes to filepath"""
+        with self._lock:
+            key = str(filepath)
+            self.bytes_by_path[key] = self.bytes_by_path.get(key, 0) + byte_count
+            self.writes += 1
+
+    def snapshot(self):
+        """Get a copy of the counters"""
+        with self._lock:
+            return {"writes": self.writes, "bytes_by_path": dict(self.bytes_by_path)}
+
+    @staticmethod
+    def difference(before, after):
+        """Summarize what happened between two snapshots"""
+        touched = {path: count - before["bytes_by_path"].get(path, 0)
+                   for path, count in after["bytes_by_path"].items()
+                   if count != before["bytes_by_path"].get(path, 0)}
+        return {
+            "writes": after["writes"] - before["writes"],
+            "files_touched": len(touched),
+            "bytes_written": sum(touched.values()),
+            "bytes_by_path": touched
+        }
+
+
+IO_STATS = IOStats()
+
+
+class WriteBehindWorker:
+    """Class to write files on a background thread with coalescing
+
+    submit() returns immediately. A path that is submitted again before its
+    write window has passed is only written once, with the newest content.
+    flush() blocks until everything submitted so far is on disk and returns
+    the writes that failed, so a failure is never only a printed line.
+    """
+
+    def __init__(self, coalesce_window=0.2, write_function=None):
+        self.coalesce_window = coalesce_window
+        self.write_function = write_function or atomic_write_text
+        self._condition = threading.Condition()
+        self._pending = {}    # path -> [text, due_time]
+        self._writing = {}    # path -> text, while the worker writes it
+        self._failures = {}   # path -> exception from its latest write, until it is submitted again
+        self._flush_waiters = 0
+        self._thread = None
+        self.writes_submitted = 0
+        self.writes_performed = 0
+
+    def _ensure_thread(self):
+        """Start the worker thread on first use"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def submit(self, filepath, text):
+        """Queue text (or bytes) to be written to filepath"""
+        with self._condition:
+            self.writes_submitted += 1
+            self._failures.pop(filepath, None)
+            if filepath in self._pending:
+                self._pending[filepath][0] = text  # Coalesce - keep the original due time
+            else:
+                self._pending[filepath] = [text, time.monotonic() + self.coalesce_window]
+            self._ensure_thread()
+            self._condition.notify_all()
+
+    def pending_text(self, filepath):
+        """Get content that is queued but maybe not on disk yet (None if nothing is queued)"""
+        with self._condition:
+            if filepath in self._pending:
+                return self._pending[filepath][0]
+            return self._writing.get(filepath)
+
+    def write_state(self, filepath):
+        """Get "pending" if a write to filepath is queued, "failed" if its last write failed, else None"""
+        with self._condition:
+            if filepath in self._pending or filepath in self._writing:
+                return "pending"
+            return "failed" if filepath in self._failures else None
+
+    def failures(self):
+        """Get {path: error} for the writes known to have failed so far, without waiting"""
+        with self._condition:
+            return dict(self._failures)
+
+    def flush(self, timeout=None):
+        """Block until every queued write has been tried and return {path: error} for the ones that failed
+
+        A failure stays listed until its path is submitted again. If the
+        timeout runs out first, the failures known so far are returned.
+        """
+        with self._condition:
+            self._flush_waiters += 1
+            self._condition.notify_all()
+            try:
+                self._condition.wait_for(lambda: not self._pending and not self._writing, timeout)
+                return dict(self._failures)
+            finally:
+                self._flush_waiters -= 1
+
+    def _take_due_writes(self):
+        """Wait for writes that are due (or for a flush) and take them off the queue"""
+        with self._condition:
+            while True:
+                if self._pending:
+                    now = time.monotonic()
+                    if self._flush_waiters:
+                        due = list(self._pending)
+                    else:
+                        due = [path for path, (_, due_time) in self._pending.items() if due_time <= now]
+                    if due:
+                        for path in due:
+                            self._writing[path] = self._pending.pop(path)[0]
+                        return dict(self._writing)
+                    next_due = min(due_time for _, due_time in self._pending.values())
+                    self._condition.wait(next_due - now)
+                else:
+                    self._condition.wait()
+
+    def _run(self):
+        """Worker thread main loop"""
+        while True:
+            batch = self._take_due_writes()
+            failures = {}
+            for filepath, text in batch.items():
+                try:
+                    self.write_function(filepath, text)
+                    self.writes_performed += 1
+                    IO_STATS.record(filepath, len(text) if isinstance(text, bytes) else len(text.encode('utf-8')))
+                except PermissionError as e:
+                    print(f"❌ Permission denied writing to {filepath.name}")
+                    failures[filepath] = e
+                except Exception as e:
+                    print(f"❌ Error saving to {filepath.name}: {e}")
+                    failures[filepath] = e
+            with self._condition:
+                for filepath in batch:
+                    if filepath in failures:
+                        self._failures[filepath] = failures[filepath]
+                    else:
+                        self._failures.pop(filepath, None)
+                self._writing.clear()
+                self._condition.notify_all()
+
+
+WRITE_BEHIND = WriteBehindWorker()
+atexit.register(WRITE_BEHIND.flush)
@@ -0,0 +1,293 @@
+# THE MYSTIC FOREST ADVENTURE - TIERED PLAYER PROFILES
+# Active players in the players table with an in-memory cache, inactive ones compressed in an archive table
+
+import datetime
+import json
+import random
+import shutil
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from mystic_codex_profiles import ProfileStore
+
+ACTIVE_DAYS = 90  # Players who haven't played for this long are archived
+ARCHIVE_INTERVAL = datetime.timedelta(days=1)  # How often opening the store checks for inactive players
+
+TIER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archived_players (
+    name TEXT PRIMARY KEY,
+    last_active TEXT,
+    profile BLOB NOT NULL
+);
+"""
+
+
+def _copy_profile(profile):
+    """Copy a cached profile so callers can't change it"""
+    copied = dict(profile)
+    copied["achievements"] = list(profile["achievements"])
+    return copied
+
+
+def compress_profile(profile):
+    """Pack a profile into the compressed form kept in the archive"""
+    return zlib.compress(json.dumps(profile, ensure_ascii=False, separators=(",", ":")).encode('utf-8'))
+
+
+def decompress_profile(data):
+    """Unpack an archived profile"""
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+class TieredProfileStore(ProfileStore):
+    """Class to keep active players hot and archive the inactive ones
+
+    The players table (and its achievements) only holds players who played
+    in the last active_days days. Every profile read from it is cached in
+    memory, so looking up an active player again costs no query; the cache
+    is dropped whenever another process commits to the database (SQLite's
+    data_version tells us), so it never serves stale totals. Players who
+    stop playing are moved by archive_inactive() into archived_players, one
+    compressed row each, and creating or updating an archived player moves
+    them back in the same transaction. The hot table, the cache and the cost
+    of each operation therefore follow the active players only. get() and
+    iter_profiles() still see archived players, so nothing disappears.
+    """
+
+    def __init__(self, db_file, busy_timeout=30.0, active_days=ACTIVE_DAYS):
+        super().__init__(db_file, busy_timeout)
+        self.active_days = active_days
+        with self._conn:
+            self._conn.executescript(TIER_SCHEMA)
+        self._hot = {}  # name -> profile of an active player
+        self._active_names = set()  # Players known to be in the players table (no archive lookup needed)
+        self._data_version = None
+
+    def _check_data_version(self):
+        """Drop the cache if another connection has committed since the last check"""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._hot.clear()
+            self._active_names.clear()
+            self._data_version = version
+
+    # PROMOTION (caller holds the lock and is inside a transaction)
+
+    def _promote(self, name):
+        """Move an archived player back into the players table; return True if they were archived"""
+        self._check_data_version()  # A cached player may have been archived by another process
+        if name in self._active_names:
+            return False
+        row = self._conn.execute("SELECT profile FROM archived_players WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return False
+        super()._put(decompress_profile(row["profile"]))
+        self._conn.execute("DELETE FROM archived_players WHERE name = ?", (name,))
+        return True
+
+    def _create(self, name):
+        self._promote(name)
+        created = super()._create(name)
+        self._active_names.add(name)
+        return created
+
+    def _record_game(self, name, score, achievements):
+        self._promote(name)
+        super()._record_game(name, score, achievements)
+        self._hot.pop(name, None)  # Re-read with the new totals on next use
+        self._active_names.add(name)
+
+    def _put(self, profile):
+        self._promote(profile["name"])
+        super()._put(profile)
+        self._hot.pop(profile["name"], None)
+        self._active_names.add(profile["name"])
+
+    # SINGLE PLAYER OPERATIONS
+
+    def get(self, name):
+        """Get one profile (active or archived), or None if the player doesn't exist"""
+        with self._lock:
+            self._check_data_version()
+            profile = self._hot.get(name)
+            if profile is None:
+                row = self._conn.execute("SELECT * FROM players WHERE name = ?", (name,)).fetchone()
+                if row is None:
+                    return self._archived(name)
+                profile = self._hot[name] = self._row_to_profile(row)
+                self._active_names.add(name)
+            return _copy_profile(profile)
+
+    def _archived(self, name):
+        """Read an archived profile without promoting it (looking a player up isn't playing)"""
+        row = self._conn.execute("SELECT profile FROM archived_players WHERE name = ?", (name,)).fetchone()
+        return decompress_profile(row["profile"]) if row else None
+
+    def is_archived(self, name):
+        """Check whether a player is in the archive"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM archived_players WHERE name = ?", (name,)).fetchone() is not None
+
+    # ARCHIVING
+
+    def archive_inactive(self, active_days=None, batch_size=500):
+        """Move every player who hasn't played for active_days days into the archive
+
+        Players are moved batch_size at a time, one transaction per batch.
+        The players table is scanned without an index on purpose: it only
+        holds the active players, and an index on last_played would make every
+        recorded game pay for it. Returns how many were archived.
+        """
+        active_days = self.active_days if active_days is None else active_days
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=active_days)).isoformat()
+        archived = 0
+        while True:
+            with self._lock:
+                changes_before = self._conn.total_changes
+                with self._conn:
+                    rows = self._conn.execute(
+                        "SELECT * FROM players WHERE COALESCE(last_played, created_date) < ? LIMIT ?",
+                        (cutoff, batch_size)).fetchall()
+                    if not rows:
+                        break
+                    profiles = self._rows_to_profiles(rows)
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO archived_players (name, last_active, profile) VALUES (?, ?, ?)",
+                        [(profile["name"], profile["last_played"] or profile["created_date"],
+                          compress_profile(profile)) for profile in profiles])
+                    names = [(profile["name"],) for profile in profiles]
+                    self._conn.executemany("DELETE FROM player_achievements WHERE player = ?", names)
+                    self._conn.executemany("DELETE FROM players WHERE name = ?", names)
+                self._record_io(changes_before)
+                for profile in profiles:
+                    self._hot.pop(profile["name"], None)
+                    self._active_names.discard(profile["name"])
+            archived += len(rows)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('profiles_archived', ?)",
+                (datetime.datetime.now().isoformat(),))
+        return archived
+
+    def archive_if_due(self):
+        """Archive inactive players if that hasn't been done for ARCHIVE_INTERVAL"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM store_meta WHERE key = 'profiles_archived'").fetchone()
+        if row is not None:
+            try:
+                if datetime.datetime.now() - datetime.datetime.fromisoformat(row["value"]) < ARCHIVE_INTERVAL:
+                    return 0
+            except ValueError:
+                pass
+        return self.archive_inactive()
+
+    # WHOLE STORE OPERATIONS
+
+    def count_active(self):
+        """Count the players in the hot tier"""
+        return super().count()
+
+    def count_archived(self):
+        """Count the archived players"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM archived_players").fetchone()[0]
+
+    def count(self):
+        """Count every profile, active and archived"""
+        return self.count_active() + self.count_archived()
+
+    def iter_profiles(self, batch_size=500, include_archived=True):
+        """Yield the active profiles in the order they were stored, then (optionally) the archived ones
+
+        A player brought back from the archive is stored again, so they come
+        after the players who stayed active.
+        """
+        yield from super().iter_profiles(batch_size)
+        if not include_archived:
+            return
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, profile FROM archived_players WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, batch_size)).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1]["rowid"]
+            for row in rows:
+                yield decompress_profile(row["profile"])
+
+    def delete_all(self):
+        """Remove every profile, active and archived"""
+        super().delete_all()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM archived_players")
+            self._hot.clear()
+            self._active_names.clear()
+
+
+# BENCHMARK
+
+def benchmark_profile_tiers(active_players=1000, inactive_players=100000, operations=5000):
+    """Compare a flat profile store with a tiered one holding the same players
+
+    Both databases get inactive_players players who last played a year ago
+    and active_players who played today; the tiered one has archived the
+    inactive ones. Each store then looks up and records games for random
+    active players, the way the game does.
+    """
+    work_dir = Path(tempfile.mkdtemp(prefix="mystic_tiers_"))
+    long_ago = (datetime.datetime.now() - datetime.timedelta(days=365)).isoformat()
+    today = datetime.datetime.now().isoformat()
+
+    def profiles():
+        for number in range(inactive_players):
+            yield {"name": f"Gone{number}", "games_played": 8, "total_score": 900, "best_score": 200,
+                   "achievements": ["first_game", "high_scorer"], "created_date": long_ago,
+                   "last_played": long_ago}
+        for number in range(active_players):
+            yield {"name": f"Active{number}", "games_played": 3, "total_score": 300, "best_score": 150,
+                   "achievements": ["first_game"], "created_date": today, "last_played": today}
+
+    results = {}
+    try:
+        for name, store_class in (("flat", ProfileStore), ("tiered", TieredProfileStore)):
+            store = store_class(work_dir / f"{name}.db")
+            store.put_many(profiles())
+            if name == "tiered":
+                store.archive_inactive()
+            players = [f"Active{random.randrange(active_players)}" for _ in range(operations)]
+
+            start = time.perf_counter()
+            for player in players:
+                store.get(player)
+            get_us = (time.perf_counter() - start) / operations * 1e6
+
+            start = time.perf_counter()
+            for player in players[:operations // 10]:
+                store.record_game(player, 100, ["first_game"])
+                store.get(player)
+            update_us = (time.perf_counter() - start) / (operations // 10) * 1e6
+
+            with store._lock:
+                hot_rows = store._conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+                archive_bytes = 0
+                if name == "tiered":
+                    archive_bytes = store._conn.execute(
+                        "SELECT COALESCE(SUM(LENGTH(profile)), 0) FROM archived_players").fetchone()[0]
+            store.close()
+            results[name] = {"get_us": get_us, "update_us": update_us, "hot_rows": hot_rows,
+                             "archive_bytes": archive_bytes}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n{active_players:,} active and {inactive_players:,} inactive players")
+    print(f"{'Store':<8} {'Hot rows':<10} {'get µs':<10} {'update µs':<11} {'Archive bytes':<14}")
+    for name, result in results.items():
+        print(f"{name:<8} {result['hot_rows']:<10,} {result['get_us']:<10.1f} {result['update_us']:<11.1f} "
+              f"{result['archive_bytes']:<14,}")
+    return results
@@ -0,0 +1,274 @@
+# THE MYSTIC FOREST ADVENTURE - PLAYER PROFILE STORE
+# One row per player in SQLite, so finishing a game only touches that player's row
+
+import datetime
+import json
+import sqlite3
+import threading
+from mystic_codex_jsonstream import iter_json_items, write_json_items
+from mystic_codex_persistence import IO_STATS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    games_played INTEGER NOT NULL DEFAULT 0,
+    total_score INTEGER NOT NULL DEFAULT 0,
+    best_score INTEGER NOT NULL DEFAULT 0,
+    total_playtime INTEGER NOT NULL DEFAULT 0,
+    created_date TEXT,
+    last_played TEXT
+);
+CREATE TABLE IF NOT EXISTS player_achievements (
+    player TEXT NOT NULL,
+    achievement TEXT NOT NULL,
+    PRIMARY KEY (player, achievement)
+);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class ProfileStore:
+    """Class to store player profiles in a SQLite database
+
+    The player name is the primary key, so looking up or updating one player
+    is a single indexed row operation no matter how many profiles exist.
+    Profiles are returned as the same dictionaries the JSON file used to hold.
+
+    Several game processes can use the same database: every update is a
+    single atomic statement inside a transaction (no read-modify-write in
+    Python), SQLite's own file locks serialize the writers, and WAL mode lets
+    readers carry on while one of them commits. A writer that finds the
+    database busy waits up to busy_timeout seconds instead of failing.
+    """
+
+    def __init__(self, db_file, busy_timeout=30.0):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_file), timeout=busy_timeout, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def _record_io(self, changes_before):
+        """Count a committed transaction in IO_STATS
+
+        SQLite rewrites whole pages, so one page per changed row is used as an
+        estimate of the bytes written.
+        """
+        changed_rows = self._conn.total_changes - changes_before
+        if changed_rows:
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+            IO_STATS.record(self.db_file, changed_rows * page_size)
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    # ROW CONVERSION
+
+    def _achievements_for(self, name):
+        """Get a player's achievements in the order they were earned"""
+        rows = self._conn.execute(
+            "SELECT achievement FROM player_achievements WHERE player = ? ORDER BY rowid",
+            (name,))
+        return [row["achievement"] for row in rows]
+
+    def _row_to_profile(self, row, achievements=None):
+        """Turn a players row into a profile dictionary"""
+        if achievements is None:
+            achievements = self._achievements_for(row["name"])
+        return {
+            "name": row["name"],
+            "games_played": row["games_played"],
+            "total_score": row["total_score"],
+            "best_score": row["best_score"],
+            "achievements": achievements,
+            "total_playtime": row["total_playtime"],
+            "created_date": row["created_date"],
+            "last_played": row["last_played"]
+        }
+
+    def _rows_to_profiles(self, rows):
+        """Turn a batch of players rows into profiles with one achievements query"""
+        names = [row["name"] for row in rows]
+        achievements = {name: [] for name in names}
+        placeholders = ",".join("?" * len(names))
+        for achievement_row in self._conn.execute(
+                f"SELECT player, achievement FROM player_achievements "
+                f"WHERE player IN ({placeholders}) ORDER BY rowid", names):
+            achievements[achievement_row["player"]].append(achievement_row["achievement"])
+        return [self._row_to_profile(row, achievements[row["name"]]) for row in rows]
+
+    def _add_achievements(self, name, achievements):
+        """Add achievements, ignoring ones the player already has"""
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO player_achievements (player, achievement) VALUES (?, ?)",
+            [(name, achievement) for achievement in achievements])
+
+    # SINGLE PLAYER OPERATIONS
+
+    def get(self, name):
+        """Get one profile, or None if the player doesn't exist"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM players WHERE name = ?", (name,)).fetchone()
+            return self._row_to_profile(row) if row else None
+
+    def create(self, name):
+        """Create a profile if it doesn't exist; return (profile, created)"""
+        with self._lock:
+            changes_before = self._conn.total_changes
+            with self._conn:
+                created = self._create(name)
+            self._record_io(changes_before)
+        return self.get(name), created
+
+    def _create(self, name):
+        """Insert an empty profile without taking the lock; return True if it was new"""
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO players (name, created_date) VALUES (?, ?)",
+            (name, datetime.datetime.now().isoformat()))
+        return cursor.rowcount == 1
+
+    def record_game(self, name, score, achievements=()):
+        """Add one finished game to a player's totals with a single-row UPSERT"""
+        with self._lock:
+            changes_before = self._conn.total_changes
+            with self._conn:
+                self._record_game(name, score, achievements)
+            self._record_io(changes_before)
+
+    def _record_game(self, name, score, achievements):
+        """Apply one finished game without taking the lock (caller holds it)"""
+        now = datetime.datetime.now().isoformat()
+        self._conn.execute(
+            """INSERT INTO players (name, games_played, total_score, best_score, created_date, last_played)
+               VALUES (?, 1, ?, ?, ?, ?)
+               ON CONFLICT(name) DO UPDATE SET
+                   games_played = games_played + 1,
+                   total_score = total_score + excluded.total_score,
+                   best_score = MAX(best_score, excluded.best_score),
+                   last_played = excluded.last_played""",
+            (name, score, score, now, now))
+        self._add_achievements(name, achievements)
+
+    def apply_changes(self, new_players=(), games=()):
+        """Create profiles and record finished games in one transaction
+
+        games is a list of (name, score, achievements). Returns the names of
+        the players that were actually created.
+        """
+        with self._lock:
+            changes_before = self._conn.total_changes
+            with self._conn:
+                created = [name for name in new_players if self._create(name)]
+                for name, score, achievements in games:
+                    self._record_game(name, score, achievements)
+            self._record_io(changes_before)
+        return created
+
+    def put(self, profile):
+        """Insert or replace a full profile dictionary, achievements included (a replaced profile keeps its place in iter_profiles)"""
+        with self._lock, self._conn:
+            self._put(profile)
+
+    def _put(self, profile):
+        """Write a profile without taking the lock (caller holds it)"""
+        self._conn.execute(
+            """INSERT INTO players
+               (name, games_played, total_score, best_score, total_playtime, created_date, last_played)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(name) DO UPDATE SET
+                   games_played = excluded.games_played,
+                   total_score = excluded.total_score,
+                   best_score = excluded.best_score,
+                   total_playtime = excluded.total_playtime,
+                   created_date = excluded.created_date,
+                   last_played = excluded.last_played""",
+            (profile["name"], profile.get("games_played", 0), profile.get("total_score", 0),
+             profile.get("best_score", 0), profile.get("total_playtime", 0),
+             profile.get("created_date"), profile.get("last_played")))
+        self._conn.execute("DELETE FROM player_achievements WHERE player = ?", (profile["name"],))
+        self._add_achievements(profile["name"], profile.get("achievements", []))
+
+    # WHOLE STORE OPERATIONS
+
+    def count(self):
+        """Count the stored profiles"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+    def iter_profiles(self, batch_size=500):
+        """Yield every profile in the order it was first stored, batch_size rows at a time
+
+        Rows are paged by rowid, which updates and put() leave alone (they
+        upsert rather than replace the row). Each batch costs two queries
+        (players, then their achievements), so streaming every profile never
+        holds more than one batch in memory.
+        """
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, * FROM players WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, batch_size)).fetchall()
+                if not rows:
+                    return
+                profiles = self._rows_to_profiles(rows)
+            last_rowid = rows[-1]["rowid"]
+            yield from profiles
+
+    def all_profiles(self):
+        """Get every profile as a {name: profile} dictionary"""
+        return {profile["name"]: profile for profile in self.iter_profiles()}
+
+    def put_many(self, profiles):
+        """Insert or replace many profiles in one transaction"""
+        with self._lock, self._conn:
+            for profile in profiles:
+                self._put(profile)
+
+    def delete_all(self):
+        """Remove every profile (a JSON file that was imported is not imported again)"""
+        with self._lock:
+            changes_before = self._conn.total_changes
+            with self._conn:
+                self._conn.execute("DELETE FROM player_achievements")
+                self._conn.execute("DELETE FROM players")
+            self._record_io(changes_before)
+
+    # JSON IMPORT / EXPORT
+
+    def import_json_once(self, json_file):
+        """Copy profiles from the old JSON file the first time the store is opened"""
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM store_meta WHERE key = 'json_imported'").fetchone()
+        if done or not json_file.exists():
+            return 0
+
+        # Streamed entry by entry, so a huge file is never held in memory whole
+        imported = 0
+        try:
+            with self._lock, self._conn:
+                for name, profile in iter_json_items(json_file):
+                    profile.setdefault("name", name)
+                    self._put(profile)
+                    imported += 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('json_imported', ?)",
+                    (datetime.datetime.now().isoformat(),))
+        except (json.JSONDecodeError, AttributeError, OSError) as e:
+            print(f"❌ Could not import {json_file.name}: {e}")
+            return 0
+        print(f"📥 Imported {imported} profiles from {json_file.name}")
+        return imported
+
+    def export_json(self, json_file):
+        """Write every profile to a JSON file in the original format"""
+        with open(json_file, 'w', encoding='utf-8') as file:
+            write_json_items(file, ((profile["name"], profile) for profile in self.iter_profiles()))
+        return True
@@ -0,0 +1,240 @@
+# THE MYSTIC FOREST ADVENTURE - LEADERBOARD QUERIES
+# Sorted score indexes per difficulty and time window for top-k, paging, rank and percentile lookups
+
+import bisect
+import datetime
+import heapq
+import itertools
+import threading
+
+ALL = None  # Board key for "every difficulty"
+SEQUENCE_BITS = 40  # Low bits of a board key that hold the score's sequence number
+PERIODS = {
+    "day": datetime.timedelta(days=1),
+    "week": datetime.timedelta(days=7)
+}
+
+
+def _board_keys(difficulty):
+    """Get the difficulties whose boards a score goes on (its own and the all-difficulty one)"""
+    return (ALL,) if difficulty is ALL else (ALL, difficulty)
+
+
+def board_key(score, sequence):
+    """Pack a score and its sequence number into one int that sorts best score first, oldest first"""
+    return (-score << SEQUENCE_BITS) + sequence
+
+
+def key_sequence(key):
+    """Get the sequence number back out of a board key"""
+    return key & ((1 << SEQUENCE_BITS) - 1)
+
+
+def parse_score_date(entry):
+    """Get the datetime a score was recorded (None if its date can't be read)"""
+    try:
+        return datetime.datetime.fromisoformat(entry.get("date") or "")
+    except (TypeError, ValueError):
+        return None
+
+
+class RankedScores:
+    """Class for one board: every score on it kept in rank order
+
+    Each score is stored as one int key holding -score and its sequence
+    number (see board_key), so the keys sorted ascending are the board from
+    first place down, and equal scores keep the order they were recorded in
+    (the older one ranks higher). Plain ints compare much faster than tuples. Lookups are
+    binary searches, O(log N); adding or removing a score shifts the list,
+    which is a fast memory move even for large boards. Scores that arrive
+    together are appended and sorted in one go, since the sort merges the new
+    run into the sorted list in linear time.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self._player_keys = {}  # player -> that player's keys (a handful each, unsorted)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add_many(self, keyed_players):
+        """Put (key, player) pairs on the board"""
+        if len(keyed_players) == 1:
+            bisect.insort(self.keys, keyed_players[0][0])
+        else:
+            self.keys.extend(key for key, _ in keyed_players)
+            self.keys.sort()
+        player_keys = self._player_keys
+        for key, player in keyed_players:
+            if player in player_keys:
+                player_keys[player].append(key)
+            else:
+                player_keys[player] = [key]
+
+    def remove(self, key, player):
+        """Take a key off the board"""
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+        player_keys = self._player_keys.get(player, [])
+        if key in player_keys:
+            player_keys.remove(key)
+            if not player_keys:
+                del self._player_keys[player]
+
+    def page(self, offset, count):
+        """Get the keys in places offset+1 .. offset+count"""
+        return self.keys[offset:offset + count]
+
+    def count_above(self, score):
+        """Count the scores strictly higher than score"""
+        return bisect.bisect_left(self.keys, board_key(score, 0))
+
+    def best_key(self, player):
+        """Get a player's best key (None if they have no score here)"""
+        player_keys = self._player_keys.get(player)
+        return min(player_keys) if player_keys else None
+
+    def position(self, key):
+        """Get the 1-based place of a stored key"""
+        return bisect.bisect_left(self.keys, key) + 1
+
+
+class ScoreIndex:
+    """Class to answer leaderboard queries by difficulty and time window
+
+    There is an all-time board for every difficulty plus one for all of
+    them together, and the same set for each rolling period ("day" is the
+    last 24 hours, "week" the last 7 days). The index reads the scores from
+    the leaderboard with scores_since(), so it only ever processes scores it
+    hasn't seen (including ones other game processes recorded). Rolling
+    boards drop scores as they age out of their window, so they are kept up
+    to date incrementally instead of being rebuilt.
+    """
+
+    def __init__(self, leaderboard, periods=None):
+        self.leaderboard = leaderboard
+        self.periods = dict(PERIODS if periods is None else periods)
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """Forget every indexed score (used after the scores are deleted)"""
+        with self._lock:
+            self._cursor = 0
+            self._entries = {}  # sequence -> entry
+            self._sequence = itertools.count()
+            self._boards = {}   # (period, difficulty) -> RankedScores; period None is all-time
+            self._expiry = {period: [] for period in self.periods}  # period -> heap of (date, key)
+
+    # BUILDING
+
+    def _board(self, period, difficulty, create=False):
+        board = self._boards.get((period, difficulty))
+        if board is None and create:
+            board = self._boards[(period, difficulty)] = RankedScores()
+        return board
+
+    def _add(self, entries, now):
+        """Put new scores on every board they belong to (caller holds the lock)"""
+        additions = {}  # (period, difficulty) -> [(key, player)]
+        cutoffs = [(period, now - length) for period, length in self.periods.items()]
+        for entry in entries:
+            sequence = next(self._sequence)
+            key = board_key(entry["score"], sequence)
+            self._entries[sequence] = entry
+            player, difficulty = entry.get("player"), entry.get("difficulty")
+            for board_difficulty in _board_keys(difficulty):
+                additions.setdefault((None, board_difficulty), []).append((key, player))
+
+            when = parse_score_date(entry)
+            if when is None:
+                continue
+            for period, cutoff in cutoffs:
+                if when >= cutoff:
+                    for board_difficulty in _board_keys(difficulty):
+                        additions.setdefault((period, board_difficulty), []).append((key, player))
+                    heapq.heappush(self._expiry[period], (when, key))
+
+        for (period, difficulty), keyed_players in additions.items():
+            self._board(period, difficulty, create=True).add_many(keyed_players)
+
+    def _expire(self, now):
+        """Take scores that left their rolling window off those boards"""
+        for period, length in self.periods.items():
+            expiry = self._expiry[period]
+            cutoff = now - length
+            while expiry and expiry[0][0] < cutoff:
+                _, key = heapq.heappop(expiry)
+                entry = self._entries[key_sequence(key)]
+                for board_difficulty in _board_keys(entry.get("difficulty")):
+                    board = self._board(period, board_difficulty)
+                    if board is not None:
+                        board.remove(key, entry.get("player"))
+
+    def refresh(self):
+        """Index the scores recorded since the last refresh and age the rolling boards"""
+        with self._lock:
+            entries, self._cursor = self.leaderboard.scores_since(self._cursor)
+            now = datetime.datetime.now()
+            if entries:
+                self._add(entries, now)
+            self._expire(now)
+
+    def _query_board(self, difficulty, period):
+        """Refresh, then get the board for a query (None if it has no scores yet)"""
+        if period is not None and period not in self.periods:
+            raise ValueError(f"Unknown period '{period}' (choose from {', '.join(self.periods)})")
+        self.refresh()
+        return self._board(period, difficulty)
+
+    # QUERIES
+
+    def top(self, count=10, offset=0, difficulty=ALL, period=None):
+        """Get count entries starting at place offset+1, highest score first"""
+        with self._lock:
+            board = self._query_board(difficulty, period)
+            if board is None:
+                return []
+            return [dict(self._entries[key_sequence(key)]) for key in board.page(offset, count)]
+
+    def page(self, page_number, page_size=10, difficulty=ALL, period=None):
+        """Get one page of a board (page_number starts at 1)"""
+        return self.top(page_size, (page_number - 1) * page_size, difficulty, period)
+
+    def count(self, difficulty=ALL, period=None):
+        """Count the scores on a board"""
+        with self._lock:
+            board = self._query_board(difficulty, period)
+            return len(board) if board is not None else 0
+
+    def rank_of(self, score, difficulty=ALL, period=None):
+        """Get the place a score would take on a board (equal scores share the place)"""
+        with self._lock:
+            board = self._query_board(difficulty, period)
+            return (board.count_above(score) if board is not None else 0) + 1
+
+    def percentile(self, score, difficulty=ALL, period=None):
+        """Get the percentage of a board's scores that are at or below score (None if it is empty)"""
+        with self._lock:
+            board = self._query_board(difficulty, period)
+            if not board:
+                return None
+            return 100.0 * (len(board) - board.count_above(score)) / len(board)
+
+    def best_rank(self, player, difficulty=ALL, period=None):
+        """Get (place, entry) for a player's best score on a board, or None if they have none"""
+        with self._lock:
+            board = self._query_board(difficulty, period)
+            key = board.best_key(player) if board is not None else None
+            if key is None:
+                return None
+            return board.position(key), dict(self._entries[key_sequence(key)])
+
+    def difficulties(self):
+        """Get every difficulty that has an all-time board"""
+        with self._lock:
+            self.refresh()
+            return sorted(difficulty for period, difficulty in self._boards
+                          if period is None and difficulty is not ALL)
@@ -0,0 +1,372 @@
+# THE MYSTIC FOREST ADVENTURE - RECORD AND REPLAY
+# Capture a game's answers and random seed in a small file and play it back headless at full speed
+
+import builtins
+import contextlib
+import hashlib
+import io
+import json
+import random
+import runpy
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from mystic_codex_engine import EDITIONS, RandomPolicy, console_policy, get_edition, silent
+from mystic_codex_persistence import atomic_write_text
+
+MAGIC = b"MFRP"
+FORMAT_VERSION = 1
+EDITION_FIELD_SIZE = 16
+
+# magic, version, flags, seed, draws, draw CRC, answer count, body length, edition, final state hash
+HEADER_STRUCT = struct.Struct(f"<4sHHQIIII{EDITION_FIELD_SIZE}s32s")
+HEADER_SIZE = HEADER_STRUCT.size
+
+REPLAY_EXTENSION = ".mfr"
+
+# Editions written as plain console scripts - recorded through input() and the global random
+SCRIPTS = {
+    "conditions": "mystic_codex_conditions.py",
+    "loops": "mystic_codex_loops.py"
+}
+
+
+class ReplayFormatError(ValueError):
+    """Raised when bytes are not a replay file this version can read"""
+
+
+class RecordingRandom(random.Random):
+    """random.Random that counts its draws and keeps a CRC of the drawn values
+
+    Every randint, choice and random call ends in random() or
+    getrandbits(), so watching those two sees the whole draw sequence.
+    """
+
+    def __init__(self, seed=None):
+        self.draws = 0
+        self.draw_crc = 0
+        super().__init__(seed)
+
+    def random(self):
+        value = super().random()
+        self._record(struct.pack("<d", value))
+        return value
+
+    def getrandbits(self, k):
+        value = super().getrandbits(k)
+        self._record(value.to_bytes((k + 7) // 8 or 1, "little"))
+        return value
+
+    def _record(self, data):
+        self.draws += 1
+        self.draw_crc = zlib.crc32(data, self.draw_crc)
+
+
+def state_hash(state):
+    """Get the SHA-256 of a final game state (the replay's correctness check)"""
+    encoded = json.dumps(state, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).digest()
+
+
+# RECORDING
+
+def record_game(edition, policy, seed=None, say=silent, max_steps=100000):
+    """Play one game, noting every answer and draw, and return its replay
+
+    The replay is a dictionary with the edition, seed, answers, the number
+    of draws and their CRC, and the hash of the final state.
+    """
+    game = get_edition(edition)
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(63)
+    rng = RecordingRandom(seed)
+    answers = []
+    state = game.start_game(rng, say)
+    for _ in range(max_steps):
+        prompt, choices = game.game_prompt(state)
+        if prompt is None:
+            break
+        answer = str(policy(state, prompt, choices))
+        answers.append(answer)
+        game.game_step(state, answer, rng, say)
+    else:
+        raise RuntimeError(f"the game did not finish in {max_steps} steps")
+    return {"edition": edition, "seed": seed, "answers": answers, "draws": rng.draws,
+            "draw_crc": rng.draw_crc, "state_hash": state_hash(state)}
+
+
+def record_session(edition, replay_file, seed=None):
+    """Play a game (any edition or script) at the console and save it as a replay file"""
+    if edition in SCRIPTS:
+        replay = record_script(edition, seed)
+    else:
+        replay = record_game(edition, console_policy, seed, say=print)
+    write_replay(replay_file, replay)
+    print(f"\n💾 Recorded {len(replay['answers'])} answers to {replay_file}")
+    return replay
+
+
+# CONSOLE SCRIPTS
+
+class _Tee:
+    """Stream that writes to several streams at once"""
+
+    def __init__(self, *streams):
+        self.streams = streams
+
+    def write(self, text):
+        for stream in self.streams:
+            stream.write(text)
+        return len(text)
+
+    def flush(self):
+        for stream in self.streams:
+            stream.flush()
+
+
+def _run_script(edition, seed, answer, *outputs):
+    """Run a script edition with the global random seeded and input() answered by answer(prompt)
+
+    Everything it prints, prompts included, goes to outputs. Returns the
+    SHA-256 of that transcript. The global random and input() are put back
+    afterwards.
+    """
+    transcript = io.StringIO()
+    stream = _Tee(transcript, *outputs)
+    saved_input, saved_random = builtins.input, random.getstate()
+
+    def scripted_input(prompt=""):
+        stream.write(str(prompt))
+        stream.flush()
+        return answer(prompt)
+
+    builtins.input = scripted_input
+    random.seed(seed)
+    try:
+        with contextlib.redirect_stdout(stream):
+            runpy.run_path(str(Path(__file__).with_name(SCRIPTS[edition])), run_name="__main__")
+    finally:
+        builtins.input = saved_input
+        random.setstate(saved_random)
+    return hashlib.sha256(transcript.getvalue().encode('utf-8')).digest()
+
+
+def record_script(edition, seed=None):
+    """Play a script edition (a name from SCRIPTS) at the console and return its replay
+
+    The scripts draw from the global random and keep no state, so the
+    replay's hash is of the text the game printed and its draws aren't
+    counted (draws and draw_crc are 0).
+    """
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(63)
+    answers = []
+    keyboard_input = builtins.input  # _run_script swaps input() out while the game runs
+
+    def keyboard(prompt):
+        answers.append(keyboard_input())
+        return answers[-1]
+
+    final_hash = _run_script(edition, seed, keyboard, sys.stdout)
+    return {"edition": edition, "seed": seed, "answers": answers, "draws": 0, "draw_crc": 0,
+            "state_hash": final_hash}
+
+
+def _replay_script(replay):
+    """Run a script edition on its recorded answers without output; True if it prints the same text"""
+    answers = iter(replay["answers"])
+
+    def recorded(prompt):
+        try:
+            return next(answers)
+        except StopIteration:
+            raise EOFError("the recorded answers ran out") from None
+
+    try:
+        final_hash = _run_script(replay["edition"], replay["seed"], recorded)
+    except EOFError:
+        return False
+    return final_hash == replay["state_hash"] and next(answers, None) is None
+
+
+# FILE FORMAT
+
+def encode_replay(replay):
+    """Turn a replay into bytes: a fixed header, then the compressed answers"""
+    if replay["edition"] not in EDITIONS and replay["edition"] not in SCRIPTS:
+        raise ValueError(f"unknown edition {replay['edition']!r}")
+    if any("\n" in answer for answer in replay["answers"]):
+        raise ValueError("answers can't contain line breaks")
+    body = zlib.compress("\n".join(replay["answers"]).encode('utf-8'), 9)
+    header = HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, 0, replay["seed"], replay["draws"], replay["draw_crc"],
+                                len(replay["answers"]), len(body), replay["edition"].encode('utf-8'),
+                                replay["state_hash"])
+    return header + body
+
+
+def decode_replay(data):
+    """Turn replay bytes back into a replay dictionary"""
+    if len(data) < HEADER_SIZE:
+        raise ReplayFormatError("replay file is shorter than its header")
+    magic, version, _flags, seed, draws, draw_crc, answer_count, body_length, edition, final_hash = \
+        HEADER_STRUCT.unpack_from(data)
+    if magic != MAGIC:
+        raise ReplayFormatError("not a Mystic Forest replay file")
+    if version > FORMAT_VERSION:
+        raise ReplayFormatError(f"replay format version {version} is newer than this game")
+    body = data[HEADER_SIZE:HEADER_SIZE + body_length]
+    if len(body) != body_length:
+        raise ReplayFormatError("replay file is truncated")
+    try:
+        text = zlib.decompress(body).decode('utf-8')
+    except (zlib.error, UnicodeDecodeError) as e:
+        raise ReplayFormatError(f"replay body is damaged: {e}") from e
+    answers = text.split("\n") if answer_count else []
+    if len(answers) != answer_count:
+        raise ReplayFormatError("replay body does not hold the recorded answers")
+    return {"edition": edition.rstrip(b"\0").decode('utf-8'), "seed": seed, "answers": answers,
+            "draws": draws, "draw_crc": draw_crc, "state_hash": final_hash}
+
+
+def write_replay(replay_file, replay):
+    """Save a replay file atomically"""
+    atomic_write_text(Path(replay_file), encode_replay(replay))
+
+
+def read_replay(replay_file):
+    """Load a replay file"""
+    with open(replay_file, 'rb') as file:
+        return decode_replay(file.read())
+
+
+# REPLAYING
+
+def replay_game(replay, check_draws=False):
+    """Play a replay back headless and check it ends in the recorded state
+
+    No text is produced. With check_draws the random draws are counted and
+    compared too (a little slower); without it only the final state hash
+    is checked. Returns (matches, final state); script editions have no
+    state, so they return (matches, None) after comparing the printed text.
+    """
+    if replay["edition"] in SCRIPTS:
+        return _replay_script(replay), None
+    game = get_edition(replay["edition"])
+    rng = RecordingRandom(replay["seed"]) if check_draws else random.Random(replay["seed"])
+    answers = replay["answers"]
+    state = game.start_game(rng, silent)
+    for answer in answers:
+        if game.game_prompt(state)[0] is None:
+            return False, state  # The game ended before the recorded answers ran out
+        game.game_step(state, answer, rng, silent)
+    matches = game.game_prompt(state)[0] is None and state_hash(state) == replay["state_hash"]
+    if check_draws:
+        matches = matches and (rng.draws, rng.draw_crc) == (replay["draws"], replay["draw_crc"])
+    return matches, state
+
+
+# CORPUS
+
+def build_corpus(corpus_dir, games=2000, seed=0):
+    """Record games random playthroughs of every edition into corpus_dir
+
+    Returns the list of replay files.
+    """
+    corpus_dir = Path(corpus_dir)
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    seeds = random.Random(seed)
+    replay_files = []
+    for game_number in range(games):
+        edition = list(EDITIONS)[game_number % len(EDITIONS)]
+        replay = record_game(edition, RandomPolicy(seeds.getrandbits(63)), seed=seeds.getrandbits(63))
+        replay_file = corpus_dir / f"replay_{game_number:06d}{REPLAY_EXTENSION}"
+        write_replay(replay_file, replay)
+        replay_files.append(replay_file)
+    return replay_files
+
+
+def run_corpus(corpus_dir, check_draws=False):
+    """Replay every file in corpus_dir - a regression check and a throughput benchmark
+
+    Returns the number of replays, the files that no longer end in their
+    recorded state, the answers replayed and the replay time (file loading
+    not included).
+    """
+    replays = [(replay_file, read_replay(replay_file))
+               for replay_file in sorted(Path(corpus_dir).glob(f"*{REPLAY_EXTENSION}"))]
+    mismatches = []
+    answers = 0
+    start = time.perf_counter()
+    for replay_file, replay in replays:
+        matches, _ = replay_game(replay, check_draws)
+        if not matches:
+            mismatches.append(replay_file)
+        answers += len(replay["answers"])
+    elapsed = time.perf_counter() - start
+    return {"replays": len(replays), "mismatches": mismatches, "answers": answers, "seconds": elapsed}
+
+
+def benchmark_replays(games=5000, seed=0):
+    """Record a corpus of games, then replay it with and without the draw check"""
+    corpus_dir = Path(tempfile.mkdtemp(prefix="mystic_replays_"))
+    try:
+        start = time.perf_counter()
+        replay_files = build_corpus(corpus_dir, games, seed)
+        recorded_seconds = time.perf_counter() - start
+        corpus_bytes = sum(replay_file.stat().st_size for replay_file in replay_files)
+        print(f"\n🎬 Recorded {games:,} games in {recorded_seconds:.2f}s "
+              f"({corpus_bytes / games:.0f} bytes per replay on average)")
+
+        print(f"{'Check':<14} {'Replays/s':<11} {'Answers/s':<12} Mismatches")
+        results = {}
+        for check_draws in (False, True):
+            result = run_corpus(corpus_dir, check_draws)
+            name = "hash + draws" if check_draws else "state hash"
+            print(f"{name:<14} {result['replays'] / result['seconds']:<11,.0f} "
+                  f"{result['answers'] / result['seconds']:<12,.0f} {len(result['mismatches'])}")
+            results[name] = result
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    """Record a game at the console, check a replay file or run the replay benchmark"""
+    print("🎬 MYSTIC FOREST REPLAYS")
+    print("1. Record a game")
+    print("2. Check a replay file")
+    print("3. Benchmark replays")
+    choice = input("Choose option (1-3): ").strip()
+
+    if choice == "1":
+        names = list(EDITIONS) + list(SCRIPTS)
+        for number, name in enumerate(names, 1):
+            print(f"{number}. {name}")
+        edition = input(f"Choose an edition (1-{len(names)}): ").strip()
+        if not edition.isdigit() or not 1 <= int(edition) <= len(names):
+            print("❌ Unknown edition")
+            return
+        replay_file = input("Save the replay as: ").strip() or f"session{REPLAY_EXTENSION}"
+        record_session(names[int(edition) - 1], replay_file)
+    elif choice == "2":
+        replay_file = input("Replay file: ").strip()
+        try:
+            replay = read_replay(replay_file)
+        except (OSError, ReplayFormatError) as e:
+            print(f"❌ Can't read {replay_file}: {e}")
+            return
+        matches, _ = replay_game(replay, check_draws=replay["edition"] in EDITIONS)
+        print(f"{'✅' if matches else '❌'} {replay['edition']} game with {len(replay['answers'])} answers "
+              f"{'ends as recorded' if matches else 'no longer ends as recorded'}")
+    elif choice == "3":
+        benchmark_replays()
+    else:
+        print("❌ Invalid choice")
+
+
+if __name__ == "__main__":
+    main()
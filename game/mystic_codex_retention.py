@@ -0,0 +1,387 @@
+# THE MYSTIC FOREST ADVENTURE - SAVE RETENTION
+# Rotating generations per save slot for rollback, pruned by count and age and compacted in the background
+
+import atexit
+import datetime
+import os
+import shutil
+import threading
+import time
+from mystic_codex_journal import JournaledSaveStore
+from mystic_codex_persistence import IO_STATS, atomic_write_text
+from mystic_codex_savecodec import BINARY_EXTENSION, JSON_EXTENSION, encode_save
+from mystic_codex_saves import slot_number_from_name, summarize_save
+
+JOURNAL_EXTENSION = ".journal.jsonl"
+
+
+class RetentionPolicy:
+    """Class for how many old versions of each save slot are kept, and for how long
+
+    - generations: versions kept per slot for rollback (0 turns retention off)
+    - max_age_days: versions older than this are removed (None keeps them)
+    - max_slots: live saves in higher slots are retired into their generations
+      (None keeps every slot)
+    - keep_uncompressed: the newest versions stay as plain copies; older ones
+      are folded into one compressed binary file each
+    - stale_after: seconds before leftover temp files and journals without a
+      snapshot are removed (younger ones may still be in use)
+    """
+
+    def __init__(self, generations=5, max_age_days=30, max_slots=None, keep_uncompressed=1,
+                 stale_after=3600):
+        self.generations = generations
+        self.max_age_days = max_age_days
+        self.max_slots = max_slots
+        self.keep_uncompressed = keep_uncompressed
+        self.stale_after = stale_after
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the policy from the game settings"""
+        return cls(generations=config.get("save_generations", 5),
+                   max_age_days=config.get("save_retention_days", 30),
+                   max_slots=config.get("max_save_slots"))
+
+
+class SaveRetention:
+    """Class to keep rotating generations of every save slot
+
+    After a save, schedule(slot) hands the slot to a background thread, so
+    save_game never waits on it. Saves to the same slot that arrive within
+    capture_delay of each other are captured once. A capture copies the slot's
+    snapshot and journal into saves/generations/slot_N/ (as 000001.json and
+    000001.journal.jsonl, numbered upwards), then the slot's generations are
+    rotated: only the newest policy.generations are kept, and all but the
+    newest policy.keep_uncompressed are folded into a single compressed .sav.
+
+    Generations live in their own directory, so they never slow down the scan
+    that lists the save slots. run() does a full pass - age pruning, retiring
+    slots above max_slots and removing stale files - and reports what it
+    reclaimed; the background thread also does one every full_pass_interval.
+    """
+
+    def __init__(self, save_store, policy=None, flush_function=None, capture_delay=1.0,
+                 full_pass_interval=3600):
+        self.save_store = save_store
+        self.saves_dir = save_store.journal.saves_dir
+        self.generations_dir = self.saves_dir / "generations"
+        self.policy = policy or RetentionPolicy()
+        self.flush_function = flush_function or (lambda: True)
+        self.capture_delay = capture_delay
+        self.full_pass_interval = full_pass_interval
+        self._reader = JournaledSaveStore(self.generations_dir)  # Silent loader for generation files
+        self._condition = threading.Condition()
+        self._pending = {}  # slot_number -> time the capture is due
+        self._busy = False
+        self._waiters = 0
+        self._thread = None
+        self._work_lock = threading.RLock()  # One pass over the files at a time
+        self._captured = {}  # slot_number -> signature of the files captured last
+        self._last_full_pass = time.monotonic()
+        self.stats = {"generations_created": 0, "generations_pruned": 0, "generations_compressed": 0,
+                      "slots_retired": 0, "stale_files_removed": 0, "bytes_reclaimed": 0}
+
+    def register_atexit(self):
+        """Capture the saves still waiting when the game exits"""
+        atexit.register(self.wait)
+        return self
+
+    # BACKGROUND THREAD
+
+    def schedule(self, slot_number):
+        """Capture a slot that was just saved, in the background"""
+        if self.policy.generations <= 0:
+            return
+        with self._condition:
+            self._pending.setdefault(slot_number, time.monotonic() + self.capture_delay)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="save-retention", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def wait(self, timeout=None):
+        """Block until every scheduled capture is done"""
+        with self._condition:
+            self._waiters += 1
+            self._condition.notify_all()
+            try:
+                return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+            finally:
+                self._waiters -= 1
+
+    def _take_due_slots(self):
+        """Wait for captures that are due (or for a wait()) and take them off the queue"""
+        with self._condition:
+            while True:
+                if self._pending:
+                    now = time.monotonic()
+                    due = [slot for slot, due_time in self._pending.items()
+                           if self._waiters or due_time <= now]
+                    if due:
+                        for slot_number in due:
+                            del self._pending[slot_number]
+                        self._busy = True
+                        return due
+                    self._condition.wait(min(self._pending.values()) - now)
+                else:
+                    self._condition.wait()
+
+    def _run(self):
+        """Background thread main loop"""
+        while True:
+            slots = self._take_due_slots()
+            try:
+                with self._work_lock:
+                    self.flush_function()  # The saves being captured may still be queued
+                    for slot_number in slots:
+                        self._capture(slot_number)
+                        self._rotate(slot_number)
+                    if time.monotonic() - self._last_full_pass >= self.full_pass_interval:
+                        self._full_pass()
+            except OSError as e:
+                print(f"❌ Error keeping old saves: {e}")
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    # GENERATIONS
+
+    def _slot_dir(self, slot_number):
+        return self.generations_dir / f"slot_{slot_number}"
+
+    def _generations(self, slot_number):
+        """Get a slot's generations, newest first, as {number, snapshot, files, size, mtime}"""
+        slot_dir = self._slot_dir(slot_number)
+        if not slot_dir.is_dir():
+            return []
+        generations = {}
+        with os.scandir(slot_dir) as directory:
+            for dir_entry in directory:
+                number, _, extension = dir_entry.name.partition(".")
+                if not number.isdigit():
+                    continue
+                generation = generations.setdefault(int(number), {
+                    "number": int(number), "snapshot": None, "files": [], "size": 0, "mtime": 0})
+                stat_result = dir_entry.stat()
+                generation["files"].append(slot_dir / dir_entry.name)
+                generation["size"] += stat_result.st_size
+                if "." + extension in (JSON_EXTENSION, BINARY_EXTENSION):
+                    generation["snapshot"] = slot_dir / dir_entry.name
+                    generation["mtime"] = stat_result.st_mtime
+        return [generation for _, generation in sorted(generations.items(), reverse=True)
+                if generation["snapshot"] is not None]
+
+    @staticmethod
+    def _is_compact(generation):
+        """Check whether a generation is already a single compressed file"""
+        return generation["snapshot"].suffix == BINARY_EXTENSION and len(generation["files"]) == 1
+
+    def _remove(self, generation, counter):
+        """Delete a generation's files"""
+        for path in generation["files"]:
+            path.unlink(missing_ok=True)
+        self.stats[counter] += 1
+        self.stats["bytes_reclaimed"] += generation["size"]
+
+    def _capture(self, slot_number):
+        """Copy a slot's current snapshot and journal in as its newest generation"""
+        snapshot_file = self.save_store.journal.snapshot_path(slot_number)
+        journal_file = self.save_store.journal.journal_path(slot_number)
+        try:
+            stat_result = snapshot_file.stat()
+        except FileNotFoundError:
+            return False
+        journal_size = journal_file.stat().st_size if journal_file.exists() else 0
+        signature = (snapshot_file.name, stat_result.st_mtime_ns, stat_result.st_size, journal_size)
+        if self._captured.get(slot_number) == signature:
+            return False  # Nothing changed since the last capture
+
+        slot_dir = self._slot_dir(slot_number)
+        slot_dir.mkdir(parents=True, exist_ok=True)
+        generations = self._generations(slot_number)
+        number = f"{(generations[0]['number'] if generations else 0) + 1:06d}"
+        try:
+            if journal_size:
+                shutil.copyfile(journal_file, slot_dir / f"{number}{JOURNAL_EXTENSION}")
+            # The snapshot goes last: a generation only counts once its snapshot is there
+            shutil.copyfile(snapshot_file, slot_dir / f"{number}{snapshot_file.suffix}")
+        except FileNotFoundError:
+            return False  # Replaced by a newer snapshot while copying - the next save captures it
+        self._captured[slot_number] = signature
+        self.stats["generations_created"] += 1
+        return True
+
+    def _rotate(self, slot_number):
+        """Apply the count and age limits to a slot and compress its older generations"""
+        generations = self._generations(slot_number)
+        oldest_kept = None
+        if self.policy.max_age_days is not None:
+            oldest_kept = time.time() - self.policy.max_age_days * 86400
+
+        kept = []
+        for position, generation in enumerate(generations):
+            if position >= self.policy.generations or (oldest_kept is not None
+                                                       and generation["mtime"] < oldest_kept):
+                self._remove(generation, "generations_pruned")
+            else:
+                kept.append(generation)
+
+        for generation in kept[self.policy.keep_uncompressed:]:
+            if not self._is_compact(generation):
+                self._compress(generation)
+
+        if not kept:
+            shutil.rmtree(self._slot_dir(slot_number), ignore_errors=True)
+
+    def _compress(self, generation):
+        """Fold a generation's snapshot and journal into one compressed binary file"""
+        state = self._reader.load_path(generation["snapshot"])
+        if state is None:
+            return False
+        compact_file = generation["snapshot"].with_name(f"{generation['number']:06d}{BINARY_EXTENSION}")
+        data = encode_save(state)
+        atomic_write_text(compact_file, data)
+        IO_STATS.record(compact_file, len(data))
+        os.utime(compact_file, (generation["mtime"], generation["mtime"]))  # Ages from the capture
+        for path in generation["files"]:
+            if path != compact_file:
+                path.unlink(missing_ok=True)
+        self.stats["generations_compressed"] += 1
+        self.stats["bytes_reclaimed"] += generation["size"] - len(data)
+        return True
+
+    # FULL PASS
+
+    def _stale_files(self):
+        """Find leftover temp files and journals whose snapshot is gone"""
+        cutoff = time.time() - self.policy.stale_after
+        stale = []
+        with os.scandir(self.saves_dir) as directory:
+            for dir_entry in directory:
+                if not dir_entry.is_file() or dir_entry.stat().st_mtime >= cutoff:
+                    continue
+                name = dir_entry.name
+                if name.startswith(".") and name.endswith(".tmp"):
+                    stale.append(dir_entry)  # An atomic write that never finished
+                elif name.endswith(JOURNAL_EXTENSION):
+                    slot_number = slot_number_from_name(name[:-len(JOURNAL_EXTENSION)] + JSON_EXTENSION)
+                    if slot_number is not None and not self.save_store.has_save(slot_number):
+                        stale.append(dir_entry)
+        return stale
+
+    def _live_slots(self):
+        """Get the slot numbers that have a snapshot in the saves directory"""
+        with os.scandir(self.saves_dir) as directory:
+            return {slot_number for slot_number in map(slot_number_from_name,
+                                                       (dir_entry.name for dir_entry in directory))
+                    if slot_number is not None}
+
+    def _full_pass(self):
+        """Remove stale files, retire slots above max_slots and rotate every slot"""
+        for dir_entry in self._stale_files():
+            size = dir_entry.stat().st_size
+            os.unlink(dir_entry.path)
+            self.stats["stale_files_removed"] += 1
+            self.stats["bytes_reclaimed"] += size
+
+        if self.policy.max_slots is not None:
+            for slot_number in sorted(self._live_slots()):
+                if slot_number > self.policy.max_slots:
+                    # Kept as a generation, so it can still be restored until it ages out
+                    self._capture(slot_number)
+                    self.save_store.delete(slot_number)
+                    self.stats["slots_retired"] += 1
+
+        slots = set()
+        if self.generations_dir.is_dir():
+            with os.scandir(self.generations_dir) as directory:
+                for dir_entry in directory:
+                    prefix, _, number = dir_entry.name.partition("_")
+                    if prefix == "slot" and number.isdigit():
+                        slots.add(int(number))
+        for slot_number in sorted(slots):
+            self._rotate(slot_number)
+        self._last_full_pass = time.monotonic()
+
+    def _listing_cost(self, repeats=3):
+        """Time listing the save slots from a cold manifest; return (seconds, directory entries)"""
+        with os.scandir(self.saves_dir) as directory:
+            entries = sum(1 for _ in directory)
+        best = None
+        for _ in range(repeats):
+            self.save_store.manifest.reset()
+            start = time.perf_counter()
+            self.save_store.list_slots()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, entries
+
+    def _disk_usage(self):
+        """Total size of every file under the saves directory"""
+        total = 0
+        for root, _, files in os.walk(self.saves_dir):
+            for name in files:
+                try:
+                    total += os.stat(os.path.join(root, name)).st_size
+                except FileNotFoundError:
+                    pass
+        return total
+
+    def run(self):
+        """Do a full retention pass now and report what it changed"""
+        self.wait()
+        with self._work_lock:
+            self.flush_function()
+            stats_before = dict(self.stats)
+            bytes_before = self._disk_usage()
+            listing_before = self._listing_cost()
+            self._full_pass()
+            self.flush_function()  # Retiring slots rewrites the manifest
+            listing_after = self._listing_cost()
+            report = {key: value - stats_before[key] for key, value in self.stats.items()}
+            report.update({
+                "bytes_before": bytes_before,
+                "bytes_after": self._disk_usage(),
+                "listing_seconds_before": listing_before[0],
+                "listing_seconds_after": listing_after[0],
+                "listing_entries_before": listing_before[1],
+                "listing_entries_after": listing_after[1]
+            })
+            return report
+
+    # ROLLBACK
+
+    def list_generations(self, slot_number):
+        """Get a slot's generations, newest first, with their slot summaries"""
+        self.wait()
+        with self._work_lock:
+            listed = []
+            for generation in self._generations(slot_number):
+                state = self._reader.load_summary(generation["snapshot"])
+                summary = summarize_save(generation["snapshot"].name, state or {})
+                summary.update({
+                    "generation": generation["number"],
+                    "kept_since": datetime.datetime.fromtimestamp(generation["mtime"]).isoformat(),
+                    "size": generation["size"],
+                    "compressed": self._is_compact(generation)
+                })
+                listed.append(summary)
+            return listed
+
+    def load_generation(self, slot_number, generation_number):
+        """Load the game state of one generation (None if there is no such generation)"""
+        self.wait()
+        with self._work_lock:
+            for generation in self._generations(slot_number):
+                if generation["number"] == generation_number:
+                    return self._reader.load_path(generation["snapshot"])
+            return None
+
+    def delete_all(self):
+        """Remove every generation"""
+        self.wait()
+        with self._work_lock:
+            shutil.rmtree(self.generations_dir, ignore_errors=True)
+            self._captured = {}
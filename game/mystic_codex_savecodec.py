@@ -0,0 +1,151 @@
+# THE MYSTIC FOREST ADVENTURE - BINARY SAVE FORMAT
+# A fixed-size header with the slot summary, followed by the compressed game state
+
+import json
+import struct
+import time
+import zlib
+from mystic_codex_persistence import atomic_write_text
+
+MAGIC = b"MFSV"
+FORMAT_VERSION = 2
+TEXT_FIELD_SIZE = 32
+
+# magic, version, flags, level, score, body length, save date, player name, location
+HEADER_STRUCT = struct.Struct(f"<4sHHqqI{TEXT_FIELD_SIZE}s{TEXT_FIELD_SIZE}s{TEXT_FIELD_SIZE}s")
+HEADER_SIZE = HEADER_STRUCT.size  # Enough bytes to read the header of any version
+
+# Version 1 stored level and score as 32-bit numbers
+HEADER_STRUCTS = {
+    1: struct.Struct(f"<4sHHiiI{TEXT_FIELD_SIZE}s{TEXT_FIELD_SIZE}s{TEXT_FIELD_SIZE}s"),
+    2: HEADER_STRUCT
+}
+
+BINARY_EXTENSION = ".sav"
+JSON_EXTENSION = ".json"
+
+
+class SaveFormatError(ValueError):
+    """Raised when bytes are not a save file this version can read"""
+
+
+def _pack_text(text):
+    """Encode text into a fixed-size field, cutting it on a character boundary"""
+    encoded = str(text).encode('utf-8')[:TEXT_FIELD_SIZE]
+    return encoded.decode('utf-8', errors='ignore').encode('utf-8')
+
+
+def _unpack_text(field):
+    """Decode a fixed-size text field"""
+    return field.rstrip(b"\0").decode('utf-8', errors='replace')
+
+
+def encode_save(state):
+    """Turn a game state dictionary into binary save bytes"""
+    body = zlib.compress(json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode('utf-8'))
+    header = HEADER_STRUCT.pack(
+        MAGIC, FORMAT_VERSION, 0,
+        int(state.get("level", 1)), int(state.get("score", 0)), len(body),
+        _pack_text(state.get("save_date", "Unknown")),
+        _pack_text(state.get("player_name", "Unknown")),
+        _pack_text(state.get("current_location", "Unknown")))
+    return header + body
+
+
+def decode_header(data):
+    """Read the summary fields from the first HEADER_SIZE bytes of a save"""
+    if len(data) < 8:
+        raise SaveFormatError("save file is shorter than its header")
+    magic, version = struct.unpack_from("<4sH", data)
+    if magic != MAGIC:
+        raise SaveFormatError("not a Mystic Forest save file")
+    if version > FORMAT_VERSION:
+        raise SaveFormatError(f"save format version {version} is newer than this game")
+    header_struct = HEADER_STRUCTS.get(version)
+    if header_struct is None:
+        raise SaveFormatError(f"unknown save format version {version}")
+    if len(data) < header_struct.size:
+        raise SaveFormatError("save file is shorter than its header")
+    _magic, _version, _flags, level, score, body_length, save_date, player_name, location = \
+        header_struct.unpack_from(data)
+    return {
+        "player_name": _unpack_text(player_name),
+        "level": level,
+        "score": score,
+        "current_location": _unpack_text(location),
+        "save_date": _unpack_text(save_date),
+        "body_length": body_length,
+        "header_size": header_struct.size
+    }
+
+
+def decode_save(data):
+    """Turn binary save bytes back into the full game state"""
+    header = decode_header(data)
+    body = data[header["header_size"]:header["header_size"] + header["body_length"]]
+    if len(body) != header["body_length"]:
+        raise SaveFormatError("save file is truncated")
+    try:
+        return json.loads(zlib.decompress(body).decode('utf-8'))
+    except (zlib.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise SaveFormatError(f"save body is damaged: {e}") from e
+
+
+def read_header_bytes(data):
+    """Decode just the header of in-memory save bytes (what slot listing does)"""
+    return decode_header(data[:HEADER_SIZE])
+
+
+# CONVERSION
+
+def convert_json_saves(saves_dir, pattern="save_*.json"):
+    """Rewrite every JSON save snapshot in saves_dir as a binary save
+
+    The binary file is written atomically and the JSON file is only removed
+    after that.
+    Returns the list of converted files.
+    """
+    converted = []
+    for json_file in sorted(saves_dir.glob(pattern)):
+        if json_file.suffix != JSON_EXTENSION:
+            continue
+        try:
+            with open(json_file, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"❌ Skipping {json_file.name}: {e}")
+            continue
+        binary_file = json_file.with_suffix(BINARY_EXTENSION)
+        atomic_write_text(binary_file, encode_save(state))
+        json_file.unlink()
+        converted.append(binary_file)
+    return converted
+
+
+# BENCHMARK
+
+def benchmark_codecs(state, rounds=200):
+    """Compare size, encode and decode time of the JSON and binary save formats"""
+    codecs = {
+        "json": (lambda data: json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8'),
+                 lambda raw: json.loads(raw.decode('utf-8'))),
+        "binary": (encode_save, decode_save),
+        "binary header": (encode_save, read_header_bytes)
+    }
+    results = {}
+    for name, (encode, decode) in codecs.items():
+        start = time.perf_counter()
+        for _ in range(rounds):
+            raw = encode(state)
+        encode_time = (time.perf_counter() - start) / rounds
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            decode(raw)
+        decode_time = (time.perf_counter() - start) / rounds
+        results[name] = {"size": len(raw), "encode_ms": encode_time * 1000, "decode_ms": decode_time * 1000}
+
+    print(f"\n{'Format':<14} {'Bytes':<10} {'Encode ms':<12} {'Decode ms':<12}")
+    for name, result in results.items():
+        print(f"{name:<14} {result['size']:<10} {result['encode_ms']:<12.4f} {result['decode_ms']:<12.4f}")
+    return results
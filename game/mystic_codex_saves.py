@@ -0,0 +1,177 @@
+# THE MYSTIC FOREST ADVENTURE - SAVE SLOT STORAGE
+# A small manifest of slot summaries so listing saves doesn't parse every save file
+
+import json
+import os
+import threading
+
+
+def _read_json(filepath, default_data=None):
+    """Default loader used when no load function is supplied"""
+    try:
+        with open(filepath, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return default_data
+
+
+def _write_json(filepath, data):
+    """Default writer used when no save function is supplied"""
+    with open(filepath, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2, ensure_ascii=False)
+    return True
+
+
+def slot_number_from_name(filename):
+    """Get the slot number from a file name like save_3.json or save_3.sav (None if it isn't one)"""
+    stem, _, extension = filename.partition(".")
+    prefix, _, number = stem.partition("_")
+    if prefix != "save" or extension not in ("json", "sav"):
+        return None
+    try:
+        return int(number)
+    except ValueError:
+        return None
+
+
+def summarize_save(filename, save_data):
+    """Build the slot summary shown in the save/load menus"""
+    return {
+        "filename": filename,
+        "player_name": save_data.get("player_name", "Unknown"),
+        "save_date": save_data.get("save_date", "Unknown"),
+        "location": save_data.get("current_location", "Unknown"),
+        "level": save_data.get("level", 1),
+        "score": save_data.get("score", 0)
+    }
+
+
+class SaveSlotManifest:
+    """Class to keep a summary of every save slot in one small index file
+
+    save_game and delete_save update the manifest directly. When listing, the
+    saves directory is scanned with os.scandir (no file is opened) and only the
+    files whose size or modification time no longer match the manifest are
+    parsed again, so edits made outside the game heal themselves.
+
+    write_state_function(path) tells whether a save is still queued
+    ("pending") or its write failed ("failed"); saves whose write failed
+    never show up as slots.
+    """
+
+    def __init__(self, saves_dir, manifest_file, load_function=None, save_function=None,
+                 write_state_function=None):
+        self.saves_dir = saves_dir
+        self.manifest_file = manifest_file
+        self.load_function = load_function or _read_json
+        self.save_function = save_function or _write_json
+        self.write_state_function = write_state_function or (lambda filepath: None)
+        self._entries = None  # {slot_number: summary with "mtime_ns" and "size"}
+        self._lock = threading.RLock()  # Saves to different slots may run on different threads
+
+    def _load(self):
+        """Read the manifest file into memory the first time it is needed"""
+        if self._entries is None:
+            data = _read_json(self.manifest_file, {}) if self.manifest_file.exists() else {}
+            slots = data.get("slots", {}) if isinstance(data, dict) else {}
+            self._entries = {int(slot): entry for slot, entry in slots.items()}
+        return self._entries
+
+    def _write(self):
+        """Persist the manifest"""
+        slots = {str(slot): entry for slot, entry in sorted(self._entries.items())}
+        self.save_function(self.manifest_file, {"version": 1, "slots": slots})
+
+    @staticmethod
+    def _stat_fields(stat_result):
+        """Pick the fields used to notice that a save file changed"""
+        return {"mtime_ns": stat_result.st_mtime_ns, "size": stat_result.st_size}
+
+    # UPDATES FROM save_game / delete_save
+
+    def record(self, slot_number, save_file, save_data):
+        """Record a slot that was just saved, without reading it back
+
+        The file may still be queued for writing, so its size and mtime are
+        filled in by the next refresh that finds it on disk.
+        """
+        with self._lock:
+            entries = self._load()
+            entry = summarize_save(save_file.name, save_data)
+            entry.update({"mtime_ns": None, "size": None})
+            entries[slot_number] = entry
+            self._write()
+
+    def forget(self, slot_number):
+        """Remove a deleted slot from the manifest"""
+        with self._lock:
+            entries = self._load()
+            if entries.pop(slot_number, None) is not None:
+                self._write()
+
+    def reset(self):
+        """Drop the in-memory copy (used after the data files are deleted)"""
+        with self._lock:
+            self._entries = None
+
+    # LISTING
+
+    def refresh(self):
+        """Bring the manifest in line with the directory, parsing only changed files"""
+        with self._lock:
+            entries = self._load()
+            seen = set()
+            changed = False
+
+            for slot_number, entry in list(entries.items()):
+                if entry.get("mtime_ns") is None:
+                    state = self.write_state_function(self.saves_dir / entry["filename"])
+                    if state == "failed":
+                        del entries[slot_number]  # Never reached the disk - an older file is parsed instead
+                        changed = True
+                    elif state == "pending":
+                        seen.add(slot_number)
+
+            with os.scandir(self.saves_dir) as directory:
+                for dir_entry in directory:
+                    slot_number = slot_number_from_name(dir_entry.name)
+                    if slot_number is None or not dir_entry.is_file():
+                        continue
+                    if slot_number in seen:
+                        continue  # Its newest save is still queued - the file on disk is older
+                    seen.add(slot_number)
+
+                    stat_fields = self._stat_fields(dir_entry.stat())
+                    known = entries.get(slot_number)
+                    if known and all(known.get(key) == value for key, value in stat_fields.items()):
+                        continue
+                    if known and known.get("mtime_ns") is None and known.get("filename") == dir_entry.name:
+                        known.update(stat_fields)  # We wrote this file ourselves - no need to parse it
+                        changed = True
+                        continue
+
+                    save_data = self.load_function(self.saves_dir / dir_entry.name)
+                    if save_data:
+                        entry = summarize_save(dir_entry.name, save_data)
+                        entry.update(stat_fields)
+                        entries[slot_number] = entry
+                    else:
+                        entries.pop(slot_number, None)
+                    changed = True
+
+            for slot_number in list(entries):
+                # Queued saves were counted as seen, so this also drops saves that never got written
+                if slot_number not in seen:
+                    del entries[slot_number]
+                    changed = True
+
+            if changed:
+                self._write()
+            return entries
+
+    def list_slots(self):
+        """Get {slot_number: summary} for every save slot"""
+        with self._lock:
+            entries = self.refresh()
+            return {slot: {key: value for key, value in entry.items() if key not in ("mtime_ns", "size")}
+                    for slot, entry in sorted(entries.items())}
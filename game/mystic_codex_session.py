@@ -0,0 +1,108 @@
+# THE MYSTIC FOREST ADVENTURE - GAME DATA SESSION
+# A unit of work that collects everything a game changes and writes it all at the end
+
+import datetime
+from mystic_codex_history import format_event
+
+
+class GameDataSession:
+    """Class to batch the persistence of one game into a single commit
+
+    The methods mirror the module-level functions in the file handling game
+    (create_player_profile, save_game, update_player_profile, add_highscore,
+    log_game_event) but only remember the change. commit() then writes each
+    store once: one SQLite transaction for the profiles, one log append and
+    at most one snapshot write for the leaderboard, one write per save slot
+    and one append to the history file.
+
+    Used as a context manager the session commits when the block finishes and
+    throws the changes away if it raised.
+    """
+
+    def __init__(self, profile_store, leaderboard, save_game_function, history_log):
+        self.profile_store = profile_store
+        self.leaderboard = leaderboard
+        self.save_game_function = save_game_function
+        self.history_log = history_log
+        self._clear()
+
+    def _clear(self):
+        """Forget every collected change"""
+        self._new_players = []
+        self._games = []
+        self._saves = {}      # slot_number -> game state (the latest one wins)
+        self._scores = []
+        self._events = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    # COLLECTING CHANGES
+
+    def create_player_profile(self, player_name):
+        """Make sure a profile exists for player_name when the session commits"""
+        if player_name not in self._new_players:
+            self._new_players.append(player_name)
+
+    def update_player_profile(self, player_name, game_stats):
+        """Add a finished game to the player's totals"""
+        self._games.append((player_name,
+                            game_stats.get("score", 0),
+                            list(game_stats.get("achievements", []))))
+
+    def save_game(self, game_state, slot_number):
+        """Save the game state to a slot (only the last save per slot is written)"""
+        self._saves[slot_number] = game_state.copy()
+
+    def add_highscore(self, player_name, score, difficulty, date=None):
+        """Record a score for the leaderboard"""
+        if date is None:
+            date = datetime.datetime.now().isoformat()
+        self._scores.append({
+            "player": player_name,
+            "score": score,
+            "difficulty": difficulty,
+            "date": date
+        })
+
+    def log_game_event(self, event_text):
+        """Add a line to the game history"""
+        self._events.append(format_event(event_text))
+
+    # COMMIT / ROLLBACK
+
+    def has_changes(self):
+        """Check whether anything is waiting to be committed"""
+        return bool(self._new_players or self._games or self._saves or self._scores or self._events)
+
+    def commit(self):
+        """Write every collected change, each store touched once"""
+        if self._new_players or self._games:
+            created = self.profile_store.apply_changes(self._new_players, self._games)
+            for player_name in created:
+                print(f"👤 Created new profile for {player_name}")
+
+        for slot_number, game_state in sorted(self._saves.items()):
+            self.save_game_function(game_state, slot_number)
+
+        for score, placed in zip(self._scores, self.leaderboard.add_many(self._scores)):
+            if placed:
+                print(f"🏆 Added high score: {score['score']} points")
+            else:
+                print(f"📝 Recorded score: {score['score']} points")
+
+        if self._events:
+            self.history_log.append_lines(self._events)
+
+        self._clear()
+
+    def rollback(self):
+        """Throw away every collected change"""
+        self._clear()
@@ -0,0 +1,245 @@
+# THE MYSTIC FOREST ADVENTURE - SHARED LEADERBOARD SNAPSHOT
+# The top scores in a fixed binary layout in a memory-mapped file, read by any process without parsing or locks
+
+import json
+import mmap
+import multiprocessing
+import os
+import random
+import shutil
+import struct
+import tempfile
+import time
+from pathlib import Path
+from mystic_codex_leaderboard import Leaderboard
+
+MAGIC = b"MFLB"
+LAYOUT_VERSION = 1
+TEXT_FIELDS = (64, 16, 32)  # Bytes for the player name, difficulty and date
+
+# magic, layout version, capacity, sequence number, entry count
+HEADER_STRUCT = struct.Struct("<4sHHQI4x")
+SEQUENCE_OFFSET = 8  # Where the sequence number sits in the header
+SEQUENCE_STRUCT = struct.Struct("<Q")
+# score, player, difficulty, date
+ENTRY_STRUCT = struct.Struct(f"<q{TEXT_FIELDS[0]}s{TEXT_FIELDS[1]}s{TEXT_FIELDS[2]}s")
+
+
+def _pack_text(text, size):
+    """Encode text into a fixed-size field, cutting it on a character boundary"""
+    encoded = str(text).encode('utf-8')[:size]
+    return encoded.decode('utf-8', errors='ignore').encode('utf-8')
+
+
+def _unpack_text(field):
+    """Decode a fixed-size text field"""
+    return field.rstrip(b"\0").decode('utf-8', errors='replace')
+
+
+def snapshot_size(capacity):
+    """Get the file size that holds a snapshot of capacity entries"""
+    return HEADER_STRUCT.size + capacity * ENTRY_STRUCT.size
+
+
+class SharedLeaderboardSnapshot:
+    """Class for the top of the leaderboard in a memory-mapped file
+
+    The file has a fixed layout: a header with a sequence number and the
+    entry count, then capacity fixed-size entries (score, player, difficulty,
+    date). Every game process maps the same file, so a published board is
+    visible to all of them at once, and reading it is a memory copy plus
+    struct unpacking - no JSON and no file lock.
+
+    Writes are a seqlock: the writer makes the sequence number odd, rewrites
+    the entries, then makes it even again. A reader copies the entries
+    between two reads of the sequence number and tries again if it was odd
+    or changed, so it never returns a half-written board. There must only be
+    one writer at a time; the leaderboard publishes while holding its file
+    lock. The file is rewritten in place and never replaced, because the
+    readers keep it mapped.
+
+    Names longer than the fixed fields are cut short in the snapshot (the
+    score log keeps them whole).
+    """
+
+    def __init__(self, snapshot_file, capacity=10, max_retries=1000):
+        self.snapshot_file = Path(snapshot_file)
+        self.capacity = capacity
+        self.max_retries = max_retries
+        self.retries = 0  # Reads that had to be repeated because a write was in progress
+        self._map = None
+        self._writable = False
+
+    # MAPPING
+
+    def _open_map(self, writable):
+        """Map the file (creating and sizing it when writing); None if there is nothing to read"""
+        if self._map is not None and (self._writable or not writable):
+            return self._map
+        self.close()
+        if writable:
+            fd = os.open(self.snapshot_file, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size < snapshot_size(self.capacity):
+                    os.ftruncate(fd, snapshot_size(self.capacity))
+                self._map = mmap.mmap(fd, 0)
+            finally:
+                os.close(fd)  # The mapping keeps its own reference
+        else:
+            try:
+                fd = os.open(self.snapshot_file, os.O_RDONLY)
+            except FileNotFoundError:
+                return None
+            try:
+                if os.fstat(fd).st_size < HEADER_STRUCT.size:
+                    return None
+                self._map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+        self._writable = writable
+        return self._map
+
+    def close(self):
+        """Unmap the file"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    # WRITING
+
+    def publish(self, entries):
+        """Write the board (best first); the caller must be the only writer"""
+        snapshot = self._open_map(writable=True)
+        magic, _, _, sequence, _ = HEADER_STRUCT.unpack_from(snapshot)
+        if magic != MAGIC:
+            sequence = 0
+        if sequence % 2 == 0:
+            sequence += 1  # Odd: a write is in progress (a crashed writer may have left it odd already)
+        entries = entries[:self.capacity]
+        HEADER_STRUCT.pack_into(snapshot, 0, MAGIC, LAYOUT_VERSION, self.capacity, sequence, len(entries))
+        for position, entry in enumerate(entries):
+            ENTRY_STRUCT.pack_into(snapshot, HEADER_STRUCT.size + position * ENTRY_STRUCT.size,
+                                   int(entry["score"]),
+                                   _pack_text(entry.get("player", ""), TEXT_FIELDS[0]),
+                                   _pack_text(entry.get("difficulty", ""), TEXT_FIELDS[1]),
+                                   _pack_text(entry.get("date", ""), TEXT_FIELDS[2]))
+        SEQUENCE_STRUCT.pack_into(snapshot, SEQUENCE_OFFSET, sequence + 1)  # Even: done
+
+    # READING
+
+    def read(self):
+        """Get the published board, best first (None if nothing was published or it kept changing)"""
+        snapshot = self._open_map(writable=False)
+        if snapshot is None:
+            return None
+        for attempt in range(self.max_retries):
+            magic, version, capacity, sequence, count = HEADER_STRUCT.unpack_from(snapshot)
+            if magic != MAGIC or version != LAYOUT_VERSION:
+                return None
+            if len(snapshot) < snapshot_size(capacity):
+                # The writer grew the file for a bigger board - map it again
+                self.close()
+                snapshot = self._open_map(writable=False)
+                continue
+            if sequence % 2 == 0:
+                data = snapshot[HEADER_STRUCT.size:HEADER_STRUCT.size + min(count, capacity) * ENTRY_STRUCT.size]
+                if SEQUENCE_STRUCT.unpack_from(snapshot, SEQUENCE_OFFSET)[0] == sequence:
+                    return [{"player": _unpack_text(player), "score": score,
+                             "difficulty": _unpack_text(difficulty), "date": _unpack_text(date)}
+                            for score, player, difficulty, date in ENTRY_STRUCT.iter_unpack(data)]
+            self.retries += 1
+            if attempt % 100 == 99:
+                time.sleep(0)  # Let a writer that was descheduled mid-write finish
+        return None
+
+
+# BENCHMARK
+
+def _read_json_board(highscores_file, reads):
+    """Read the board the old way - open and parse highscores.json - reads times"""
+    torn = 0
+    start = time.process_time()  # CPU time, so readers sharing cores don't count each other's turns
+    for _ in range(reads):
+        try:
+            with open(highscores_file, 'r', encoding='utf-8') as file:
+                scores = json.load(file)["scores"]
+        except (OSError, json.JSONDecodeError, KeyError):
+            torn += 1
+            continue
+        torn += any(a["score"] < b["score"] for a, b in zip(scores, scores[1:]))
+    return time.process_time() - start, 0, torn
+
+
+def _read_snapshot_board(snapshot_file, reads):
+    """Read the board from the shared snapshot reads times"""
+    snapshot = SharedLeaderboardSnapshot(snapshot_file)
+    torn = 0
+    start = time.process_time()  # CPU time, so readers sharing cores don't count each other's turns
+    for _ in range(reads):
+        scores = snapshot.read()
+        if scores is None:
+            torn += 1
+            continue
+        torn += any(a["score"] < b["score"] for a, b in zip(scores, scores[1:]))
+    elapsed = time.process_time() - start
+    snapshot.close()
+    return elapsed, snapshot.retries, torn
+
+
+def _keep_adding_scores(data_dir, stop_event):
+    """Record a new best score over and over until told to stop (the writer process)"""
+    data_dir = Path(data_dir)
+    leaderboard = Leaderboard(data_dir / "score_log.jsonl", data_dir / "highscores.json",
+                              shared_snapshot=SharedLeaderboardSnapshot(data_dir / "highscores.mmap"))
+    score = 1000
+    while not stop_event.is_set():
+        score += 1
+        leaderboard.add({"player": f"Writer{score % 7}", "score": score,
+                         "difficulty": random.choice(["easy", "normal", "hard"]),
+                         "date": "2025-01-01T00:00:00"})
+
+
+def benchmark_shared_leaderboard(readers=32, reads=2000):
+    """Compare reading the top 10 from highscores.json with the shared snapshot
+
+    readers processes each read the board reads times while another process
+    keeps adding new best scores (so every read races a write). Reports the
+    CPU time per read and how many reads were torn (unreadable or out of order)
+    - that should be zero for both.
+    """
+    work_dir = Path(tempfile.mkdtemp(prefix="mystic_board_"))
+    seed = Leaderboard(work_dir / "score_log.jsonl", work_dir / "highscores.json",
+                       shared_snapshot=SharedLeaderboardSnapshot(work_dir / "highscores.mmap"))
+    seed.add_many([{"player": f"Seed{number}", "score": number * 10, "difficulty": "normal",
+                    "date": "2025-01-01T00:00:00"} for number in range(10)])
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    try:
+        for mode, reader, path in (("json", _read_json_board, work_dir / "highscores.json"),
+                                   ("snapshot", _read_snapshot_board, work_dir / "highscores.mmap")):
+            stop_event = context.Event()
+            writer = context.Process(target=_keep_adding_scores, args=(str(work_dir), stop_event))
+            writer.start()
+            try:
+                with context.Pool(readers) as pool:
+                    outcomes = pool.starmap(reader, [(str(path), reads)] * readers)
+            finally:
+                stop_event.set()
+                writer.join()
+            seconds = sum(outcome[0] for outcome in outcomes)
+            results[mode] = {"cpu_us_per_read": seconds / (readers * reads) * 1e6,
+                             "retries": sum(outcome[1] for outcome in outcomes),
+                             "torn": sum(outcome[2] for outcome in outcomes)}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n{readers} reader processes x {reads:,} reads of the top 10, one writer")
+    print(f"{'Path':<10} {'CPU µs/read':<12} {'Retries':<10} {'Torn':<6}")
+    for mode, result in results.items():
+        print(f"{mode:<10} {result['cpu_us_per_read']:<12.1f} {result['retries']:<10,} {result['torn']:<6}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_shared_leaderboard()
@@ -0,0 +1,403 @@
+# THE MYSTIC FOREST ADVENTURE - SQLITE STORAGE
+# Every store in one SQLite database, so the whole game data directory is a single file
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from mystic_codex_config import ConfigCache
+from mystic_codex_history import TIMESTAMP_FORMAT, format_event
+from mystic_codex_history_index import HistoryQueries, matches_event, parse_event
+from mystic_codex_persistence import IO_STATS
+from mystic_codex_profile_tiers import TieredProfileStore
+from mystic_codex_storage import CONFIG_KEY, StorageBackend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    difficulty TEXT,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC, id);
+CREATE TABLE IF NOT EXISTS saves (
+    slot INTEGER PRIMARY KEY,
+    state TEXT NOT NULL,
+    player_name TEXT,
+    save_date TEXT,
+    location TEXT,
+    level INTEGER,
+    score INTEGER
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    logged_at TEXT,
+    player TEXT,
+    line TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_by_time ON history (logged_at);
+CREATE INDEX IF NOT EXISTS history_by_player ON history (player, logged_at);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+"""
+
+
+class SqliteStore:
+    """Base class for a store that keeps its own connection to the shared database
+
+    Like the profile store, the database runs in WAL mode and a writer that
+    finds it busy waits up to busy_timeout seconds, so several game processes
+    can use the same file.
+    """
+
+    def __init__(self, db_file, busy_timeout=30.0):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_file), timeout=busy_timeout, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def _record_io(self, changes_before):
+        """Count a committed transaction in IO_STATS (one page per changed row)"""
+        changed_rows = self._conn.total_changes - changes_before
+        if changed_rows:
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+            IO_STATS.record(self.db_file, changed_rows * page_size)
+
+    def _write(self, statements):
+        """Run (sql, parameters) pairs in one transaction; return the last cursor"""
+        with self._lock:
+            changes_before = self._conn.total_changes
+            cursor = None
+            with self._conn:
+                for sql, parameters in statements:
+                    cursor = self._conn.execute(sql, parameters)
+            self._record_io(changes_before)
+            return cursor
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+class SqliteLeaderboard(SqliteStore):
+    """Class to keep every score as a row, with an index that reads the board in score order
+
+    Nothing is cached, so processes sharing the database always see each
+    other's scores, and the top entries are one indexed range scan.
+    """
+
+    def __init__(self, db_file, size=10, busy_timeout=30.0):
+        super().__init__(db_file, busy_timeout)
+        self.size = size
+
+    @staticmethod
+    def _row_to_entry(row):
+        return {"player": row["player"], "score": row["score"],
+                "difficulty": row["difficulty"], "date": row["date"]}
+
+    def add(self, entry):
+        """Record a score and return True if it made it onto the board"""
+        return self.add_many([entry])[0]
+
+    def add_many(self, entries):
+        """Record several scores in one transaction; returns which of them placed"""
+        if not entries:
+            return []
+        with self._lock:
+            changes_before = self._conn.total_changes
+            with self._conn:
+                board = [row[0] for row in self._conn.execute(
+                    "SELECT score FROM scores ORDER BY score DESC, id LIMIT ?", (self.size,))]
+                placed = []
+                for entry in entries:
+                    self._conn.execute(
+                        "INSERT INTO scores (player, score, difficulty, date) VALUES (?, ?, ?, ?)",
+                        (entry["player"], entry["score"], entry.get("difficulty"), entry.get("date")))
+                    # Ties keep the older entry
+                    places = len(board) < self.size or entry["score"] > board[-1]
+                    if places:
+                        board = sorted(board + [entry["score"]], reverse=True)[:self.size]
+                    placed.append(places)
+            self._record_io(changes_before)
+        return placed
+
+    def scores_since(self, last_id=0):
+        """Get the scores stored after row last_id; return (entries, new last id)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, player, score, difficulty, date FROM scores WHERE id > ? ORDER BY id",
+                (last_id,)).fetchall()
+        return [self._row_to_entry(row) for row in rows], rows[-1]["id"] if rows else last_id
+
+    def would_place(self, score):
+        """Check whether a score is high enough to enter the board"""
+        board = self.top()
+        return len(board) < self.size or score > board[-1]["score"]
+
+    def top(self, count=None):
+        """Return the best entries, highest score first"""
+        count = self.size if count is None else count
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT player, score, difficulty, date FROM scores ORDER BY score DESC, id LIMIT ?",
+                (count,)).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    def reset(self):
+        """Nothing is cached apart from the rows themselves"""
+
+    def delete_all(self):
+        """Remove every recorded score"""
+        self._write([("DELETE FROM scores", ())])
+
+
+class SqliteSaveStore(SqliteStore):
+    """Class to keep each save slot as a row
+
+    The slot summary shown in the menus is stored in its own columns, so
+    listing the slots never parses a saved game.
+    """
+
+    def __init__(self, db_file, snapshot_format="json", busy_timeout=30.0):
+        super().__init__(db_file, busy_timeout)
+        self.snapshot_format = snapshot_format  # Kept for the interface; rows have no file format
+
+    def save(self, slot_number, save_data):
+        """Save a slot"""
+        try:
+            text = json.dumps(save_data, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            print(f"❌ Error saving slot {slot_number}: {e}")
+            return False
+        self._write([(
+            """INSERT OR REPLACE INTO saves (slot, state, player_name, save_date, location, level, score)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (slot_number, text, save_data.get("player_name", "Unknown"), save_data.get("save_date", "Unknown"),
+             save_data.get("current_location", "Unknown"), save_data.get("level", 1), save_data.get("score", 0)))])
+        return True
+
+    def has_save(self, slot_number):
+        """Check whether a slot holds a save"""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM saves WHERE slot = ?", (slot_number,)).fetchone() is not None
+
+    def load(self, slot_number):
+        """Load a slot's game state (None if it is empty)"""
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM saves WHERE slot = ?", (slot_number,)).fetchone()
+        return json.loads(row["state"]) if row else None
+
+    def delete(self, slot_number):
+        """Delete a slot; return True if there was a save in it"""
+        return self._write([("DELETE FROM saves WHERE slot = ?", (slot_number,))]).rowcount == 1
+
+    def list_slots(self):
+        """Get {slot_number: summary} for every save slot"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT slot, player_name, save_date, location, level, score FROM saves ORDER BY slot").fetchall()
+        return {row["slot"]: {"filename": f"save_{row['slot']}", "player_name": row["player_name"],
+                              "save_date": row["save_date"], "location": row["location"],
+                              "level": row["level"], "score": row["score"]}
+                for row in rows}
+
+    def convert_to_binary(self):
+        """Nothing to convert - saves in the database have no file format"""
+        return []
+
+    def delete_all(self):
+        """Remove every save"""
+        self._write([("DELETE FROM saves", ())])
+
+
+class SqliteHistoryLog(SqliteStore):
+    """Class to keep each history line as a row with its timestamp and player pulled out"""
+
+    def append(self, text):
+        """Log one event with the current timestamp"""
+        return self.append_lines([format_event(text)])
+
+    def append_lines(self, lines):
+        """Append ready-made history lines in one transaction"""
+        if not lines:
+            return True
+        rows = []
+        for line in lines:
+            when, _, player = parse_event(line)
+            rows.append((when.strftime(TIMESTAMP_FORMAT) if when else None, player, line))
+        try:
+            with self._lock:
+                changes_before = self._conn.total_changes
+                with self._conn:
+                    self._conn.executemany("INSERT INTO history (logged_at, player, line) VALUES (?, ?, ?)", rows)
+                self._record_io(changes_before)
+            return True
+        except sqlite3.Error as e:
+            print(f"❌ Error writing to the game history: {e}")
+            return False
+
+    def flush(self):
+        """Every append is already committed"""
+
+    def close(self):
+        """Keep the connection - the history index shares this store's rows"""
+
+    def tail(self, count=20):
+        """Get the last count lines, newest last"""
+        with self._lock:
+            rows = self._conn.execute("SELECT line FROM history ORDER BY id DESC LIMIT ?", (count,)).fetchall()
+        return [row["line"] for row in reversed(rows)]
+
+    def iter_lines(self, batch_size=1000):
+        """Yield every line of the history, oldest first, batch_size rows at a time"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute("SELECT id, line FROM history WHERE id > ? ORDER BY id LIMIT ?",
+                                          (last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1]["id"]
+            for row in rows:
+                yield row["line"]
+
+    def lines_where(self, conditions, parameters):
+        """Get the lines of the rows matching SQL conditions, oldest first"""
+        where = " AND ".join(conditions) or "1"
+        with self._lock:
+            rows = self._conn.execute(f"SELECT line FROM history WHERE {where} ORDER BY id", parameters).fetchall()
+        return [row["line"] for row in rows]
+
+    def players(self):
+        """Get every player name that appears in the history"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT player FROM history WHERE player IS NOT NULL ORDER BY player").fetchall()
+        return [row["player"] for row in rows]
+
+    def delete_all(self):
+        """Remove every line"""
+        self._write([("DELETE FROM history", ())])
+
+
+class SqliteHistoryIndex(HistoryQueries):
+    """Class to answer history queries with the history table's time and player indexes"""
+
+    def __init__(self, history_log):
+        self.history_log = history_log
+
+    def events(self, player=None, start=None, end=None):
+        """Get history lines, optionally for one player and between start and end (datetimes)"""
+        conditions, parameters = ["logged_at IS NOT NULL"], []
+        if player is not None:
+            conditions.append("player = ?")
+            parameters.append(player)
+        if start is not None:
+            conditions.append("logged_at >= ?")
+            parameters.append(start.strftime(TIMESTAMP_FORMAT))
+        if end is not None:
+            conditions.append("logged_at <= ?")
+            parameters.append(end.strftime(TIMESTAMP_FORMAT))
+        # The column holds whole seconds; the exact bounds are checked on the lines
+        return [line for line in self.history_log.lines_where(conditions, parameters)
+                if matches_event(line, player, start, end)]
+
+    def players(self):
+        """Get every player name that appears in the history"""
+        return self.history_log.players()
+
+
+class SqliteSettings(SqliteStore):
+    """Class to keep JSON settings documents by key, with a version that changes on every save"""
+
+    def load(self, key, default_data=None):
+        """Get a stored document (default_data if there is none)"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM settings WHERE key = ?", (str(key),)).fetchone()
+        if row is None:
+            return default_data
+        try:
+            return json.loads(row["value"])
+        except json.JSONDecodeError:
+            return default_data
+
+    def save(self, key, data):
+        """Store a document"""
+        self._write([(
+            """INSERT INTO settings (key, value) VALUES (?, ?)
+               ON CONFLICT(key) DO UPDATE SET value = excluded.value, version = version + 1""",
+            (str(key), json.dumps(data, ensure_ascii=False)))])
+        return True
+
+    def version(self, key):
+        """Get the version of a stored document (None if there is none)"""
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM settings WHERE key = ?", (str(key),)).fetchone()
+        return row["version"] if row else None
+
+    def delete_all(self):
+        """Remove every document"""
+        self._write([("DELETE FROM settings", ())])
+
+
+class SqliteStorageBackend(StorageBackend):
+    """Class for game data kept in data_dir/game_data.db
+
+    Profiles use the existing ProfileStore tables; scores, saves, history and
+    settings get their own tables in the same file. Every write is a
+    committed transaction, so there is no write-behind queue to flush.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, data_dir, busy_timeout=30.0):
+        super().__init__()
+        self.data_dir = Path(data_dir)
+        self.db_file = self.data_dir / "game_data.db"
+        self.profiles_json_file = self.data_dir / "player_profiles.json"
+        self.busy_timeout = busy_timeout
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+    def _settings(self):
+        return self._store("settings", lambda: SqliteSettings(self.db_file, self.busy_timeout))
+
+    def _open_config_cache(self, defaults):
+        settings = self._settings()
+        return ConfigCache(CONFIG_KEY, defaults,
+                           load_function=settings.load,
+                           save_function=settings.save,
+                           signature_function=lambda: settings.version(CONFIG_KEY))
+
+    def _open_profile_store(self):
+        profile_store = TieredProfileStore(self.db_file, self.busy_timeout)
+        profile_store.import_json_once(self.profiles_json_file)
+        profile_store.archive_if_due()
+        return profile_store
+
+    def _open_leaderboard(self, size):
+        return SqliteLeaderboard(self.db_file, size, self.busy_timeout)
+
+    def _open_save_store(self, snapshot_format):
+        return SqliteSaveStore(self.db_file, snapshot_format, self.busy_timeout)
+
+    def _open_history_log(self):
+        return SqliteHistoryLog(self.db_file, self.busy_timeout)
+
+    def _open_history_index(self, history_log):
+        return SqliteHistoryIndex(history_log)
+
+    def delete_all(self):
+        """Empty every table (the database file itself stays)"""
+        with self._lock:
+            self.profile_store().delete_all()
+            for store in (self.leaderboard(), self.save_store(), self.history_log(), self._settings()):
+                store.delete_all()
+            self._reset_cached_stores()
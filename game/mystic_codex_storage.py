@@ -0,0 +1,386 @@
+# THE MYSTIC FOREST ADVENTURE - STORAGE BACKENDS
+# One interface for where profiles, scores, saves, settings and history are kept
+
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from mystic_codex_config import ConfigCache
+from mystic_codex_history import HistoryLog
+from mystic_codex_history_index import HistoryIndex
+from mystic_codex_journal import JournaledSaveStore
+from mystic_codex_leaderboard import Leaderboard
+from mystic_codex_profile_tiers import TieredProfileStore
+from mystic_codex_rankings import ScoreIndex
+from mystic_codex_retention import SaveRetention
+from mystic_codex_saves import SaveSlotManifest
+from mystic_codex_savecodec import convert_json_saves
+from mystic_codex_shared_leaderboard import SharedLeaderboardSnapshot
+
+BACKEND_ENV_VAR = "MYSTIC_STORAGE_BACKEND"  # "file", "memory" or "sqlite"
+DATA_DIR_ENV_VAR = "MYSTIC_GAME_DATA_DIR"
+DEFAULT_BACKEND = "file"
+CONFIG_KEY = Path("config.json")  # Name the configuration is stored under
+
+
+def data_dir_from_environment(default="game_data"):
+    """Get the game data directory (MYSTIC_GAME_DATA_DIR, or game_data in the current directory)"""
+    return Path(os.environ.get(DATA_DIR_ENV_VAR) or default)
+
+
+def backend_name_from_settings(data_dir):
+    """Pick the storage backend by name
+
+    MYSTIC_STORAGE_BACKEND wins; otherwise the "storage_backend" setting in
+    data_dir/config.json is used, and "file" if neither is set. config.json
+    is read directly because the backend that would load it isn't chosen yet.
+    """
+    name = os.environ.get(BACKEND_ENV_VAR)
+    if not name:
+        try:
+            with open(Path(data_dir) / CONFIG_KEY, 'r', encoding='utf-8') as file:
+                name = json.load(file).get("storage_backend")
+        except (OSError, json.JSONDecodeError, AttributeError):
+            name = None
+    return (name or DEFAULT_BACKEND).strip().lower()
+
+
+class StorageBackend(ABC):
+    """Base class for the place all game data lives
+
+    A backend hands out the stores the game functions work with. Each one is
+    created on first use and shared afterwards:
+
+    - config_cache(defaults): get, get_setting, save, update, reset and the
+      subscribe/start_watching live reload (a ConfigCache)
+    - profile_store(): get, create, record_game, apply_changes, put_many,
+      count, iter_profiles, all_profiles, export_json, close, plus the
+      tiering calls archive_inactive, count_active and count_archived
+    - leaderboard(size): add, add_many, top, would_place, scores_since, reset
+    - leaderboard_snapshot(): read() the top scores that any process
+      published, without parsing or locking, or None if the backend has no
+      shared snapshot
+    - score_index(): top/page/rank_of/percentile/best_rank queries by
+      difficulty and rolling period, fed from the leaderboard (a ScoreIndex)
+    - save_store(snapshot_format): save, load, has_save, delete, list_slots,
+      convert_to_binary, delete_all
+    - save_retention(): rotating generations of each save slot for rollback
+      (schedule, run, list_generations, load_generation), or None if the
+      backend doesn't keep them
+    - history_log() and history_index(): append, append_lines, tail,
+      iter_lines, flush, close / events, games_completed, players
+
+    Every backend returns the same dictionaries, so the game can't tell them
+    apart; they only differ in where (and whether) the data is written.
+    """
+
+    name = None
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._stores = {}
+
+    def _store(self, key, factory):
+        """Get a shared store, creating it with factory() the first time"""
+        with self._lock:
+            if key not in self._stores:
+                self._stores[key] = factory()
+            return self._stores[key]
+
+    # SHARED STORES
+
+    def config_cache(self, defaults):
+        """Get the configuration cache"""
+        return self._store("config", lambda: self._open_config_cache(defaults))
+
+    def profile_store(self):
+        """Get the player profile store"""
+        return self._store("profiles", self._open_profile_store)
+
+    def leaderboard(self, size=10):
+        """Get the high score leaderboard"""
+        return self._store("leaderboard", lambda: self._open_leaderboard(size))
+
+    def leaderboard_snapshot(self):
+        """Get the lock-free reader of the published top scores (None if this backend has none)"""
+        return self._store("leaderboard_snapshot", self._open_leaderboard_snapshot)
+
+    def score_index(self):
+        """Get the leaderboard queries (by difficulty, period, rank and percentile)"""
+        return self._store("score_index", lambda: ScoreIndex(self.leaderboard()))
+
+    def save_store(self, snapshot_format="json"):
+        """Get the save slot store"""
+        return self._store("saves", lambda: self._open_save_store(snapshot_format))
+
+    def save_retention(self):
+        """Get the save generation keeper (None if this backend doesn't keep old saves)"""
+        return self._store("retention", self._open_save_retention)
+
+    def history_log(self):
+        """Get the game history log"""
+        return self._store("history", self._open_history_log)
+
+    def history_index(self):
+        """Get the time/player queries over the game history"""
+        return self._store("history_index", lambda: self._open_history_index(self.history_log()))
+
+    # OPENING STORES (each backend provides these)
+
+    @abstractmethod
+    def _open_config_cache(self, defaults):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _open_profile_store(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _open_leaderboard(self, size):
+        raise NotImplementedError
+
+    def _open_leaderboard_snapshot(self):
+        return None
+
+    @abstractmethod
+    def _open_save_store(self, snapshot_format):
+        raise NotImplementedError
+
+    def _open_save_retention(self):
+        return None
+
+    @abstractmethod
+    def _open_history_log(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _open_history_index(self, history_log):
+        raise NotImplementedError
+
+    # LIFECYCLE
+
+    def flush(self):
+        """Push buffered history lines to storage and return {path: error} for failed file writes"""
+        history_log = self._stores.get("history")
+        if history_log is not None:
+            history_log.flush()
+        return {}
+
+    def close_profile_store(self):
+        """Close the profile store (it is opened again on next use)"""
+        with self._lock:
+            profile_store = self._stores.pop("profiles", None)
+            if profile_store is not None:
+                profile_store.close()
+
+    def close(self):
+        """Close open files and connections"""
+        with self._lock:
+            save_retention = self._stores.get("retention")
+            if save_retention is not None:
+                save_retention.wait()  # Finish capturing before the files go away
+            self.close_profile_store()
+            history_log = self._stores.get("history")
+            if history_log is not None:
+                history_log.close()
+
+    def reload(self):
+        """Make every store read its data again (after a backup was restored underneath it)"""
+        with self._lock:
+            self.close()
+            self._reset_cached_stores()
+
+    def _reset_cached_stores(self):
+        """Make the stores that cache what they read start over (after delete_all)"""
+        for key in ("config", "history_index", "score_index"):
+            if key in self._stores:
+                self._stores[key].reset()
+
+    @abstractmethod
+    def delete_all(self):
+        """Remove every profile, score, save, setting and history line"""
+        raise NotImplementedError
+
+
+class FileSaveStore:
+    """Class to keep save slots as files: a journaled snapshot per slot plus the slot manifest"""
+
+    def __init__(self, journal, manifest, flush_function=None):
+        self.journal = journal
+        self.manifest = manifest
+        self.flush_function = flush_function or (lambda: True)
+
+    @property
+    def snapshot_format(self):
+        return self.journal.snapshot_format
+
+    @snapshot_format.setter
+    def snapshot_format(self, snapshot_format):
+        self.journal.snapshot_format = snapshot_format
+
+    def save(self, slot_number, save_data):
+        """Save a slot (only what changed is written, unless the journal is due for compaction)"""
+        if not self.journal.save(slot_number, save_data):
+            return False
+        self.manifest.record(slot_number, self.journal.snapshot_path(slot_number), save_data)
+        return True
+
+    def has_save(self, slot_number):
+        """Check whether a slot holds a save"""
+        return self.journal.has_snapshot(slot_number)
+
+    def load(self, slot_number):
+        """Load a slot's game state (None if it is empty)"""
+        if not self.has_save(slot_number):
+            return None
+        return self.journal.load(slot_number)
+
+    def delete(self, slot_number):
+        """Delete a slot; return True if there was a save in it"""
+        self.flush_function()  # A queued write must not recreate the file afterwards
+        if self.journal.delete(slot_number):
+            self.manifest.forget(slot_number)
+            return True
+        return False
+
+    def list_slots(self):
+        """Get {slot_number: summary} for every save slot"""
+        return self.manifest.list_slots()
+
+    def convert_to_binary(self):
+        """Rewrite every JSON snapshot in the binary save format; return the converted files"""
+        self.flush_function()
+        converted = convert_json_saves(self.journal.saves_dir)
+        self.journal.reset()
+        return converted
+
+    def delete_all(self):
+        """Remove every save file and the manifest"""
+        self.flush_function()
+        for save_file in self.journal.saves_dir.glob("save_*.*"):
+            save_file.unlink()
+        self.journal.reset()
+        if self.manifest.manifest_file.exists():
+            self.manifest.manifest_file.unlink()
+        self.manifest.reset()
+
+
+class FileStorageBackend(StorageBackend):
+    """Class for the game data directory on disk (the game's original layout)
+
+    Settings, high scores and saves are JSON files written through the
+    functions the game passes in (so they go through its write-behind worker),
+    profiles are a SQLite file and the history is a rotating text log. The
+    directories are created when the backend is made, not when the game
+    module is imported.
+    """
+
+    name = "file"
+
+    def __init__(self, data_dir, load_function=None, save_function=None, flush_function=None,
+                 read_bytes_function=None, save_bytes_function=None, write_state_function=None,
+                 quiet_load_function=None):
+        super().__init__()
+        self.data_dir = Path(data_dir)
+        self.saves_dir = self.data_dir / "saves"
+        self.save_manifest_file = self.saves_dir / "manifest.json"
+        self.config_file = self.data_dir / "config.json"
+        self.highscores_file = self.data_dir / "highscores.json"
+        self.score_log_file = self.data_dir / "score_log.jsonl"
+        self.leaderboard_snapshot_file = self.data_dir / "highscores.mmap"
+        self.profiles_json_file = self.data_dir / "player_profiles.json"
+        self.profiles_db = self.data_dir / "player_profiles.db"
+        self.history_file = self.data_dir / "game_history.txt"
+        self.history_dir = self.data_dir / "history"
+        self.history_index_file = self.history_dir / "index.jsonl"
+        self.load_function = load_function
+        self.save_function = save_function
+        self.flush_function = flush_function or (lambda: {})
+        self.read_bytes_function = read_bytes_function
+        self.save_bytes_function = save_bytes_function
+        self.write_state_function = write_state_function
+        self.quiet_load_function = quiet_load_function
+        self.saves_dir.mkdir(parents=True, exist_ok=True)
+
+    def _open_config_cache(self, defaults):
+        return ConfigCache(self.config_file, defaults,
+                           load_function=self.load_function,
+                           save_function=self.save_function,
+                           watch_load_function=self.quiet_load_function)
+
+    def _open_profile_store(self):
+        profile_store = TieredProfileStore(self.profiles_db)
+        profile_store.import_json_once(self.profiles_json_file)
+        profile_store.archive_if_due()
+        return profile_store
+
+    def _open_leaderboard(self, size):
+        # The snapshot is written straight away (atomically, under the leaderboard's
+        # file lock) so processes sharing game_data can't overwrite each other's board
+        return Leaderboard(self.score_log_file, self.highscores_file, size=size,
+                           shared_snapshot=SharedLeaderboardSnapshot(self.leaderboard_snapshot_file, size))
+
+    def _open_leaderboard_snapshot(self):
+        return SharedLeaderboardSnapshot(self.leaderboard_snapshot_file)
+
+    def _open_save_store(self, snapshot_format):
+        journal = JournaledSaveStore(self.saves_dir,
+                                     load_function=self.load_function,
+                                     save_function=self.save_function,
+                                     flush_function=self.flush_function,
+                                     read_bytes_function=self.read_bytes_function,
+                                     save_bytes_function=self.save_bytes_function,
+                                     write_state_function=self.write_state_function,
+                                     snapshot_format=snapshot_format)
+        manifest = SaveSlotManifest(self.saves_dir, self.save_manifest_file,
+                                    load_function=journal.load_summary,
+                                    save_function=self.save_function,
+                                    write_state_function=self.write_state_function)
+        return FileSaveStore(journal, manifest, self.flush_function)
+
+    def _open_save_retention(self):
+        return SaveRetention(self.save_store(), flush_function=self.flush_function).register_atexit()
+
+    def _open_history_log(self):
+        return HistoryLog(self.history_file, self.history_dir).register_atexit()
+
+    def _open_history_index(self, history_log):
+        return HistoryIndex(history_log, self.history_index_file)
+
+    def flush(self):
+        """Push buffered history lines and queued file writes to the disk
+
+        Returns {path: error} for the queued writes that failed.
+        """
+        super().flush()
+        return self.flush_function() or {}
+
+    def reload(self):
+        """Make every store read its files again (after a backup was restored underneath it)"""
+        with self._lock:
+            super().reload()
+            save_store = self._stores.get("saves")
+            if save_store is not None:
+                save_store.journal.reset()
+                save_store.manifest.reset()
+            leaderboard = self._stores.get("leaderboard")
+            if leaderboard is not None:
+                leaderboard.rebuild()  # Also republishes the shared snapshot
+
+    def delete_all(self):
+        """Delete every data file in the directory"""
+        with self._lock:
+            self.flush()
+            self.close_profile_store()
+            self.history_log().delete_all()
+            for file_path in [self.config_file, self.highscores_file, self.score_log_file,
+                              self.profiles_json_file, self.profiles_db,
+                              self.profiles_db.with_name(self.profiles_db.name + "-wal"),
+                              self.profiles_db.with_name(self.profiles_db.name + "-shm")]:
+                if file_path.exists():
+                    file_path.unlink()
+            self.leaderboard().reset()
+            self.save_retention().delete_all()
+            self.save_store().delete_all()
+            self._reset_cached_stores()
@@ -0,0 +1,99 @@
+# THE MYSTIC FOREST ADVENTURE - MULTI-PROCESS STRESS TEST
+# Many game processes writing profiles and high scores to one game_data directory at once
+
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from mystic_codex_shared_leaderboard import SharedLeaderboardSnapshot
+
+
+def _writer(work_dir, worker_number, games, player_count):
+    """Play `games` quick games in a fresh process and return the scores it recorded"""
+    os.chdir(work_dir)
+    # The checks below read the file backend's files, whatever the parent process uses
+    os.environ["MYSTIC_STORAGE_BACKEND"] = "file"
+    os.environ["MYSTIC_GAME_DATA_DIR"] = "game_data"
+    with contextlib.redirect_stdout(io.StringIO()):
+        import mystic_codex_files_handling as files_handling  # Paths resolve inside work_dir
+
+        rng = random.Random(worker_number)
+        results = []
+        for game_number in range(games):
+            player_name = f"Player{rng.randrange(player_count)}"
+            score = rng.randint(1, 100000)
+            files_handling.update_player_profile(player_name, {"score": score, "achievements": []})
+            files_handling.add_highscore(player_name, score, "normal")
+            results.append((player_name, score))
+        files_handling.flush_pending_writes()
+        files_handling.close_profile_store()
+    return results
+
+
+def run_stress_test(processes=4, games_per_process=200, player_count=8):
+    """Run concurrent writer processes and check that no update was lost
+
+    Every process calls update_player_profile and add_highscore for its own
+    games. Afterwards each player's games_played and total_score must equal
+    the sum of what all processes recorded, every score must be in the score
+    log, and highscores.json and the shared snapshot must hold the true top
+    10. Returns the measured throughput and raises AssertionError on a lost
+    update.
+    """
+    work_dir = Path(tempfile.mkdtemp(prefix="mystic_stress_"))
+    (work_dir / "game_data" / "saves").mkdir(parents=True)
+    context = multiprocessing.get_context("spawn")
+
+    try:
+        start = time.perf_counter()
+        with context.Pool(processes) as pool:
+            batches = pool.starmap(_writer, [(str(work_dir), number, games_per_process, player_count)
+                                             for number in range(processes)])
+        elapsed = time.perf_counter() - start
+        recorded = [result for batch in batches for result in batch]
+
+        expected = {}
+        for player_name, score in recorded:
+            games, total = expected.get(player_name, (0, 0))
+            expected[player_name] = (games + 1, total + score)
+
+        connection = sqlite3.connect(str(work_dir / "game_data" / "player_profiles.db"))
+        try:
+            stored = {name: (games, total) for name, games, total in
+                      connection.execute("SELECT name, games_played, total_score FROM players")}
+        finally:
+            connection.close()
+        assert stored == expected, f"lost profile updates: expected {expected}, found {stored}"
+
+        with open(work_dir / "game_data" / "score_log.jsonl", 'r', encoding='utf-8') as file:
+            logged = sorted(json.loads(line)["score"] for line in file if line.strip())
+        assert logged == sorted(score for _, score in recorded), "scores missing from the score log"
+
+        with open(work_dir / "game_data" / "highscores.json", 'r', encoding='utf-8') as file:
+            board = [entry["score"] for entry in json.load(file)["scores"]]
+        assert board == sorted(logged, reverse=True)[:10], f"stale leaderboard snapshot: {board}"
+
+        snapshot = SharedLeaderboardSnapshot(work_dir / "game_data" / "highscores.mmap")
+        shared = [entry["score"] for entry in snapshot.read() or []]
+        snapshot.close()
+        assert shared == board, f"shared leaderboard snapshot out of date: {shared}"
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    total_games = len(recorded)
+    print(f"✅ {processes} processes, {total_games} games, no lost updates")
+    print(f"⏱️ {elapsed:.2f}s - {total_games / elapsed:,.0f} games/s "
+          f"({total_games * 2 / elapsed:,.0f} store updates/s)")
+    return {"processes": processes, "games": total_games, "seconds": elapsed,
+            "games_per_second": total_games / elapsed}
+
+
+if __name__ == "__main__":
+    run_stress_test()